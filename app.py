@@ -1,22 +1,35 @@
 import streamlit as st
-import google.generativeai as genai
+from streamlit.errors import StreamlitAPIException
+import atexit
 import json
-import random
 import os
-import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 from datetime import datetime
+from meeting import MeetingSession, MeetingCallbacks, MODEL_NAME, load_personas as read_personas_file
+from turn_engine import TurnEngine, TURN_MODE_CONVERSATIONAL, TURN_MODE_PARALLEL
+from target_resolver import TargetResolver
+from response_cache import create_cache
+from meeting_store import MeetingStore, DEFAULT_STORE_PATH, open_exclusive
+from speculation import Speculator
+from instrumentation import CallMetrics, serve_prometheus
+from persona_registry import PersonaRegistry, DEFAULT_EMOJI
+from speaker_scheduler import POLICIES, POLICY_WEIGHTED, POLICY_ROUND_ROBIN
+from model_provider import create_model, PROVIDER_GEMINI
+from model_client import ModelClient
+from rate_limiter import RequestLimiter
+from session_pool import SessionPool
 
 # --- 초기 설정 ---
 
 # 환경 변수 로드 (.env 파일 필요)
 load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
+# 모델 제공자 ("gemini" 또는 오프라인 측정용 "fake")
+model_provider = os.getenv("MODEL_PROVIDER", PROVIDER_GEMINI)
 
-# Google API 키 설정
-if api_key:
-    genai.configure(api_key=api_key)
-else:
+# Google API 키 확인 (가짜 모델은 키 없이 실행)
+if not api_key and model_provider == PROVIDER_GEMINI:
     st.error("GOOGLE_API_KEY가 설정되지 않았습니다. .env 파일을 생성하고 API 키를 입력해주세요.")
     st.stop()
 
@@ -29,129 +42,193 @@ st.set_page_config(
 
 # --- 데이터 로드 및 모델 설정 ---
 
-@st.cache_data # 페르소나 데이터 캐싱
+@st.cache_resource # 모든 세션이 하나의 명단을 공유 (파일이 바뀌면 다음 턴부터 새 명단 사용)
 def load_personas():
-    """personas.json 파일에서 페르소나 데이터를 로드합니다."""
+    """personas.json 파일에서 페르소나 명단을 로드합니다."""
     try:
-        with open("personas.json", "r", encoding="utf-8") as f:
-            return json.load(f)
+        return read_personas_file("personas.json")
     except FileNotFoundError:
         st.error("personas.json 파일을 찾을 수 없습니다.")
-        return []
     except json.JSONDecodeError:
         st.error("personas.json 파일 형식이 올바르지 않습니다.")
-        return []
     except Exception as e:
         st.error(f"페르소나 파일 로드 중 오류 발생: {e}")
-        return []
+    # 빈 명단으로 시작하고, 파일이 고쳐지면 다시 읽음
+    return PersonaRegistry(path="personas.json")
+
+@st.cache_resource # 모든 세션이 하나의 클라이언트(속도 제한·동시 호출 수 제한·재시도·서킷 브레이커)를 공유
+def get_model(provider, model_name):
+    """설정된 제공자의 모델을 생성하고 공유 클라이언트로 감쌉니다."""
+    return ModelClient(
+        create_model(
+            provider, model_name, api_key=api_key,
+            # 고정 접두부(페르소나 지시 + 회의 주제)가 이 토큰 수 이상이면 컨텍스트 캐시 사용 (0이면 사용 안 함)
+            context_cache_min_tokens=int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "0")),
+            context_cache_ttl=int(os.getenv("CONTEXT_CACHE_TTL", "3600"))
+        ),
+        limiter=RequestLimiter(
+            requests_per_minute=float(os.getenv("MODEL_RPM", "60")),
+            tokens_per_minute=float(os.getenv("MODEL_TPM", "1000000"))
+        ),
+        model_name=model_name,
+        # 세션 수와 관계없이 모델로 나가는 동시 요청 수 상한 (0이면 제한 없음)
+        max_concurrency=int(os.getenv("MODEL_MAX_CONCURRENCY", "32")) or None
+    )
 
 # Gemini 모델 설정
 try:
-    model = genai.GenerativeModel("gemini-2.0-flash") # PRD 명시 모델
+    model = get_model(model_provider, MODEL_NAME)
 except Exception as e:
     st.error(f"Gemini 모델 로드 실패: {e}. API 키 또는 모델 이름을 확인하세요.")
     model = None # 모델 로드 실패 시 None으로 설정
 
+@st.cache_resource # 프로세스 전체에서 공유하는 턴 엔진 (동시 실행 수 제한)
+def get_turn_engine():
+    """페르소나 응답과 대상 분석을 병렬로 실행하는 턴 엔진을 생성합니다."""
+    # 기본값은 모델 동시 요청 수 상한(MODEL_MAX_CONCURRENCY)과 같게 맞춤 (load_test.py 기본값과 동일)
+    return TurnEngine(max_workers=int(os.getenv("TURN_WORKERS", "32")), call_timeout=60.0)
+
+@st.cache_resource # 세션 간에 공유하는 응답 캐시
+def get_response_cache():
+    """환경 변수 설정에 따라 메모리 LRU 또는 SQLite 응답 캐시를 생성합니다."""
+    return create_cache(
+        backend=os.getenv("RESPONSE_CACHE_BACKEND", "memory"),
+        path=os.getenv("RESPONSE_CACHE_PATH", ".cache/responses.sqlite3"),
+        ttl=int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    )
+
+@st.cache_resource # 로컬 지목 대상 판별기 (모델 판별 사용 횟수를 프로세스 단위로 집계)
+def get_target_resolver():
+    """모델 호출 없이 지목 대상을 찾는 로컬 판별기를 생성합니다."""
+    return TargetResolver(threshold=0.75)
+
+@st.cache_resource # 모든 세션의 모델 호출 지표를 한곳에 모음
+def get_call_metrics():
+    """호출 계측 저장소를 만들고, 설정에 따라 JSON 로그 파일과 Prometheus 엔드포인트를 켭니다."""
+    metrics = CallMetrics(log_path=os.getenv("CALL_LOG_PATH") or None)
+    atexit.register(metrics.close) # 서버 종료 시 로그 파일 닫기
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics_port:
+        # 기본은 로컬에서만 수집 가능. 외부 수집기에 공개하려면 METRICS_HOST="0.0.0.0"
+        server = serve_prometheus(metrics, int(metrics_port), host=os.getenv("METRICS_HOST", "127.0.0.1"))
+        atexit.register(server.shutdown)
+    return metrics
+
+@st.cache_resource # 모든 세션이 하나의 회의 기록 저장소를 공유
+def get_meeting_store():
+    """메시지를 오가는 즉시 기록하는 회의 저장소를 엽니다."""
+    return MeetingStore(os.getenv("MEETING_STORE_PATH", DEFAULT_STORE_PATH))
+
+@st.cache_data(max_entries=32, show_spinner=False) # 같은 회의를 다시 그릴 때마다 전체 기록을 읽지 않도록
+def get_archive_markdown(meeting_id, revision):
+    """보관된 회의의 Markdown 로그를 만듭니다. revision(저장소의 변경 표시)이 바뀌면 다시 만듭니다."""
+    return "".join(get_meeting_store().iter_markdown(meeting_id))
+
+@st.cache_resource # 프로세스의 모든 회의 세션을 최근 활동 순으로 추적
+def get_session_pool():
+    """오래 쉬고 있는 세션의 대화 기록을 디스크로 내보내는 세션 풀을 생성합니다."""
+    idle_timeout = float(os.getenv("SESSION_IDLE_TIMEOUT", "1800"))
+    return SessionPool(
+        idle_timeout=idle_timeout,
+        max_active=int(os.getenv("MAX_ACTIVE_SESSIONS", "200")),
+        sweep_interval=min(30.0, idle_timeout) # 쉬는 시간 기준이 짧아도 제때 정리되도록
+    )
+
+# --- 이모지 (페르소나 이모지는 personas.json의 emoji) ---
+user_emoji = "🧑‍💻" # 사용자
+
+class StreamlitCallbacks(MeetingCallbacks):
+    """회의 엔진의 이벤트를 Streamlit 화면에 표시합니다."""
+
+    def __init__(self):
+        self._placeholders = {}
+
+    def on_error(self, message):
+        st.error(message)
+
+    def on_warning(self, message):
+        st.warning(message)
+
+    def status(self, message):
+        return st.spinner(message)
+
+    def on_reply_start(self, persona):
+        name = persona["name"]
+        placeholder = st.chat_message(name=name, avatar=persona.get("emoji", DEFAULT_EMOJI)).empty()
+        placeholder.markdown(f"**{name}:** ...")
+        self._placeholders[name] = placeholder
+
+    def on_reply_chunk(self, persona, text):
+        # 청크가 도착하는 대로 말풍선에 표시 (첫 토큰까지의 대기 시간 단축)
+        self._placeholders[persona["name"]].markdown(f"**{persona['name']}:** {text}▌")
+
+    def on_reply_end(self, persona, text):
+        self._placeholders.pop(persona["name"]).markdown(f"**{persona['name']}:** {text}")
+
 # --- 세션 상태 초기화 ---
 
-if "personas" not in st.session_state:
-    st.session_state.personas = load_personas()
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
-if "meeting_topic" not in st.session_state:
-    st.session_state.meeting_topic = ""
-if "is_meeting_started" not in st.session_state:
-    st.session_state.is_meeting_started = False
-if "user_name" not in st.session_state:
-    st.session_state.user_name = "사용자"
-if "current_turn" not in st.session_state:
-    st.session_state.current_turn = "user" # 시작은 사용자 턴
-if "meeting_summary" not in st.session_state:
-    st.session_state.meeting_summary = None # 요약 내용 저장
-if "meeting_log_markdown_content" not in st.session_state:
-    st.session_state.meeting_log_markdown_content = None
+if "meeting" not in st.session_state:
+    st.session_state.meeting = MeetingSession(
+        model,
+        load_personas(),
+        engine=get_turn_engine(),
+        resolver=get_target_resolver(),
+        cache=get_response_cache(),
+        store=get_meeting_store(),
+        metrics=get_call_metrics(),
+        # 대화 기록 중 메모리에 두는 최근 메시지 수 (나머지는 회의 저장소에서 읽음)
+        max_history_in_memory=int(os.getenv("SESSION_MAX_MESSAGES", "200"))
+    )
+if "meeting_log_path" not in st.session_state:
+    st.session_state.meeting_log_path = None # 복사 영역에 표시할 저장된 로그 파일 (내용은 세션에 두지 않음)
 if "show_copyable_log" not in st.session_state:
     st.session_state.show_copyable_log = False
-
-# --- 핵심 로직 함수 ---
-
-def get_response_from_gemini(persona, chat_history_text, topic):
-    """Gemini API를 호출하여 페르소나의 응답을 생성합니다."""
-    if not model:
-        return "Gemini 모델이 로드되지 않았습니다."
-    try:
-        prompt = f"""
-        당신은 여성 패션 이커머스 플랫폼 회사에 근무하는 '{persona['name']}'라는 이름의 전략 전문가입니다.
-        당신의 성향은 {persona['mbti']}이며, MBTI 성향에 맞는 방식으로 문제를 파악하고 사고합니다.
-        현재 회의 주제는 '{topic}'입니다.
-        지금까지의 대화 내용은 다음과 같습니다:
-        --- 대화 시작 ---
-        {chat_history_text}
-        --- 대화 끝 ---
-        이제 당신의 입장에서 회의 주제에 대해 간결하게 1~3 문장으로 발언해주세요.
-        기존의 대화에 순응하기 보다 의식적으로 반대하는 의견을 제시하지만, 타당한 의견에 대해서는 반대를 멈추세요.
-        당신의 성향에 일치하는 개념을 제시하고 대화하지만, 직접적으로 MBTI를 드러내지는 않습니다.
-        지나치게 추상적이거나 모호한 답변을 피하고 실제 비즈니스에서 발생할 수 있는 상황을 가정하여 구체성 있는 발언을 하세요.
-        당신의 성향과 성별을 고려하여 말투를 적절히 사용하세요. 대화라는 점으로 고려해 캐주얼한 말투를 사용해도 좋습니다.
-        """
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        st.error(f"Gemini API 호출 중 오류 발생: {e}")
-        return f"응답 생성 실패 ({persona['name']})"
-
-def select_persona_speakers(personas):
-    """PRD 기준: 페르소나 턴에 1~2명을 랜덤하게 선택합니다."""
-    if not personas:
-        return []
-    num_speakers = random.randint(1, min(len(personas), 2)) # 1명 또는 2명 선택
-    return random.sample(personas, num_speakers)
-
-def start_meeting(topic):
-    """회의를 시작하고 상태를 초기화합니다."""
-    st.session_state.meeting_topic = topic
-    st.session_state.is_meeting_started = True
-    st.session_state.chat_history = [{"role": "system", "content": f"회의 시작: {topic}"}]
-    st.session_state.current_turn = "user" # 항상 사용자가 먼저 시작
+if "stream_responses" not in st.session_state:
+    st.session_state.stream_responses = True # 페르소나 응답을 토큰 단위로 표시
+if "turn_mode" not in st.session_state:
+    st.session_state.turn_mode = TURN_MODE_CONVERSATIONAL # 발언자가 앞 발언을 보고 응답
+if "speaker_policy" not in st.session_state:
+    st.session_state.speaker_policy = POLICY_WEIGHTED # 적극성 비율로 발언자 선택
+if "speculate" not in st.session_state:
+    st.session_state.speculate = False # 입력하는 동안 다음 턴 미리 준비 (선택 기능)
+if "speculator" not in st.session_state:
+    st.session_state.speculator = Speculator(max_share=float(os.getenv("SPECULATION_MAX_SHARE", "0.2")))
+
+# 화면 출력과 설정은 매 실행마다 현재 세션의 것으로 연결
+meeting = st.session_state.meeting
+meeting.model = model
+meeting.callbacks = StreamlitCallbacks()
+meeting.stream_responses = st.session_state.stream_responses
+meeting.turn_mode = st.session_state.turn_mode
+meeting.scheduler.policy = st.session_state.speaker_policy
+meeting.speculation = st.session_state.speculator if st.session_state.speculate else None
+get_session_pool().touch(meeting) # 이 세션이 쓰였음을 기록하고, 오래 쉰 다른 세션은 정리
+state = meeting.state
+if meeting.registry.last_error is not None:
+    st.sidebar.warning(f"personas.json을 다시 읽지 못해 기존 명단을 사용합니다: {meeting.registry.last_error}")
+
+# --- 화면 동작 함수 ---
 
 def reset_meeting():
-    """회의 상태를 초기화합니다."""
-    st.session_state.meeting_topic = ""
-    st.session_state.is_meeting_started = False
-    st.session_state.chat_history = []
-    st.session_state.current_turn = "user"
-    st.session_state.meeting_summary = None # 요약 내용도 초기화
-    st.session_state.meeting_log_markdown_content = None # 생성된 로그 내용 초기화
+    """회의 상태와 화면 상태를 초기화합니다."""
+    meeting.reset_meeting()
+    st.session_state.meeting_log_path = None # 생성된 로그 초기화
     st.session_state.show_copyable_log = False # 복사 영역 숨김
 
 def save_meeting_log():
-    """현재 회의 로그를 Markdown 파일로 저장하고, 세션 상태에 복사 가능한 형태로 저장합니다."""
-    if not st.session_state.chat_history:
+    """현재 회의 로그를 Markdown 파일로 저장하고, 메인 화면에서 복사할 수 있도록 파일 경로를 세션 상태에 저장합니다."""
+    if not state.chat_history:
         st.warning("저장할 회의 로그가 없습니다.")
         return None
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"meeting_log_{timestamp}.md"
-
-        markdown_content = f"# 회의 로그 ({timestamp})\n\n"
-        markdown_content += f"**주제:** {st.session_state.meeting_topic}\n"
-        markdown_content += f"**참여자:** {st.session_state.user_name} (사용자), "
-        markdown_content += ", ".join([p['name'] for p in st.session_state.personas]) + "\n\n"
-        markdown_content += "---\n\n"
-
-        for message in st.session_state.chat_history:
-            role = message.get("role", "unknown")
-            content = message.get("content", "").strip()
-            if role == "system":
-                markdown_content += f"*({content})*\n\n"
-            else:
-                display_role = "사용자" if role == st.session_state.user_name else role
-                markdown_content += f"**{display_role}:** {content}\n\n"
-
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(markdown_content)
-
-        st.session_state.meeting_log_markdown_content = markdown_content
+        # 같은 초에 저장해도 기존 파일을 덮어쓰지 않도록 새 이름으로 생성
+        f, filename = open_exclusive(".", f"meeting_log_{timestamp}")
+        with f:
+            # 전체 로그를 한 문자열로 만들지 않고 조각 단위로 기록
+            f.writelines(meeting.iter_markdown(timestamp))
+
+        st.session_state.meeting_log_path = filename
         st.session_state.show_copyable_log = True
         st.success(f"회의 로그가 {filename} 에 저장되었고, 메인 화면에서 복사할 수 있습니다.")
         return filename
@@ -159,287 +236,269 @@ def save_meeting_log():
         st.error(f"로그 저장 실패: {e}")
         return None
 
-def handle_user_message(user_input):
-    """사용자 메시지를 처리하고 페르소나 턴으로 전환합니다."""
-    if user_input and st.session_state.is_meeting_started:
-        st.session_state.chat_history.append({
-            "role": st.session_state.user_name,
-            "content": user_input
-        })
-        st.session_state.current_turn = "persona" # 페르소나 턴으로 변경
-
-def get_targeted_persona_from_user_message(user_message, personas_list, recent_chat_history=None):
-    """
-    Gemini API를 사용하여 사용자의 메시지에서 특정 페르소나가 지목되었는지,
-    또는 최근 대화 내용을 참조하는지 판단합니다.
-    지목/참조된 페르소나의 이름을 반환하거나, 없으면 None을 반환합니다.
-    """
-    if not model:
-        return None
-    if not user_message.strip():
-        return None
-
-    persona_names = [p["name"] for p in personas_list]
-    persona_names_str = ", ".join(persona_names)
-
-    history_context = "최근 대화 내용은 다음과 같습니다:\n"
-    if recent_chat_history:
-        for msg in recent_chat_history:
-            history_context += f"{msg.get('role', '알 수 없음')}: {msg.get('content', '')}\n"
-    else:
-        history_context += " (최근 대화 내용 없음)\n"
-
-    prompt = f"""
-    사용자의 다음 메시지를 분석해주세요:
-    사용자 메시지: "{user_message}"
-
-    {history_context}
-    회의 참석자 목록은 다음과 같습니다: {persona_names_str}
+# --- 채팅 영역 ---
+
+CHAT_PAGE_SIZE = 30 # 말풍선으로 그리는 최근 메시지 수. 그보다 오래된 메시지는 페이지 단위로 묶어 표시
+
+def message_markdown(message):
+    """이전 대화 페이지에 표시할 메시지 한 건의 Markdown을 만듭니다."""
+    role = message.get("role", "unknown")
+    content = message.get("content", "")
+    if role == "system":
+        return f"*({content})*"
+    if role == state.user_name:
+        return f"{user_emoji} **{role}:** {content}"
+    return f"{meeting.registry.emoji(role)} **{role}:** {content}"
+
+RENDERED_PAGE_CACHE_SIZE = 8 # 세션마다 Markdown을 보관하는 이전 대화 페이지 수
+
+def rendered_page(start, end):
+    """이전 대화 한 페이지의 Markdown. 최근에 본 페이지 몇 개를 세션에 캐시합니다. (오래된 메시지는 저장소에서 읽음)"""
+    # 한 번 기록된 메시지는 바뀌지 않으므로 회의와 구간, 표시에 쓰는 값(revision)이 같으면 같은 페이지
+    # 저장소 없이 진행하는 회의는 meeting_id가 없으므로 대화 기록 객체로 구분
+    revision = (id(state.chat_history), state.user_name, user_emoji)
+    cache_key = (meeting.meeting_id, start, end, revision)
+    cache = st.session_state.setdefault("rendered_pages", OrderedDict())
+    markdown = cache.get(cache_key)
+    if markdown is None:
+        markdown = "\n\n".join(message_markdown(m) for m in state.chat_history[start:end])
+        cache[cache_key] = markdown
+        while len(cache) > RENDERED_PAGE_CACHE_SIZE:
+            cache.popitem(last=False)
+    cache.move_to_end(cache_key)
+    return markdown
+
+def render_message(message):
+    """메시지 한 건을 채팅 말풍선으로 표시합니다."""
+    role = message.get("role", "unknown")
+    content = message.get("content", "")
+    if role == "system":
+        st.info(content)
+    elif role == state.user_name:
+        # 사용자 메시지에 이름과 이모지 적용
+        with st.chat_message(name=state.user_name, avatar=user_emoji):
+            st.markdown(content)
+    else: # 페르소나
+        avatar_emoji = meeting.registry.emoji(role)
+        # name 파라미터는 유지하되, 마크다운 내용에 이름을 명시적으로 추가
+        with st.chat_message(name=role, avatar=avatar_emoji):
+            st.markdown(f"**{role}:** {content}")
+
+def rerun_chat():
+    """채팅 영역만 다시 실행합니다. 전체 실행 중이라 프래그먼트만 다시 실행할 수 없으면 앱 전체를 다시 실행합니다."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
-    위 사용자 메시지가 다음 중 하나에 해당합니까?
-    1. 회의 참석자 ({persona_names_str}) 중 특정 한 명의 이름을 명시적으로 부르는 경우
-    2. 위에 제시된 '최근 대화 내용' 중 특정 참석자의 발언을 명확히 지칭하거나 이어가는 경우
+@st.fragment
+def chat_area():
+    """채팅 기록과 입력창. 메시지가 오갈 때는 이 영역만 다시 실행되어 사이드바와 나머지 화면은 그대로 둡니다."""
+    # 메시지가 오가는 동안에는 이 영역만 다시 실행되어 위쪽 touch가 불리지 않으므로 여기서도 기록
+    get_session_pool().touch(meeting)
+    history = state.chat_history
+    older_count = max(0, len(history) - CHAT_PAGE_SIZE)
+
+    # 오래된 메시지는 말풍선 대신 Markdown 한 덩어리로, 한 페이지씩만 표시
+    if older_count:
+        page_count = (older_count + CHAT_PAGE_SIZE - 1) // CHAT_PAGE_SIZE
+        with st.expander(f"이전 대화 {older_count}개"):
+            page = 1
+            if page_count > 1:
+                page = st.number_input("페이지", min_value=1, max_value=page_count, value=page_count, key="history_page")
+            start = (page - 1) * CHAT_PAGE_SIZE
+            st.markdown(rendered_page(start, min(start + CHAT_PAGE_SIZE, older_count)))
+
+    for message in history[older_count:]:
+        render_message(message)
 
-    - 만약 그렇다면, 해당 참석자의 이름만 정확히 응답해주세요. (예: {persona_names_str} 중 하나)
-    - 그렇지 않거나, 누구를 지칭하는지 애매하거나, 여러 명을 지칭하거나, 아무도 지칭하지 않는다면 "None"이라고 응답해주세요.
+    # 페르소나 턴 처리 (스크립트 실행 시 체크)
+    if state.current_turn == "persona":
+        meeting.generate_persona_responses()
+        rerun_chat() # 페르소나 응답 후 채팅 영역 즉시 업데이트
 
-    응답은 반드시 참석자 이름 또는 "None" 중 하나여야 합니다. 다른 설명이나 부연은 절대 추가하지 마십시오.
-    """
-    try:
-        response = model.generate_content(prompt)
-        candidate_name = response.text.strip()
+    # 사용자 입력 영역 (사용자 턴일 때만 활성화)
+    user_input = st.chat_input(
+        "메시지를 입력하세요...",
+        key="chat_input",
+        disabled=state.current_turn != "user" or not state.is_meeting_started
+    )
 
-        if candidate_name in persona_names:
-            return candidate_name
-        else:
-            return None
-    except Exception as e:
-        st.error(f"Gemini API (대상 분석) 호출 중 오류 발생: {e}")
-        return None
+    if user_input:
+        meeting.handle_user_message(user_input)
+        rerun_chat() # 사용자 메시지 입력 후 즉시 업데이트 및 페르소나 턴 준비
 
-def generate_persona_responses():
-    """페르소나 턴일 때 응답을 생성하고 사용자 턴으로 전환합니다."""
-    if st.session_state.current_turn == "persona" and st.session_state.is_meeting_started:
-        speakers_to_respond = []
-        targeted_persona_name = None
-
-        if st.session_state.chat_history:
-            last_message_obj = st.session_state.chat_history[-1]
-            if last_message_obj.get("role") == st.session_state.user_name:
-                user_last_message_content = last_message_obj.get("content", "")
-
-                # 사용자 메시지 직전의 페르소나 발언들 (최대 3개) 추출
-                # 시스템 메시지나 다른 사용자 메시지는 제외하고 페르소나 발언만 필터링
-                recent_persona_msgs_for_context = []
-                # 사용자 메시지 바로 앞부터 역순으로 탐색
-                for i in range(len(st.session_state.chat_history) - 2, -1, -1):
-                    msg = st.session_state.chat_history[i]
-                    # 페르소나 이름 목록 가져오기
-                    persona_names_list = [p["name"] for p in st.session_state.personas]
-                    if msg.get("role") in persona_names_list: # 페르소나 발언인지 확인
-                        recent_persona_msgs_for_context.insert(0, msg) # 맨 앞에 추가하여 순서 유지
-                    if len(recent_persona_msgs_for_context) >= 3: # 최대 3개까지만
-                        break
-                
-                targeted_persona_name = get_targeted_persona_from_user_message(
-                    user_last_message_content,
-                    st.session_state.personas,
-                    recent_persona_msgs_for_context # 최근 페르소나 발언 전달
-                )
-
-        if targeted_persona_name:
-            targeted_speaker_obj = next((p for p in st.session_state.personas if p["name"] == targeted_persona_name), None)
-            if targeted_speaker_obj:
-                speakers_to_respond = [targeted_speaker_obj]
-        else:
-            speakers_to_respond = select_persona_speakers(st.session_state.personas)
-
-        if not speakers_to_respond:
-            st.session_state.current_turn = "user"
-            return
-
-        responses_to_add = []
-        for speaker_persona in speakers_to_respond:
-            chat_history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in st.session_state.chat_history + responses_to_add])
-            with st.spinner(f"{speaker_persona['name']} 응답 생성 중..."):
-                response_text = get_response_from_gemini(speaker_persona, chat_history_text, st.session_state.meeting_topic)
-            responses_to_add.append({
-                "role": speaker_persona["name"],
-                "content": response_text
-            })
-
-        st.session_state.chat_history.extend(responses_to_add)
-        st.session_state.current_turn = "user"
-
-# --- 추가된 함수: 회의 요약 ---
-def summarize_meeting(chat_history, topic, user_name):
-    """Gemini API를 사용하여 회의 내용을 요약합니다."""
-    if not model:
-        return "Gemini 모델이 로드되지 않았습니다."
-    if not chat_history:
-        return "요약할 회의 내용이 없습니다."
-
-    # 시스템 메시지 제외 및 역할 이름 통일
-    history_text = ""
-    for msg in chat_history:
-        role = msg.get("role", "unknown")
-        content = msg.get("content", "")
-        if role != "system":
-            # 사용자 이름 통일 (세션 상태의 이름 사용)
-            display_role = "사용자" if role == user_name else role
-            history_text += f"{display_role}: {content}\\n"
-
-    prompt = f"""
-    다음은 \'{topic}\'에 대한 회의 기록입니다.
-
-    --- 회의 기록 시작 ---
-    {history_text}
-    --- 회의 기록 끝 ---
-
-    위 회의 기록을 바탕으로 다음 형식에 맞춰 회의를 평가해주세요
-
-    # Agenda
-    - (회의 주제를 명확히 기술)
-
-    # Discussion
-    - (주요 논의 사항들을 간결하게 요약)
-
-    # Feedback
-    - (회의 결과와 논의 방식에 대해 목표달성과 효율성 관점에서 평가하고 개선 사항을 제시)
-
-    결과는 마크다운 형식으로 작성해주세요.
-    """
-    try:
-        with st.spinner("회의 내용을 요약 중입니다..."):
-            response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        st.error(f"Gemini API 요약 호출 중 오류 발생: {e}")
-        return "회의 요약 생성에 실패했습니다."
+    # 사용자가 입력하는 동안 다음 턴을 백그라운드에서 준비 (켜져 있을 때만)
+    meeting.prepare_next_turn()
 
 # --- Streamlit UI 구성 ---
 
 st.title("🤖 멀티마인드 회의실")
 st.caption("이 앱은 서로 다른 성향의 가상 페르소나들이 회의에 참여하여, 나의 사고를 다각도로 확장하고, 복잡한 문제에 대한 더 나은 판단을 돕기 위해 설계되었습니다.")
 
-# --- 이모지 매핑 ---
-persona_emojis = {
-    "Alex": "💡", # ENTP, 혁신적 아이디어
-    "Ben": "📊",  # ISTJ, 데이터/분석
-    "Chloe": "🤝" # ESFJ, 협력/관계
-}
-user_emoji = "🧑‍💻" # 사용자
-
 # --- 사이드바 ---
 with st.sidebar:
     st.header("⚙️ 설정")
 
     # 사용자 이름 설정
-    new_user_name = st.text_input("사용자 이름", value=st.session_state.user_name)
-    if new_user_name != st.session_state.user_name:
-        st.session_state.user_name = new_user_name
+    new_user_name = st.text_input("사용자 이름", value=state.user_name)
+    if new_user_name != state.user_name:
+        state.user_name = new_user_name
         st.rerun() # 이름 변경 시 즉시 반영
 
+    # 응답 스트리밍 설정
+    st.toggle("응답 스트리밍", key="stream_responses", help="페르소나의 발언을 생성되는 대로 바로 표시합니다.")
+
+    # 발언 방식 설정
+    st.radio(
+        "발언 방식",
+        options=[TURN_MODE_CONVERSATIONAL, TURN_MODE_PARALLEL],
+        format_func=lambda mode: "대화형 (앞 발언을 보고 응답)" if mode == TURN_MODE_CONVERSATIONAL else "동시 (서로 독립적으로 응답)",
+        key="turn_mode"
+    )
+
+    # 발언자 선택 방식 설정
+    st.selectbox(
+        "발언자 선택",
+        options=POLICIES,
+        format_func=lambda policy: {
+            POLICY_WEIGHTED: "적극성 비율 (고르게 보정)",
+            POLICY_ROUND_ROBIN: "돌아가며",
+        }.get(policy, "토론 짝 (성향이 다른 두 명)"),
+        key="speaker_policy"
+    )
+
+    # 추측 생성 설정
+    st.toggle("입력 중 미리 준비", key="speculate", help="메시지를 입력하는 동안 다음 발언자의 입장을 미리 생성해 응답을 앞당깁니다. 모델 사용량이 조금 늘어납니다.")
+    if st.session_state.speculate:
+        speculation_stats = st.session_state.speculator.snapshot()
+        st.caption(f"초안 적중률 {speculation_stats['hit_rate']:.0%} · 사용량 비중 {speculation_stats['spend_share']:.0%}")
+
     st.divider()
 
     # 회의 주제 입력
     topic_input = st.text_input(
         "회의 주제 설정",
         placeholder="예: 신규 프로젝트 A의 시장 진출 전략",
-        disabled=st.session_state.is_meeting_started # 회의 중에는 비활성화
+        disabled=state.is_meeting_started # 회의 중에는 비활성화
     )
 
     # 회의 시작 버튼
-    if st.button("회의 시작", disabled=st.session_state.is_meeting_started or not topic_input):
-        start_meeting(topic_input)
+    if st.button("회의 시작", disabled=state.is_meeting_started or not topic_input):
+        meeting.start_meeting(topic_input)
         st.rerun() # 회의 시작 후 즉시 UI 업데이트
 
     st.divider()
     st.header("회의 제어")
 
     # 회의 종료 버튼 추가
-    if st.button("회의 종료", disabled=not st.session_state.is_meeting_started):
-        summary = summarize_meeting(st.session_state.chat_history, st.session_state.meeting_topic, st.session_state.user_name)
-        st.session_state.meeting_summary = summary
-        st.session_state.is_meeting_started = False # 회의 상태 종료
-        st.session_state.current_turn = "user" # 턴 초기화
+    if st.button("회의 종료", disabled=not state.is_meeting_started):
+        meeting.end_meeting() # 요약 후 회의 상태 종료
         st.rerun() # 상태 변경 후 즉시 UI 업데이트
 
     # 회의 초기화 버튼 (요약도 초기화)
     if st.button("회의 초기화"): # 항상 활성화 또는 조건부 활성화 유지 가능
-        reset_meeting()
-        st.session_state.meeting_summary = None # 요약 내용도 초기화
+        reset_meeting() # 요약 내용도 함께 초기화
         st.rerun()
 
     # 로그 저장 버튼
-    if st.button("로그 저장", disabled=not st.session_state.is_meeting_started):
+    if st.button("로그 저장", disabled=not state.is_meeting_started):
         save_meeting_log()
 
+    # 지난 회의 검색 (모든 대화는 자동으로 보관됨)
+    with st.expander("🗂️ 지난 회의 검색"):
+        search_query = st.text_input("검색어", placeholder="예: 재구매율 쿠폰", key="archive_query")
+        if search_query:
+            results = get_meeting_store().search(search_query, limit=10)
+            if not results:
+                st.caption("검색 결과가 없습니다.")
+            for result in results:
+                started = datetime.fromtimestamp(result["started"]).strftime("%Y-%m-%d %H:%M")
+                st.markdown(f"**{result['topic']}** · {started}\n\n> {result['snippet']}")
+                if st.button("로그 불러오기", key=f"archive_open_{result['meeting_id']}"):
+                    st.session_state.archive_meeting_id = result["meeting_id"]
+        # 선택한 회의만 Markdown으로 내보냄 (검색 결과마다 미리 만들지 않음)
+        archive_meeting_id = st.session_state.get("archive_meeting_id")
+        if archive_meeting_id is not None:
+            st.download_button(
+                "Markdown 다운로드",
+                data=get_archive_markdown(archive_meeting_id, get_meeting_store().revision(archive_meeting_id)),
+                file_name=f"meeting_log_{archive_meeting_id}.md",
+                mime="text/markdown"
+            )
+            archived = get_meeting_store().get_meeting(archive_meeting_id)
+            # 요약 없이 끝난 회의(브라우저 종료 등)는 구간별 병렬 요약으로 나중에 만들 수 있음
+            if archived is not None and not archived["summary"] and model:
+                if st.button("요약 만들기", key=f"archive_summarize_{archive_meeting_id}"):
+                    try:
+                        with st.spinner("보관된 회의를 요약 중입니다..."):
+                            summary = meeting.summarize_transcript(
+                                archived["topic"], archived["user_name"], get_meeting_store().iter_messages(archive_meeting_id)
+                            )
+                        get_meeting_store().save_summary(archive_meeting_id, summary)
+                    except Exception as e:
+                        st.error(f"Gemini API 요약 호출 중 오류 발생: {e}")
+                    else:
+                        st.rerun()
+
+    # 호출 지표 패널 (URL에 ?debug=1을 붙이거나 SHOW_METRICS_PANEL=1일 때만 표시)
+    if st.query_params.get("debug") == "1" or os.getenv("SHOW_METRICS_PANEL") == "1":
+        with st.expander("📈 호출 지표"):
+            call_metrics = get_call_metrics()
+            session_tab, process_tab = st.tabs(["이 세션", "전체 프로세스"])
+            with session_tab:
+                st.dataframe(call_metrics.summary(meeting.session_id), hide_index=True)
+            with process_tab:
+                st.dataframe(call_metrics.summary(), hide_index=True)
+                if isinstance(model, ModelClient):
+                    st.caption("클라이언트: " + ", ".join(f"{key} {value}" for key, value in model.stats.items()))
+                # 추측 응답 적중률 등 호출 단위가 아닌 카운터 (비율은 백분율로 표시)
+                st.caption("카운터: " + ", ".join(
+                    f"{key} {value:.0%}" if isinstance(value, float) else f"{key} {value}"
+                    for key, value in call_metrics.counters().items()
+                ))
+                st.caption(f"응답 캐시 적중률: {get_response_cache().stats.hit_rate():.0%}")
+            st.download_button(
+                "호출 기록 CSV",
+                data=call_metrics.to_csv(),
+                file_name=f"model_calls_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+
 # --- 메인 채팅 영역 ---
-if st.session_state.meeting_summary:
+if state.meeting_summary:
     # 회의 종료 후 요약 표시
     st.header("📄 회의 요약")
-    st.markdown(st.session_state.meeting_summary)
+    st.markdown(state.meeting_summary)
 
     # 요약 다운로드 버튼
     st.download_button(
         label="요약 다운로드 (.md)",
-        data=st.session_state.meeting_summary,
+        data=state.meeting_summary,
         file_name=f"meeting_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
         mime="text/markdown"
     )
     st.info("새로운 회의를 시작하려면 사이드바에서 \'회의 초기화\'를 누르세요.")
 
-elif st.session_state.is_meeting_started:
-    st.info(f"현재 회의 주제: **{st.session_state.meeting_topic}**")
-
-    # 채팅 기록 표시
-    chat_container = st.container()
-    with chat_container:
-        for message in st.session_state.chat_history:
-            role = message.get("role", "unknown")
-            content = message.get("content", "")
-            if role == "system":
-                st.info(content)
-            elif role == st.session_state.user_name:
-                 # 사용자 메시지에 이름과 이모지 적용
-                 with st.chat_message(name=st.session_state.user_name, avatar=user_emoji):
-                    st.markdown(content)
-            else: # 페르소나
-                # --- 디버깅 라인 (주석 처리) ---
-                # st.write(f"DEBUG: Role='{role}', Avatar='{persona_emojis.get(role, '🤖')}'") # 역할과 아바타 확인
-                # --- 디버깅 라인 끝 ---
-
-                avatar_emoji = persona_emojis.get(role, "🤖")
-                # 이름과 내용을 함께 표시
-                display_content = f"**{role}:** {content}"
-                # name 파라미터는 유지하되, 마크다운 내용에 이름을 명시적으로 추가
-                with st.chat_message(name=role, avatar=avatar_emoji):
-                     st.markdown(display_content)
-
-    # 페르소나 턴 처리 (스크립트 실행 시 체크)
-    if st.session_state.current_turn == "persona":
-        generate_persona_responses()
-        st.rerun() # 페르소나 응답 후 UI 즉시 업데이트
+elif state.is_meeting_started:
+    st.info(f"현재 회의 주제: **{state.meeting_topic}**")
 
-    # 사용자 입력 영역 (사용자 턴일 때만 활성화)
-    user_input = st.chat_input(
-        "메시지를 입력하세요...",
-        key="chat_input",
-        disabled=st.session_state.current_turn != "user" or not st.session_state.is_meeting_started
-    )
-
-    if user_input:
-        handle_user_message(user_input)
-        st.rerun() # 사용자 메시지 입력 후 즉시 UI 업데이트 및 페르소나 턴 준비
+    # 채팅 기록, 페르소나 턴, 입력창은 프래그먼트 안에서만 다시 그림
+    chat_area()
 
     # 회의 로그 복사 영역 (로그 저장 버튼 클릭 시 표시)
-    if st.session_state.get("show_copyable_log") and st.session_state.get("meeting_log_markdown_content"):
+    if st.session_state.get("show_copyable_log") and st.session_state.get("meeting_log_path"):
         st.divider() # 구분선
         st.subheader("회의 로그 (복사 가능)")
+        # 로그 내용은 세션에 보관하지 않고 표시할 때 저장된 파일에서 읽음
+        try:
+            with open(st.session_state.meeting_log_path, "r", encoding="utf-8") as f:
+                log_content = f.read()
+        except OSError as e:
+            log_content = f"로그 파일을 읽지 못했습니다: {e}"
         st.text_area(
             "아래 내용을 복사하세요:",
-            value=st.session_state.meeting_log_markdown_content,
+            value=log_content,
             height=300,
             key="copyable_log_area"
         )
@@ -452,5 +511,5 @@ else:
     st.info("회의를 시작하려면 사이드바에서 주제를 입력하고 '회의 시작' 버튼을 누르세요.")
 
 # --- .env 파일 안내 ---
-if not api_key:
+if not api_key and model_provider == PROVIDER_GEMINI:
     st.warning("'.env' 파일을 생성하고 GOOGLE_API_KEY='당신의_API_키' 형식으로 키를 추가해야 합니다.")
@@ -0,0 +1,314 @@
+"""
+여러 회의 주제 × 페르소나 구성을 명령줄에서 한꺼번에 시뮬레이션하는 일괄 실행기.
+
+주제 파일(JSONL)의 각 줄은 다음 형식입니다. user_turns가 없으면 사용자 발언을 모델이 자동 생성합니다.
+    {"id": "q3-retention", "topic": "하반기 고객 유지 전략", "user_turns": ["...", "..."]}
+    {"topic": "신규 브랜드 입점 기준", "auto_turns": 4}
+
+회의는 프로세스 풀에서 실행되며, 각 워커는 asyncio로 여러 회의를 동시에 진행하고 워커 안의 모든 회의가
+하나의 모델 클라이언트(속도 제한·재시도)를 공유합니다. 결과는 회의가 끝나는 대로 results.jsonl과 회의별 Markdown 파일에 기록되며,
+다시 실행하면 이미 기록된 회의는 건너뜁니다.
+
+사용 예:
+    python batch_runner.py topics.jsonl --personas personas.json --workers 4 --concurrency 4 --rpm 120
+    MODEL_PROVIDER=fake python batch_runner.py topics.jsonl --output-dir /tmp/batch
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import Manager
+
+from dotenv import load_dotenv
+
+from instrumentation import CALL_AUTO_USER
+from meeting import MeetingSession, MeetingCallbacks, MODEL_NAME, load_personas
+from model_provider import create_model, PROVIDER_GEMINI
+from model_client import ModelClient
+from rate_limiter import RequestLimiter
+from turn_engine import TurnEngine, TURN_MODE_CONVERSATIONAL, TURN_MODE_PARALLEL
+
+RESULTS_FILE = "results.jsonl"
+
+
+def build_auto_user_prompt(topic, history_text):
+    """사용자 발언을 자동 생성하기 위한 프롬프트를 구성합니다."""
+    return f"""
+    당신은 '{topic}' 회의를 이끄는 사용자입니다.
+    지금까지의 대화 내용은 다음과 같습니다:
+    --- 대화 시작 ---
+    {history_text}
+    --- 대화 끝 ---
+    회의를 진전시키기 위한 다음 발언을 1~2 문장으로 작성해주세요. 필요하면 참석자 이름을 불러 질문해도 좋습니다.
+    발언 내용만 작성하고 다른 설명은 덧붙이지 마세요.
+    """
+
+
+def load_jobs(topics_path, persona_paths, auto_turns):
+    """주제 파일과 페르소나 파일 목록으로 (주제 × 페르소나 구성) 작업 목록을 만듭니다."""
+    jobs = []
+    with open(topics_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            base_id = str(entry.get("id", line_no))
+            for persona_path in persona_paths:
+                persona_set = os.path.splitext(os.path.basename(persona_path))[0]
+                jobs.append({
+                    "id": f"{base_id}:{persona_set}" if len(persona_paths) > 1 else base_id,
+                    "topic": entry["topic"],
+                    "user_turns": entry.get("user_turns"),
+                    "auto_turns": entry.get("auto_turns", auto_turns),
+                    "personas_path": persona_path,
+                    "seed": len(jobs),
+                })
+    return jobs
+
+
+def load_completed_ids(results_path):
+    """이미 기록된 회의 id를 읽습니다. 중단 시 잘린 마지막 줄은 무시합니다."""
+    completed = set()
+    if not os.path.exists(results_path):
+        return completed
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" not in record:
+                completed.add(record["id"])
+    return completed
+
+
+def repair_results_file(results_path):
+    """
+    중단 시 잘린 마지막 줄(줄바꿈으로 끝나지 않은 기록)을 잘라냅니다. 그대로 이어 쓰면 다음 기록과 한 줄로 붙어
+    두 기록을 모두 읽을 수 없게 됩니다. 잘린 기록은 완료로 치지 않았으므로 다시 실행됩니다. 잘라낸 바이트 수를 반환합니다.
+    """
+    if not os.path.exists(results_path):
+        return 0
+    with open(results_path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+        # 마지막 줄바꿈을 찾을 때까지 뒤에서부터 블록 단위로 읽음
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+        f.flush()
+        os.fsync(f.fileno())
+    return size - end
+
+
+# --- 워커 프로세스 ---
+
+_worker = {}
+
+
+class _CollectingCallbacks(MeetingCallbacks):
+    """화면 대신 오류 메시지를 모아두는 콜백."""
+
+    def __init__(self):
+        self.errors = []
+
+    def on_error(self, message):
+        self.errors.append(message)
+
+    def on_warning(self, message):
+        self.errors.append(message)
+
+
+def _init_worker(provider, model_name, requests_per_minute, concurrency, turn_mode):
+    """워커마다 모델 클라이언트와 턴 엔진을 한 번만 생성합니다."""
+    model = create_model(
+        provider, model_name, api_key=os.getenv("GOOGLE_API_KEY"),
+        context_cache_min_tokens=int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "0")),
+    )
+    _worker["model"] = ModelClient(model, limiter=RequestLimiter(requests_per_minute), model_name=model_name)
+    _worker["engine"] = TurnEngine(max_workers=concurrency * 3, call_timeout=120.0)
+    _worker["turn_mode"] = turn_mode
+    _worker["personas"] = {}
+
+
+def _worker_personas(path):
+    if path not in _worker["personas"]:
+        _worker["personas"][path] = load_personas(path)
+    return _worker["personas"][path]
+
+
+def run_job(job):
+    """회의 하나를 처음부터 요약까지 실행하고 결과를 반환합니다."""
+    start = time.perf_counter()
+    callbacks = _CollectingCallbacks()
+    session = MeetingSession(
+        _worker["model"],
+        _worker_personas(job["personas_path"]),
+        callbacks=callbacks,
+        engine=_worker["engine"],
+        stream_responses=False,
+        turn_mode=_worker["turn_mode"],
+        rng=random.Random(job["seed"]),
+    )
+    session.start_meeting(job["topic"])
+
+    user_turns = job["user_turns"]
+    num_turns = len(user_turns) if user_turns else job["auto_turns"]
+    for i in range(num_turns):
+        if user_turns:
+            message = user_turns[i]
+        else:
+            session.context.sync(session.state.chat_history)
+            message = session.generate_text(
+                build_auto_user_prompt(job["topic"], session.context.render()), call_site=CALL_AUTO_USER
+            ).strip()
+        session.handle_user_message(message)
+        session.generate_persona_responses()
+
+    summary = session.end_meeting()
+    markdown = session.render_markdown_log(datetime.now().strftime("%Y%m%d_%H%M%S"))
+    return {
+        "id": job["id"],
+        "topic": job["topic"],
+        "personas": [p["name"] for p in session.personas],
+        "chat_history": session.state.chat_history,
+        "summary": summary,
+        "errors": callbacks.errors,
+        "elapsed": time.perf_counter() - start,
+        "markdown": markdown + "\n---\n\n## 회의 요약\n\n" + summary + "\n",
+    }
+
+
+async def _run_chunk_async(jobs, result_queue, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            try:
+                result = await asyncio.to_thread(run_job, job)
+            except Exception as e:
+                result = {"id": job["id"], "topic": job["topic"], "error": repr(e)}
+        # 회의가 끝나는 대로 메인 프로세스에 전달
+        result_queue.put(result)
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+
+def run_chunk(jobs, result_queue, concurrency):
+    """워커에서 작업 묶음을 asyncio로 동시에 실행합니다."""
+    asyncio.run(_run_chunk_async(jobs, result_queue, concurrency))
+    return len(jobs)
+
+
+# --- 메인 프로세스 ---
+
+def _safe_filename(job_id):
+    return re.sub(r"[^0-9A-Za-z가-힣_-]+", "_", job_id)
+
+
+def write_result(result, results_file, output_dir):
+    """Markdown을 먼저 쓰고 결과 줄을 추가합니다. (결과 줄이 있으면 완료된 회의로 간주)"""
+    markdown = result.pop("markdown", None)
+    if markdown is not None:
+        with open(os.path.join(output_dir, f"{_safe_filename(result['id'])}.md"), "w", encoding="utf-8") as f:
+            f.write(markdown)
+    results_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+    results_file.flush()
+    os.fsync(results_file.fileno())
+
+
+def run_batch(jobs, output_dir, workers, concurrency, requests_per_minute, provider, model_name, turn_mode):
+    """작업을 프로세스 풀에 나눠 실행하고, 끝나는 대로 결과를 기록합니다. 처리량(회의/분)을 반환합니다."""
+    os.makedirs(output_dir, exist_ok=True)
+    if not jobs:
+        return 0.0
+    workers = max(1, min(workers, len(jobs)))
+    # 워커 수로 분당 요청 한도를 나눠 전체 한도를 넘지 않도록 함
+    per_worker_rpm = requests_per_minute / workers
+    chunk_size = max(1, concurrency * 2)
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    results_path = os.path.join(output_dir, RESULTS_FILE)
+    if repair_results_file(results_path):
+        print("중단 시 잘린 마지막 결과 줄을 지웠습니다.", flush=True)
+
+    start = time.perf_counter()
+    completed = failed = 0
+    with Manager() as manager, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(provider, model_name, per_worker_rpm, concurrency, turn_mode),
+    ) as pool, open(results_path, "a", encoding="utf-8") as results_file:
+        result_queue = manager.Queue()
+        futures = [pool.submit(run_chunk, chunk, result_queue, concurrency) for chunk in chunks]
+        while completed + failed < len(jobs):
+            try:
+                result = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                # 워커 프로세스가 비정상 종료되면 남은 결과를 기다리지 않음
+                crashed = [f for f in futures if f.done() and f.exception() is not None]
+                if crashed and all(f.done() for f in futures):
+                    raise RuntimeError(f"워커 실행 실패: {crashed[0].exception()!r}")
+                continue
+            write_result(result, results_file, output_dir)
+            if "error" in result:
+                failed += 1
+            else:
+                completed += 1
+            elapsed_minutes = (time.perf_counter() - start) / 60
+            print(f"[{completed + failed}/{len(jobs)}] {result['id']} "
+                  f"{'실패: ' + result['error'] if 'error' in result else '완료'} "
+                  f"({completed / elapsed_minutes:.1f} 회의/분)", flush=True)
+    elapsed_minutes = (time.perf_counter() - start) / 60
+    return completed / elapsed_minutes if elapsed_minutes else 0.0
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="여러 회의 주제를 일괄 시뮬레이션합니다.")
+    parser.add_argument("topics", help="주제 JSONL 파일 경로")
+    parser.add_argument("--personas", nargs="+", default=["personas.json"], help="페르소나 구성 파일 (여러 개 지정 가능)")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="프로세스 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="워커당 동시에 진행할 회의 수")
+    parser.add_argument("--rpm", type=float, default=60, help="전체 분당 요청 한도")
+    parser.add_argument("--provider", default=os.getenv("MODEL_PROVIDER", PROVIDER_GEMINI))
+    parser.add_argument("--auto-turns", type=int, default=3, help="user_turns가 없는 주제의 자동 사용자 발언 수")
+    parser.add_argument("--mode", default=TURN_MODE_CONVERSATIONAL, choices=[TURN_MODE_CONVERSATIONAL, TURN_MODE_PARALLEL])
+    parser.add_argument("--restart", action="store_true", help="기존 결과를 지우고 처음부터 실행")
+    args = parser.parse_args()
+
+    results_path = os.path.join(args.output_dir, RESULTS_FILE)
+    if args.restart and os.path.exists(results_path):
+        os.remove(results_path)
+
+    jobs = load_jobs(args.topics, args.personas, args.auto_turns)
+    completed_ids = load_completed_ids(results_path)
+    pending = [job for job in jobs if job["id"] not in completed_ids]
+    print(f"전체 {len(jobs)}개 중 {len(jobs) - len(pending)}개 완료됨, {len(pending)}개 실행", flush=True)
+
+    throughput = run_batch(
+        pending, args.output_dir, args.workers, args.concurrency, args.rpm, args.provider, MODEL_NAME, args.mode
+    )
+    print(f"처리량: {throughput:.2f} 회의/분")
+
+
+if __name__ == "__main__":
+    main()
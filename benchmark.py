@@ -0,0 +1,188 @@
+"""
+가짜 모델로 회의를 헤드리스 실행해 턴 지연 시간과 API 사용량을 측정하는 오프라인 벤치마크.
+
+회의 시작 → 사용자 메시지 → 페르소나 응답 → 회의 종료(요약) 흐름을 MeetingSession으로 직접 구동하며,
+Streamlit이나 API 키 없이 실행됩니다. 배포 전에 지연 시간이나 호출 수가 늘어나지 않았는지 확인하는 용도입니다.
+
+사용 예:
+    python benchmark.py --meetings 5 --turns 4
+    python benchmark.py --latency-median 0 --chunk-interval 0 --json bench.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+from instrumentation import CallMetrics, percentile
+from meeting import MeetingSession, load_personas
+from model_client import ModelClient, RetryPolicy
+from model_provider import FakeGenerativeModel, LatencyProfile, fake_usage
+from speaker_scheduler import SpeakerScheduler, POLICIES, POLICY_WEIGHTED
+from speculation import Speculator
+from turn_engine import TURN_MODE_CONVERSATIONAL, TURN_MODE_PARALLEL
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_USER_TURNS = [
+    "이번 분기에 신규 고객 유입을 늘릴 방법을 먼저 이야기해보죠.",
+    "Alex님은 인플루언서 협업에 대해 어떻게 생각하세요?",
+    "방금 말씀하신 부분은 예산이 꽤 들 것 같은데요.",
+    "재구매율 데이터를 보면 기존 고객 관리가 더 급해 보입니다.",
+    "Ben은 데이터 관점에서 어떤 지표를 먼저 봐야 한다고 보나요?",
+    "좋습니다. 그럼 다음 주까지 실행 계획을 정리해봅시다.",
+]
+
+
+def _measure(action):
+    """동작 하나를 실행하고 지연 시간과 그동안의 모델 사용량을 반환합니다."""
+    before = fake_usage.snapshot()
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    after = fake_usage.snapshot()
+    return {
+        "latency": elapsed,
+        "api_calls": after["calls"] - before["calls"],
+        "prompt_tokens": after["prompt_tokens"] - before["prompt_tokens"],
+        "cached_tokens": after["cached_tokens"] - before["cached_tokens"],
+        "errors": after["errors"] - before["errors"],
+    }
+
+
+def run_meeting(model, personas, topic, user_turns, seed=0, stream_responses=True, turn_mode=TURN_MODE_CONVERSATIONAL,
+                speculation=None, think_time=0.0, policy=POLICY_WEIGHTED, metrics=None):
+    """회의 하나를 처음부터 요약까지 실행하고 턴별 측정값을 반환합니다."""
+    tracemalloc.start()
+    session = MeetingSession(
+        model,
+        personas,
+        speculation=speculation,
+        scheduler=SpeakerScheduler(personas, policy=policy, seed=seed),
+        metrics=metrics,
+        stream_responses=stream_responses,
+        turn_mode=turn_mode,
+        rng=random.Random(seed)
+    )
+    session.start_meeting(topic)
+
+    def user_turn(message):
+        session.handle_user_message(message)
+        session.generate_persona_responses()
+
+    turns = []
+    for message in user_turns:
+        # 사용자가 메시지를 입력하는 시간 (이 동안 추측 생성이 진행됨)
+        session.prepare_next_turn()
+        time.sleep(think_time)
+        turns.append(_measure(lambda: user_turn(message)))
+    summary = _measure(session.end_meeting)
+
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "topic": topic,
+        "turns": turns,
+        "summary": summary,
+        "messages": len(session.state.chat_history),
+        "speaker_shares": session.scheduler.shares(),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def build_report(meetings):
+    """회의별 측정값을 백분위수 보고서로 집계합니다."""
+    turns = [turn for meeting in meetings for turn in meeting["turns"]]
+    latencies = [turn["latency"] for turn in turns]
+    summaries = [meeting["summary"]["latency"] for meeting in meetings]
+    return {
+        "meetings": len(meetings),
+        "turns": len(turns),
+        "turn_latency_p50": percentile(latencies, 50),
+        "turn_latency_p95": percentile(latencies, 95),
+        "summary_latency_p50": percentile(summaries, 50),
+        "api_calls_per_turn": statistics.mean(turn["api_calls"] for turn in turns) if turns else 0.0,
+        "prompt_tokens_per_turn": statistics.mean(turn["prompt_tokens"] for turn in turns) if turns else 0.0,
+        # 이미 본 system_instruction(페르소나 지시 등)으로 시작해 접두부 캐시를 재사용할 수 있는 토큰 비율
+        "cached_prompt_share": sum(t["cached_tokens"] for t in turns) / max(1, sum(t["prompt_tokens"] for t in turns)),
+        "errors": sum(turn["errors"] for turn in turns),
+        "speaker_share_max": statistics.mean(max(m["speaker_shares"].values(), default=0.0) for m in meetings) if meetings else 0.0,
+        "peak_memory_per_session_kb": statistics.mean(m["peak_memory_bytes"] for m in meetings) / 1024 if meetings else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 Gemini 모델로 회의 턴 성능을 측정합니다.")
+    parser.add_argument("--meetings", type=int, default=3, help="실행할 회의 수")
+    parser.add_argument("--turns", type=int, default=len(DEFAULT_USER_TURNS), help="회의당 사용자 메시지 수")
+    parser.add_argument("--topic", default="여성 패션 플랫폼의 하반기 고객 유지 전략")
+    parser.add_argument("--latency", default="lognormal", choices=["constant", "uniform", "lognormal"])
+    parser.add_argument("--latency-median", type=float, default=0.6, help="호출당 첫 토큰까지의 지연 시간 중앙값(초)")
+    parser.add_argument("--latency-spread", type=float, default=0.4)
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="스트리밍 청크 간격(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="호출 시작 시 오류 주입 비율")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="스트리밍 도중 오류 주입 비율")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", default=TURN_MODE_CONVERSATIONAL, choices=[TURN_MODE_CONVERSATIONAL, TURN_MODE_PARALLEL])
+    parser.add_argument("--no-stream", action="store_true", help="스트리밍 없이 응답 전체를 한 번에 받음")
+    parser.add_argument("--policy", default=POLICY_WEIGHTED, choices=POLICIES, help="발언자 선택 방식")
+    parser.add_argument("--speculate", type=float, metavar="MAX_SHARE", help="입력 중 추측 생성을 켜고 사용량 비중 상한을 지정 (예: 0.2)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="사용자 메시지 사이의 입력 시간(초)")
+    parser.add_argument("--json", help="측정 결과 전체를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    model = FakeGenerativeModel(
+        latency=LatencyProfile(args.latency, args.latency_median, args.latency_spread),
+        chunk_interval=args.chunk_interval,
+        error_rate=args.error_rate,
+        stream_error_rate=args.stream_error_rate,
+        seed=args.seed,
+    )
+    # 앱과 같은 클라이언트 계층을 거치도록 감쌈 (주입된 일시적 오류는 재시도됨)
+    model = ModelClient(model, retry=RetryPolicy(base_delay=args.latency_median / 2, rng=random.Random(args.seed)))
+    personas = load_personas(os.path.join(APP_DIR, "personas.json"))
+
+    user_turns = [DEFAULT_USER_TURNS[i % len(DEFAULT_USER_TURNS)] for i in range(args.turns)]
+    speculation = Speculator(max_share=args.speculate) if args.speculate else None
+    metrics = CallMetrics()
+    meetings = []
+    for i in range(args.meetings):
+        # 회의마다 주제를 달리해 응답 캐시가 다른 회의의 결과를 재사용하지 않도록 함
+        meetings.append(run_meeting(
+            model,
+            personas,
+            f"{args.topic} #{i + 1}",
+            user_turns,
+            seed=args.seed + i,
+            stream_responses=not args.no_stream,
+            turn_mode=args.mode,
+            speculation=speculation,
+            think_time=args.think_time,
+            policy=args.policy,
+            metrics=metrics,
+        ))
+
+    report = build_report(meetings)
+    # 턴 엔진의 추측 응답 사용/폐기 수와 적중률 등 등록된 카운터
+    report.update(metrics.counters())
+    if speculation is not None:
+        report.update({f"speculation_{key}": value for key, value in speculation.snapshot().items()})
+    for key, value in report.items():
+        print(f"{key:>36}: {value:.3f}" if isinstance(value, float) else f"{key:>36}: {value}")
+
+    # 호출 위치별 시간과 토큰
+    calls = metrics.summary()
+    print(f"\n{'call_site':>14} {'calls':>6} {'wall_p50':>9} {'wall_p95':>9} {'ttft_p50':>9} {'prompt_tok':>10} {'cache_hit':>9}")
+    for row in calls:
+        print(f"{row['call_site']:>14} {row['calls']:>6} {row['wall_p50']:>9.3f} {row['wall_p95']:>9.3f} "
+              f"{row['ttft_p50']:>9.3f} {row['prompt_tokens_avg']:>10.0f} {row['cache_hit_rate']:>9.0%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"report": report, "calls": calls, "meetings": meetings}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
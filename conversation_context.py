@@ -0,0 +1,157 @@
+"""프롬프트에 넣을 대화 기록을 증분으로 관리하는 컨텍스트 관리자."""
+import re
+import threading
+
+from prompt_templates import History
+
+_HANGUL_PATTERN = re.compile(r"[가-힣]")
+
+
+def estimate_tokens(text):
+    """대략적인 토큰 수를 추정합니다. (한글은 글자당 1토큰, 그 외는 4글자당 1토큰)"""
+    hangul = len(_HANGUL_PATTERN.findall(text))
+    return hangul + (len(text) - hangul) // 4 + 1
+
+
+def render_message(msg):
+    """메시지 하나를 프롬프트용 한 줄로 변환합니다."""
+    return f"{msg['role']}: {msg['content']}"
+
+
+class ConversationContext:
+    """
+    대화 기록을 한 줄씩 증분 렌더링해 보관하고, 프롬프트에는 토큰 예산 안의 최근 구간과
+    그 이전 대화의 누적 요약만 넣습니다. 요약은 최근 구간 밖으로 밀려난 메시지가
+    summary_every개 쌓일 때마다 백그라운드에서 갱신됩니다.
+
+    요약에 반영되고 최근 구간에서도 벗어난 앞쪽 줄은 메모리에서 버리므로, 회의가 길어져도 보관하는 줄 수가
+    늘어나지 않습니다. 줄 인덱스(summarized_upto 등)는 버린 줄을 포함한 회의 전체 기준입니다.
+
+    summarize_fn(previous_summary, lines)는 워커 스레드에서 실행되므로 Streamlit을 호출하면 안 됩니다.
+    """
+
+    def __init__(self, token_budget=3000, max_tokens=None, summary_every=6, summarize_fn=None, executor=None):
+        self.token_budget = token_budget
+        # 요약이 늦어질 때 최근 구간을 늘릴 수 있는 상한
+        self.max_tokens = max_tokens or token_budget * 2
+        self.summary_every = summary_every
+        self.summarize_fn = summarize_fn
+        self.executor = executor
+        # 이미 끝난 Future의 콜백은 락을 잡은 스레드에서 바로 실행되므로 재진입 가능한 락 사용
+        self._lock = threading.RLock()
+        self._generation = 0 # 회의가 초기화되면 진행 중인 요약 결과를 버리기 위한 세대 번호
+        self.reset()
+
+    def reset(self):
+        """회의가 새로 시작될 때 모든 상태를 비웁니다."""
+        with self._lock:
+            self.lines = []
+            self.line_tokens = []
+            self.summary = ""
+            self.summarized_upto = 0 # 요약에 반영된 줄 수
+            self.offset = 0 # 메모리에서 버린 앞쪽 줄 수
+            self.last_error = None
+            self._generation += 1
+            self._pending = None
+
+    def append(self, msg):
+        """메시지 하나를 렌더링해 추가합니다."""
+        line = render_message(msg)
+        with self._lock:
+            self.lines.append(line)
+            self.line_tokens.append(estimate_tokens(line))
+
+    def sync(self, chat_history):
+        """chat_history에서 아직 반영되지 않은 메시지만 추가하고, 필요하면 요약 갱신을 시작합니다."""
+        # 요약 반영(_apply_summary)이 다른 스레드에서 offset과 lines를 함께 바꾸므로 락 안에서 읽음
+        with self._lock:
+            if len(chat_history) < self.offset + len(self.lines):
+                # 기록이 줄었다면 회의가 초기화된 것
+                self.reset()
+            for msg in chat_history[self.offset + len(self.lines):]:
+                self.append(msg)
+            self.maybe_refresh_summary()
+
+    def release(self):
+        """
+        보관한 줄을 모두 버립니다. 요약은 남기고, 다음 sync() 때 요약되지 않았거나 최근 구간에 드는 메시지만
+        대화 기록(저장소)에서 다시 읽어 같은 상태로 되돌립니다.
+        """
+        with self._lock:
+            self.offset = min(self.summarized_upto, self._window_start())
+            self.lines = []
+            self.line_tokens = []
+
+    def _window_start(self, extra_tokens=0):
+        """토큰 예산 안에 들어오는 최근 구간의 시작 인덱스를 계산합니다."""
+        tokens = self.line_tokens
+        offset = self.offset
+        total = extra_tokens
+        start = offset + len(self.lines)
+        while start > offset and total + tokens[start - 1 - offset] <= self.token_budget:
+            start -= 1
+            total += tokens[start - offset]
+        # 요약이 아직 따라오지 못한 구간은 상한 안에서 최근 구간에 포함
+        while start > self.summarized_upto and total + tokens[start - 1 - offset] <= self.max_tokens:
+            start -= 1
+            total += tokens[start - offset]
+        return start
+
+    def _trim(self):
+        """요약에 반영되었고 최근 구간 밖인 앞쪽 줄을 버립니다. 최근 구간의 시작은 뒤로만 움직이므로 다시 쓰이지 않습니다."""
+        cut = min(self.summarized_upto, self._window_start()) - self.offset
+        if cut >= self.summary_every:
+            del self.lines[:cut]
+            del self.line_tokens[:cut]
+            self.offset += cut
+
+    def render_messages(self, extra_messages=()):
+        """요약과 최근 구간을 메시지(줄) 단위로 담은 History를 반환합니다. 요약이 있으면 앞에 요약 항목을 둡니다."""
+        extra_lines = [render_message(msg) for msg in extra_messages]
+        extra_tokens = sum(estimate_tokens(line) for line in extra_lines)
+        with self._lock:
+            start = self._window_start(extra_tokens)
+            window = self.lines[start - self.offset:] + extra_lines
+            summary = self.summary
+        if not summary:
+            return History(window)
+        return History(["[이전 대화 요약]\n" + summary, "[최근 대화]"] + window)
+
+    def render(self, extra_messages=()):
+        """요약과 최근 구간을 합친 프롬프트용 대화 기록 텍스트를 반환합니다."""
+        return str(self.render_messages(extra_messages))
+
+    def prompt_tokens(self):
+        """현재 render() 결과의 추정 토큰 수를 반환합니다."""
+        return estimate_tokens(self.render())
+
+    def maybe_refresh_summary(self):
+        """최근 구간 밖의 요약되지 않은 메시지가 summary_every개 이상이면 백그라운드 요약을 시작합니다."""
+        if not self.summarize_fn or not self.executor:
+            return
+        with self._lock:
+            if self._pending is not None:
+                return
+            start = self._window_start()
+            if start - self.summarized_upto < self.summary_every:
+                return
+            lines = self.lines[self.summarized_upto - self.offset:start - self.offset]
+            previous_summary = self.summary
+            upto = start
+            generation = self._generation
+            self._pending = self.executor.submit(self.summarize_fn, previous_summary, lines)
+            self._pending.add_done_callback(lambda future: self._apply_summary(future, upto, generation))
+
+    def _apply_summary(self, future, upto, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._pending = None
+            try:
+                self.summary = future.result()
+                self.summarized_upto = upto
+                self.last_error = None
+                self._trim()
+            except Exception as e:
+                # 기존 요약을 유지하고 다음 갱신 때 다시 시도
+                self.last_error = e
@@ -0,0 +1,244 @@
+"""
+모델 호출별 계측.
+
+호출 위치(대상 분석, 페르소나 발언, 요약 등)마다 전체 소요 시간, 첫 토큰까지의 시간, 프롬프트/응답 토큰 수
+(usage_metadata, 없으면 추정값), 캐시 적중 여부, 재시도 횟수를 기록합니다. 기록은 JSON 줄 로그,
+Prometheus 텍스트 형식, CSV로 내보낼 수 있으며 세션별·프로세스 전체 백분위수를 계산합니다.
+턴 엔진의 추측 응답 사용 수처럼 호출 단위가 아닌 카운터도 등록해 두면 함께 내보냅니다.
+"""
+import csv
+import io
+import json
+import math
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from conversation_context import estimate_tokens
+
+# 호출 위치
+CALL_TARGET = "target" # 지목 대상 분석
+CALL_PERSONA = "persona" # 페르소나 발언
+CALL_RECONCILE = "reconcile" # 입장 초안을 바탕으로 한 페르소나 발언
+CALL_STANCE = "stance" # 입장 초안 (추측 생성)
+CALL_COMPRESS = "compress" # 대화 누적 요약
+CALL_SUMMARY = "summary" # 회의 종료 요약
+CALL_CHUNK_SUMMARY = "chunk_summary" # 회의 요약용 구간 요약 (증분 map-reduce)
+CALL_AUTO_USER = "auto_user" # 일괄 실행의 자동 사용자 발언
+CALL_GENERATE = "generate" # 그 밖의 호출
+
+CSV_FIELDS = [
+    "ts", "session", "call_site", "persona", "cache", "stream", "wall_time", "ttft",
+    "prompt_tokens", "output_tokens", "tokens_estimated", "retries", "error",
+]
+
+
+def percentile(values, q):
+    """nearest-rank 방식의 백분위수를 계산합니다."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def usage_tokens(response):
+    """응답의 usage_metadata에서 (프롬프트 토큰, 응답 토큰)을 읽습니다. 없으면 (None, None)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+class CallTimer:
+    """호출 하나를 측정합니다. 스트림이면 첫 청크를 받았을 때 first_token()을 호출합니다."""
+
+    def __init__(self, metrics, session, call_site, persona=None, stream=False):
+        self.metrics = metrics
+        self.record = {
+            "ts": time.time(), "session": session, "call_site": call_site, "persona": persona,
+            "cache": "miss", "stream": stream, "wall_time": None, "ttft": None,
+            "prompt_tokens": None, "output_tokens": None, "tokens_estimated": False, "retries": 0, "error": None,
+        }
+        self._start = time.perf_counter()
+
+    def first_token(self):
+        if self.record["ttft"] is None:
+            self.record["ttft"] = time.perf_counter() - self._start
+
+    def finish(self, prompt, text="", response=None, cache="miss", retries=0, error=None):
+        record = self.record
+        record["wall_time"] = time.perf_counter() - self._start
+        if record["ttft"] is None and error is None:
+            record["ttft"] = record["wall_time"]
+        record["cache"] = cache
+        record["retries"] = retries
+        record["error"] = repr(error) if error is not None else None
+        prompt_tokens, output_tokens = usage_tokens(response)
+        if prompt_tokens is None:
+            # 캐시 적중이나 usage_metadata가 없는 응답은 추정값 사용
+            prompt_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text) if text else 0
+            record["tokens_estimated"] = True
+        record["prompt_tokens"] = prompt_tokens
+        record["output_tokens"] = output_tokens
+        self.metrics.add(record)
+
+
+class CallMetrics:
+    """
+    최근 max_records개의 호출 기록을 보관하는 프로세스 공유 계측 저장소. 여러 스레드가 함께 사용할 수 있습니다.
+    백분위수는 보관 중인 최근 기록으로, 누적 합계(totals)는 프로세스 시작부터 계산합니다.
+    log_path를 주면 기록마다 JSON 한 줄을 추가합니다. 로그 파일은 close()나 with 블록이 끝날 때 닫힙니다.
+    """
+
+    def __init__(self, max_records=5000, log_path=None):
+        self.records = deque(maxlen=max_records)
+        self.totals = {} # 호출 위치 -> 누적 합계
+        self._counter_sources = {} # 이름 -> 카운터 dict를 반환하는 함수
+        self._lock = threading.Lock()
+        self._log = open(log_path, "a", encoding="utf-8", buffering=1) if log_path else None
+
+    def close(self):
+        """JSON 로그 파일을 닫습니다. 닫은 뒤의 기록은 메모리에만 남습니다."""
+        with self._lock:
+            log, self._log = self._log, None
+        if log is not None:
+            log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def timer(self, session, call_site, persona=None, stream=False):
+        return CallTimer(self, session, call_site, persona, stream)
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+            totals = self.totals.setdefault(record["call_site"], {
+                "calls": 0, "seconds": 0.0, "prompt_tokens": 0, "output_tokens": 0, "cache_hits": 0, "retries": 0, "errors": 0,
+            })
+            totals["calls"] += 1
+            totals["seconds"] += record["wall_time"]
+            totals["prompt_tokens"] += record["prompt_tokens"]
+            totals["output_tokens"] += record["output_tokens"]
+            totals["cache_hits"] += record["cache"] == "hit"
+            totals["retries"] += record["retries"]
+            totals["errors"] += record["error"] is not None
+            if self._log is not None:
+                self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def register_counters(self, name, source):
+        """호출 기록이 아닌 카운터 묶음을 등록합니다. source()는 {이름: 숫자} dict를 반환해야 합니다."""
+        with self._lock:
+            self._counter_sources[name] = source
+
+    def counters(self):
+        """등록된 카운터를 {"묶음_이름": 값} 형태로 모아 반환합니다."""
+        with self._lock:
+            sources = list(self._counter_sources.items())
+        return {f"{name}_{key}": value for name, source in sources for key, value in source().items()}
+
+    def snapshot(self, session=None):
+        with self._lock:
+            records = list(self.records)
+        if session is not None:
+            records = [r for r in records if r["session"] == session]
+        return records
+
+    def _group(self, session=None):
+        groups = {}
+        for record in self.snapshot(session):
+            groups.setdefault(record["call_site"], []).append(record)
+        return groups
+
+    def summary(self, session=None):
+        """호출 위치별 호출 수, 시간 백분위수, 평균 토큰 수, 캐시 적중률, 재시도 수를 집계합니다."""
+        rows = []
+        for call_site, records in sorted(self._group(session).items()):
+            wall = [r["wall_time"] for r in records]
+            ttft = [r["ttft"] for r in records if r["ttft"] is not None and r["cache"] == "miss"]
+            rows.append({
+                "call_site": call_site,
+                "calls": len(records),
+                "wall_p50": percentile(wall, 50),
+                "wall_p95": percentile(wall, 95),
+                "ttft_p50": percentile(ttft, 50),
+                "ttft_p95": percentile(ttft, 95),
+                "prompt_tokens_avg": sum(r["prompt_tokens"] for r in records) / len(records),
+                "output_tokens_avg": sum(r["output_tokens"] for r in records) / len(records),
+                "cache_hit_rate": sum(r["cache"] == "hit" for r in records) / len(records),
+                "retries": sum(r["retries"] for r in records),
+                "errors": sum(r["error"] is not None for r in records),
+            })
+        return rows
+
+    def to_csv(self, session=None):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for record in self.snapshot(session):
+            writer.writerow(record)
+        return buffer.getvalue()
+
+    def to_prometheus(self):
+        """호출 위치별 요약을 Prometheus 텍스트 형식으로 만듭니다. (분위수는 최근 기록, 합계는 누적값)"""
+        lines = [
+            "# TYPE meeting_model_call_seconds summary",
+            "# TYPE meeting_model_ttft_seconds summary",
+            "# TYPE meeting_model_tokens_total counter",
+            "# TYPE meeting_model_cache_hits_total counter",
+            "# TYPE meeting_model_retries_total counter",
+            "# TYPE meeting_model_errors_total counter",
+            "# TYPE meeting_counter gauge",
+        ]
+        groups = self._group()
+        with self._lock:
+            totals = {call_site: dict(values) for call_site, values in self.totals.items()}
+        for call_site, total in sorted(totals.items()):
+            label = f'call_site="{call_site}"'
+            records = groups.get(call_site, [])
+            wall = [r["wall_time"] for r in records]
+            ttft = [r["ttft"] for r in records if r["ttft"] is not None and r["cache"] == "miss"]
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'meeting_model_call_seconds{{{label},quantile="{q}"}} {percentile(wall, q * 100):.6f}')
+                lines.append(f'meeting_model_ttft_seconds{{{label},quantile="{q}"}} {percentile(ttft, q * 100):.6f}')
+            lines.append(f"meeting_model_call_seconds_sum{{{label}}} {total['seconds']:.6f}")
+            lines.append(f"meeting_model_call_seconds_count{{{label}}} {total['calls']}")
+            lines.append(f'meeting_model_tokens_total{{{label},kind="prompt"}} {total["prompt_tokens"]}')
+            lines.append(f'meeting_model_tokens_total{{{label},kind="output"}} {total["output_tokens"]}')
+            lines.append(f"meeting_model_cache_hits_total{{{label}}} {total['cache_hits']}")
+            lines.append(f"meeting_model_retries_total{{{label}}} {total['retries']}")
+            lines.append(f"meeting_model_errors_total{{{label}}} {total['errors']}")
+        for name, value in sorted(self.counters().items()):
+            lines.append(f'meeting_counter{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def serve_prometheus(metrics, port, host="127.0.0.1"):
+    """
+    /metrics 경로로 Prometheus 텍스트를 제공하는 서버를 백그라운드 스레드에서 시작합니다.
+    기본으로는 이 컴퓨터에서만 접근할 수 있으며, 외부에 공개하려면 host를 명시합니다. (예: "0.0.0.0")
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # 요청마다 표준 오류에 출력하지 않음
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,239 @@
+"""
+가짜 모델로 여러 회의 세션을 동시에 진행해 한 프로세스가 많은 동시 회의를 버티는지 확인하는 부하 테스트.
+
+앱과 같은 구성(공유 모델 클라이언트·턴 엔진·응답 캐시·회의 저장소·세션 풀)으로 N개의 세션을 스레드에서 동시에
+실행합니다. 각 사용자는 입력 시간(think time)만큼 기다린 뒤 메시지를 보내고, 모든 회의가 끝나면 턴 지연 시간,
+처리량, 세션당 메모리(쉬는 세션을 정리하기 전/후)를 출력합니다. 세션당 메모리는 공유 자원(캐시·계측·명단·엔진 등)에서
+닿는 객체를 빼고 세션 객체에서만 닿는 객체의 크기를 더한 값입니다. Streamlit이나 API 키 없이 실행됩니다.
+
+사용 예:
+    python load_test.py --sessions 200 --turns 20 --think-time 2
+    python load_test.py --sessions 50 --turns 60 --max-messages 40 --idle-timeout 1 --latency-median 0.05
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import DEFAULT_USER_TURNS
+from instrumentation import CallMetrics, percentile
+from meeting import MeetingSession, MeetingCallbacks, load_personas
+from meeting_store import MeetingStore
+from model_client import ModelClient, RetryPolicy
+from model_provider import FakeGenerativeModel, LatencyProfile
+from response_cache import MemoryCache
+from session_pool import SessionPool
+from turn_engine import TurnEngine
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 객체 그래프를 따라갈 때 멈추는 타입 (모듈 전역이나 클래스를 따라가면 프로세스 전체가 잡힘)
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.CodeType)
+
+
+def reachable(roots, exclude=frozenset()):
+    """roots에서 참조를 따라 닿는 객체를 id -> 객체로 반환합니다. exclude에 든 id에서는 멈춥니다."""
+    seen = {}
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or id(obj) in exclude or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen[id(obj)] = obj
+        stack.extend(gc.get_referents(obj))
+    return seen
+
+
+def session_memory(sessions, shared):
+    """공유 자원에서 닿는 객체를 뺀, 세션들에서만 닿는 객체 크기의 합(바이트)과 공유 자원 크기의 합을 반환합니다."""
+    shared_objects = reachable(shared.values())
+    owned = reachable(sessions, exclude=shared_objects.keys())
+    return sum(sys.getsizeof(obj) for obj in owned.values()), sum(sys.getsizeof(obj) for obj in shared_objects.values())
+
+
+class _CountingCallbacks(MeetingCallbacks):
+    """세션에서 발생한 오류와 경고 수만 셉니다."""
+
+    def __init__(self):
+        self.errors = 0
+        self.warnings = 0
+
+    def on_error(self, message):
+        self.errors += 1
+
+    def on_warning(self, message):
+        self.warnings += 1
+
+
+def run_session(index, shared, args):
+    """회의 하나를 진행하고 (세션, 측정값)을 반환합니다. 세션은 끝난 뒤에도 화면에 남아 있는 것처럼 유지합니다."""
+    rng = random.Random(args.seed + index)
+    # 모든 사용자가 동시에 들어오지 않도록 ramp_up 동안 나눠서 시작
+    time.sleep(rng.uniform(0, args.ramp_up))
+    callbacks = _CountingCallbacks()
+    session = MeetingSession(
+        shared["model"],
+        shared["personas"],
+        callbacks=callbacks,
+        engine=shared["engine"],
+        cache=shared["cache"],
+        store=shared["store"],
+        metrics=shared["metrics"],
+        stream_responses=not args.no_stream,
+        max_history_in_memory=args.max_messages,
+        rng=rng,
+    )
+    pool = shared["pool"]
+    pool.touch(session)
+    # 세션마다 주제를 달리해 응답 캐시가 다른 세션의 결과를 재사용하지 않도록 함
+    session.start_meeting(f"{args.topic} #{index + 1}")
+
+    latencies = []
+    for turn in range(args.turns):
+        time.sleep(rng.uniform(0.5, 1.5) * args.think_time)
+        pool.touch(session)
+        start = time.perf_counter()
+        session.handle_user_message(DEFAULT_USER_TURNS[turn % len(DEFAULT_USER_TURNS)])
+        session.generate_persona_responses()
+        latencies.append(time.perf_counter() - start)
+
+    summary_latency = None
+    if not args.no_summary:
+        pool.touch(session)
+        start = time.perf_counter()
+        session.end_meeting()
+        summary_latency = time.perf_counter() - start
+    return session, {
+        "turn_latencies": latencies,
+        "summary_latency": summary_latency,
+        "messages": len(session.state.chat_history),
+        "errors": callbacks.errors,
+        "warnings": callbacks.warnings,
+    }
+
+
+def build_report(results, elapsed, memory):
+    """세션별 측정값을 백분위수 보고서로 집계합니다."""
+    latencies = [latency for result in results for latency in result["turn_latencies"]]
+    summaries = [result["summary_latency"] for result in results if result["summary_latency"] is not None]
+    sessions = max(1, len(results))
+    return {
+        "sessions": len(results),
+        "turns": len(latencies),
+        "elapsed_seconds": elapsed,
+        "turns_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "turn_latency_p50": percentile(latencies, 50),
+        "turn_latency_p95": percentile(latencies, 95),
+        "turn_latency_p99": percentile(latencies, 99),
+        "summary_latency_p50": percentile(summaries, 50),
+        "messages_per_session": statistics.mean(result["messages"] for result in results) if results else 0.0,
+        "errors": sum(result["errors"] for result in results),
+        "warnings": sum(result["warnings"] for result in results),
+        "peak_memory_mb": memory["peak"] / (1024 * 1024),
+        # 프로세스 전체 증가량 (공유 캐시·계측 포함)
+        "process_retained_mb": memory["retained"] / (1024 * 1024),
+        "shared_resources_kb": memory["shared"] / 1024,
+        # 회의를 마친 세션이 남아 있는 동안 세션 객체만의 세션당 메모리 (쉬는 세션 정리 전/후)
+        "session_kb_per_session": memory["session"] / sessions / 1024,
+        "session_kb_per_session_after_eviction": memory["session_after_eviction"] / sessions / 1024,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 Gemini 모델로 동시 회의 세션 부하를 측정합니다.")
+    parser.add_argument("--sessions", type=int, default=100, help="동시에 진행할 회의 세션 수")
+    parser.add_argument("--turns", type=int, default=10, help="세션당 사용자 메시지 수")
+    parser.add_argument("--think-time", type=float, default=1.0, help="사용자 메시지 사이의 평균 입력 시간(초)")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="세션들이 나눠서 시작하는 시간(초)")
+    parser.add_argument("--topic", default="여성 패션 플랫폼의 하반기 고객 유지 전략")
+    parser.add_argument("--latency-median", type=float, default=0.3, help="호출당 첫 토큰까지의 지연 시간 중앙값(초)")
+    parser.add_argument("--latency-spread", type=float, default=0.4)
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="스트리밍 청크 간격(초)")
+    parser.add_argument("--workers", type=int, default=32, help="공유 턴 엔진의 워커 스레드 수")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="모델로 나가는 동시 요청 수 상한 (0이면 제한 없음)")
+    parser.add_argument("--max-messages", type=int, default=200, help="세션마다 메모리에 두는 최근 메시지 수")
+    parser.add_argument("--idle-timeout", type=float, default=30.0, help="이 시간(초) 동안 쉰 세션의 대화 기록을 디스크로 내보냄")
+    parser.add_argument("--max-active", type=int, default=200, help="메모리에 올라와 있을 수 있는 세션 수")
+    parser.add_argument("--store", help="회의 저장소 경로 (기본: 임시 디렉터리)")
+    parser.add_argument("--no-stream", action="store_true", help="스트리밍 없이 응답 전체를 한 번에 받음")
+    parser.add_argument("--no-summary", action="store_true", help="회의 종료 요약을 생략")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="측정 결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    model = FakeGenerativeModel(
+        latency=LatencyProfile("lognormal", args.latency_median, args.latency_spread),
+        chunk_interval=args.chunk_interval,
+        seed=args.seed,
+    )
+    temp_dir = None
+    if not args.store:
+        temp_dir = tempfile.TemporaryDirectory()
+        args.store = os.path.join(temp_dir.name, "meetings.sqlite3")
+    pool = SessionPool(idle_timeout=args.idle_timeout, max_active=args.max_active, sweep_interval=min(30.0, args.idle_timeout))
+    shared = {
+        # 앱과 같이 모든 세션이 하나의 클라이언트·턴 엔진·캐시·저장소·세션 풀을 공유
+        "model": ModelClient(
+            model,
+            retry=RetryPolicy(base_delay=args.latency_median / 2, rng=random.Random(args.seed)),
+            max_concurrency=args.max_concurrency or None,
+        ),
+        "personas": load_personas(os.path.join(APP_DIR, "personas.json")),
+        "engine": TurnEngine(max_workers=args.workers, call_timeout=60.0),
+        "cache": MemoryCache(),
+        "store": MeetingStore(args.store),
+        "metrics": CallMetrics(),
+        "pool": pool,
+    }
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        futures = [executor.submit(run_session, i, shared, args) for i in range(args.sessions)]
+        outcomes = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    # outcomes가 세션을 붙잡고 있으므로 끝난 회의가 화면에 남아 있는 상태의 메모리를 잼
+    results = [result for _, result in outcomes]
+    sessions = [session for session, _ in outcomes]
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    session_bytes, shared_bytes = session_memory(sessions, shared)
+    # 모든 세션이 쉬고 있다고 보고 정리
+    pool.sweep(pool.clock() + args.idle_timeout)
+    session_after_eviction, _ = session_memory(sessions, shared)
+
+    report = build_report(results, elapsed, {
+        "peak": peak - baseline,
+        "retained": retained,
+        "shared": shared_bytes,
+        "session": session_bytes,
+        "session_after_eviction": session_after_eviction,
+    })
+    report.update({f"pool_{key}": value for key, value in pool.snapshot().items()})
+    report.update({f"client_{key}": value for key, value in shared["model"].stats.items()})
+    for key, value in report.items():
+        print(f"{key:>40}: {value:.3f}" if isinstance(value, float) else f"{key:>40}: {value}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"report": report, "sessions": results}, f, ensure_ascii=False, indent=2)
+    shared["store"].close()
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
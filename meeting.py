@@ -0,0 +1,847 @@
+"""
+Streamlit과 분리된 회의 진행 엔진.
+
+회의 상태(MeetingState)와 진행 로직(MeetingSession)을 담고 있으며, UI 이벤트는 MeetingCallbacks로만
+전달합니다. 임포트 시 부수 효과가 없고 외부 라이브러리를 불러오지 않으므로 헤드리스 실행,
+일괄 시뮬레이션, 부하 테스트에서 그대로 사용할 수 있습니다.
+"""
+import contextlib
+import random
+import threading
+import uuid
+
+from conversation_context import ConversationContext, estimate_tokens
+from instrumentation import (
+    CallMetrics, CALL_GENERATE, CALL_TARGET, CALL_PERSONA, CALL_RECONCILE, CALL_STANCE, CALL_COMPRESS, CALL_SUMMARY,
+    CALL_CHUNK_SUMMARY
+)
+from meeting_store import iter_markdown_log
+from meeting_summarizer import IncrementalSummarizer
+from persona_registry import PersonaRegistry, PROMPT_INTRO_TEMPLATE
+from prompt_templates import History, PromptTemplate, prompt_text, prompt_for
+from response_cache import MemoryCache, make_cache_key
+from speaker_scheduler import SpeakerScheduler
+from spilled_history import SpilledHistory
+from target_resolver import TargetResolver
+from turn_engine import TurnEngine, CallTimeoutError, CallCancelledError, TURN_MODE_CONVERSATIONAL
+
+MODEL_NAME = "gemini-2.0-flash" # PRD 명시 모델
+DEFAULT_USER_NAME = "사용자"
+STANCE_OUTPUT_TOKENS = 80 # 입장 초안 응답의 예상 토큰 수 (추측 사용량 예약용)
+RECONCILE_RECENT_MESSAGES = 6 # 초안으로 최종 발언을 만들 때 프롬프트에 넣는 최근 대화 메시지 수
+
+
+def load_personas(path="personas.json"):
+    """personas.json 파일에서 페르소나 명단을 로드합니다. 파일이 바뀌면 다시 읽습니다. 실패 시 예외를 그대로 전달합니다."""
+    return PersonaRegistry.from_file(path)
+
+
+# --- 프롬프트 ---
+# 바뀌지 않는 지시 사항은 system(페르소나마다 한 번만 만듦), 회의 주제는 prefix, 대화 기록은 parts에 둡니다.
+# 지시 사항을 system으로 옮기면 대화 기록 뒤에 있던 지시도 앞으로 오지만, 턴마다 같은 앞부분이 되어 접두부 캐시를
+# 재사용할 수 있습니다. 지목 대상 판별과 회의 요약은 지시 순서가 답의 형식을 좌우하므로 기존 순서를 그대로 둡니다.
+# 대화 기록("{history}" 파트)은 History로 넘겨 사용자 content 안에서 메시지마다 part 하나로 보냅니다.
+
+PERSONA_TEMPLATE = PromptTemplate(
+    system="""{intro}
+기존의 대화에 순응하기 보다 의식적으로 반대하는 의견을 제시하지만, 타당한 의견에 대해서는 반대를 멈추세요.
+당신의 성향에 일치하는 개념을 제시하고 대화하지만, 직접적으로 MBTI를 드러내지는 않습니다.
+지나치게 추상적이거나 모호한 답변을 피하고 실제 비즈니스에서 발생할 수 있는 상황을 가정하여 구체성 있는 발언을 하세요.
+당신의 성향과 성별을 고려하여 말투를 적절히 사용하세요. 대화라는 점으로 고려해 캐주얼한 말투를 사용해도 좋습니다.""",
+    prefix=["현재 회의 주제는 '{topic}'입니다."],
+    parts=[
+        "지금까지의 대화 내용은 다음과 같습니다:\n--- 대화 시작 ---",
+        "{history}",
+        "--- 대화 끝 ---",
+        "이제 당신의 입장에서 회의 주제에 대해 간결하게 1~3 문장으로 발언해주세요.",
+    ],
+)
+
+TARGET_TEMPLATE = PromptTemplate(
+    system="",
+    parts=[
+        '사용자의 다음 메시지를 분석해주세요:\n사용자 메시지: "{message}"',
+        "최근 대화 내용은 다음과 같습니다:",
+        "{history}",
+        "회의 참석자 목록은 다음과 같습니다: {names}",
+        """위 사용자 메시지가 다음 중 하나에 해당합니까?
+1. 회의 참석자 ({names}) 중 특정 한 명의 이름을 명시적으로 부르는 경우
+2. 위에 제시된 '최근 대화 내용' 중 특정 참석자의 발언을 명확히 지칭하거나 이어가는 경우
+
+- 만약 그렇다면, 해당 참석자의 이름만 정확히 응답해주세요. (예: {names} 중 하나)
+- 그렇지 않거나, 누구를 지칭하는지 애매하거나, 여러 명을 지칭하거나, 아무도 지칭하지 않는다면 "None"이라고 응답해주세요.""",
+        '응답은 반드시 참석자 이름 또는 "None" 중 하나여야 합니다. 다른 설명이나 부연은 절대 추가하지 마십시오.',
+    ],
+)
+
+COMPRESS_TEMPLATE = PromptTemplate(
+    system="""이전 요약과 이어진 대화를 합쳐 하나의 요약으로 다시 작성해주세요.
+발언자별 핵심 주장, 합의된 내용, 남은 쟁점이 드러나도록 10문장 이내로 간결하게 작성하고, 다른 설명은 덧붙이지 마세요.""",
+    prefix=["다음은 '{topic}' 회의의 이전 요약과 그 뒤에 이어진 대화입니다."],
+    parts=["--- 이전 요약 ---\n{previous_summary}\n--- 이어진 대화 ---", "{history}", "--- 끝 ---"],
+)
+
+STANCE_TEMPLATE = PromptTemplate(
+    system="""당신은 '{name}'라는 이름의 전략 전문가이며, 성향은 {mbti}입니다.
+기존 의견에 반대할 지점이 있다면 포함하고, 메모 내용만 작성하세요.""",
+    prefix=["현재 회의 주제는 '{topic}'입니다."],
+    parts=[
+        "지금까지의 대화 내용은 다음과 같습니다:\n--- 대화 시작 ---",
+        "{history}",
+        "--- 대화 끝 ---",
+        "다음 발언에서 당신이 밀고 나갈 핵심 입장과 근거를 2문장 이내로 메모해주세요.",
+    ],
+)
+
+RECONCILE_TEMPLATE = PromptTemplate(
+    system="""당신은 '{name}'라는 이름의 전략 전문가이며, 성향은 {mbti}입니다.
+구체적인 비즈니스 상황을 가정하고, 캐주얼한 대화체를 사용해도 좋으며, MBTI를 직접 드러내지는 마세요.""",
+    prefix=["회의 주제는 '{topic}'입니다."],
+    parts=[
+        "미리 정리해 둔 당신의 입장: {stance}\n--- 최근 대화 ---",
+        "{history}",
+        "--- 끝 ---",
+        "마지막 발언에 답하면서 당신의 입장을 1~3 문장으로 말해주세요. 마지막 발언과 맞지 않는 입장은 버리고 새로 판단하세요.",
+    ],
+)
+
+SUMMARY_TEMPLATE = PromptTemplate(
+    system="",
+    prefix=["다음은 '{topic}'에 대한 회의 기록입니다."],
+    parts=[
+        "--- 회의 기록 시작 ---",
+        "{history}",
+        "--- 회의 기록 끝 ---",
+        """위 회의 기록을 바탕으로 다음 형식에 맞춰 회의를 평가해주세요
+
+# Agenda
+- (회의 주제를 명확히 기술)
+
+# Discussion
+- (주요 논의 사항들을 간결하게 요약)
+
+# Feedback
+- (회의 결과와 논의 방식에 대해 목표달성과 효율성 관점에서 평가하고 개선 사항을 제시)
+
+결과는 마크다운 형식으로 작성해주세요.""",
+    ],
+)
+
+CHUNK_SUMMARY_TEMPLATE = PromptTemplate(
+    system="""회의 기록의 한 구간을 요약해주세요.
+발언자별 핵심 주장, 합의된 내용, 남은 쟁점이 드러나도록 5문장 이내로 간결하게 작성하고, 다른 설명은 덧붙이지 마세요.""",
+    prefix=["다음은 '{topic}' 회의 기록의 일부입니다."],
+    parts=["--- 회의 기록 일부 ---", "{history}", "--- 끝 ---"],
+)
+
+MERGE_SUMMARY_TEMPLATE = PromptTemplate(
+    system="""회의 기록의 연속된 구간 요약들을 시간 순서를 유지하며 하나의 요약으로 합쳐주세요.
+발언자별 핵심 주장, 합의된 내용, 남은 쟁점이 드러나도록 8문장 이내로 간결하게 작성하고, 다른 설명은 덧붙이지 마세요.""",
+    prefix=["다음은 '{topic}' 회의의 구간별 요약입니다."],
+    parts=["--- 구간 요약 ---\n{summaries}\n--- 끝 ---"],
+)
+
+
+def persona_intro(persona):
+    """페르소나 자기소개 문장. 명단에서 읽은 페르소나는 미리 만들어 둔 것을 사용합니다."""
+    intro = persona.get("prompt_intro")
+    if intro is None:
+        intro = PROMPT_INTRO_TEMPLATE.format(name=persona["name"], role=persona.get("role", "전략 전문가"), mbti=persona["mbti"])
+    return intro
+
+
+def build_persona_prompt(persona, history, topic):
+    """페르소나 발언 생성을 위한 프롬프트를 구성합니다. history는 History(메시지 단위) 또는 문자열입니다."""
+    return PERSONA_TEMPLATE.render({"intro": persona_intro(persona)}, topic=topic, history=history)
+
+
+def build_target_prompt(user_message, persona_names, recent_chat_history=None):
+    """사용자 메시지의 지목 대상을 판별하기 위한 프롬프트를 구성합니다."""
+    persona_names_str = ", ".join(persona_names)
+
+    if recent_chat_history:
+        history = History(f"{msg.get('role', '알 수 없음')}: {msg.get('content', '')}" for msg in recent_chat_history)
+    else:
+        history = History(["(최근 대화 내용 없음)"])
+
+    return TARGET_TEMPLATE.render(message=user_message, history=history, names=persona_names_str)
+
+
+def build_compress_prompt(topic, previous_summary, lines):
+    """이전 요약과 새로 밀려난 대화를 합쳐 누적 요약을 만드는 프롬프트를 구성합니다."""
+    return COMPRESS_TEMPLATE.render(topic=topic, previous_summary=previous_summary or "(없음)", history=History(lines))
+
+
+def build_stance_prompt(persona, history, topic):
+    """사용자의 다음 발언을 기다리는 동안 페르소나의 입장 초안을 만드는 프롬프트를 구성합니다."""
+    return STANCE_TEMPLATE.render({"name": persona["name"], "mbti": persona["mbti"]}, topic=topic, history=history)
+
+
+def build_reconcile_prompt(persona, stance, recent_history, topic):
+    """미리 준비한 입장 초안과 최근 대화만으로 최종 발언을 만드는 짧은 프롬프트를 구성합니다."""
+    return RECONCILE_TEMPLATE.render(
+        {"name": persona["name"], "mbti": persona["mbti"]}, topic=topic, stance=stance, history=recent_history
+    )
+
+
+def build_summary_prompt(topic, history):
+    """회의 종료 시 요약 프롬프트를 구성합니다."""
+    return SUMMARY_TEMPLATE.render(topic=topic, history=history)
+
+
+def build_chunk_summary_prompt(topic, lines):
+    """회의 기록 한 구간의 요약 프롬프트를 구성합니다."""
+    return CHUNK_SUMMARY_TEMPLATE.render(topic=topic, history=History(lines))
+
+
+def build_merge_summary_prompt(topic, summaries):
+    """연속된 구간 요약을 하나로 합치는 프롬프트를 구성합니다."""
+    return MERGE_SUMMARY_TEMPLATE.render(topic=topic, summaries="\n\n".join(summaries))
+
+
+# --- 상태와 UI 이벤트 ---
+
+class MeetingState:
+    """회의 한 건의 상태 (대화 기록, 주제, 턴, 요약)."""
+
+    def __init__(self, user_name=DEFAULT_USER_NAME):
+        self.meeting_topic = ""
+        self.is_meeting_started = False
+        self.chat_history = []
+        self.user_name = user_name
+        self.current_turn = "user" # 시작은 사용자 턴
+        self.meeting_summary = None # 요약 내용 저장
+
+    @property
+    def meeting_summary(self):
+        if self._load_summary is not None:
+            # 메모리에서 비운 요약은 처음 읽을 때 저장소에서 다시 가져옴
+            self._meeting_summary, self._load_summary = self._load_summary(), None
+        return self._meeting_summary
+
+    @meeting_summary.setter
+    def meeting_summary(self, summary):
+        self._meeting_summary = summary
+        self._load_summary = None
+
+    def release_summary(self, load_summary):
+        """요약을 메모리에서 비우고, 다음에 읽을 때 load_summary()로 다시 가져오게 합니다."""
+        self._meeting_summary = None
+        self._load_summary = load_summary
+
+
+class MeetingCallbacks:
+    """엔진이 UI에 알리는 이벤트. 기본 구현은 아무것도 하지 않으므로 헤드리스 실행에 그대로 사용합니다."""
+
+    def on_error(self, message):
+        pass
+
+    def on_warning(self, message):
+        pass
+
+    def status(self, message):
+        """오래 걸리는 작업 동안 진행 상태를 표시하는 컨텍스트 매니저를 반환합니다."""
+        return contextlib.nullcontext()
+
+    def on_reply_start(self, persona):
+        pass
+
+    def on_reply_chunk(self, persona, text):
+        """지금까지 받은 응답 전체(text)가 갱신될 때마다 호출됩니다."""
+
+    def on_reply_end(self, persona, text):
+        pass
+
+
+# --- 프로세스 공유 자원 (헤드리스 실행 기본값) ---
+
+_shared_lock = threading.Lock()
+_shared = {}
+
+
+def _shared_resource(name, factory):
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = factory()
+        return _shared[name]
+
+
+def default_turn_engine():
+    return _shared_resource("turn_engine", lambda: TurnEngine(max_workers=8, call_timeout=60.0))
+
+
+def default_target_resolver():
+    return _shared_resource("target_resolver", lambda: TargetResolver(threshold=0.75))
+
+
+def default_response_cache():
+    return _shared_resource("response_cache", MemoryCache)
+
+
+def default_call_metrics():
+    return _shared_resource("call_metrics", CallMetrics)
+
+
+# --- 회의 엔진 ---
+
+class MeetingSession:
+    """
+    회의 한 건을 진행하는 엔진. 상태는 state에, UI 출력은 callbacks에 분리되어 있습니다.
+    personas에는 PersonaRegistry나 페르소나 목록을 넘길 수 있으며, 파일 기반 명단은 턴마다 변경 여부를 확인합니다.
+    engine/resolver/cache/metrics를 넘기지 않으면 프로세스 공유 기본값을 사용합니다.
+    store(MeetingStore)를 넘기면 메시지가 대화에 추가되는 즉시 저장소에 기록됩니다.
+    scheduler(SpeakerScheduler)를 넘기지 않으면 적극성 비율로 발언자를 고르는 기본 스케줄러를 사용합니다.
+    speculation(Speculator)을 넘기면 사용자가 입력하는 동안 다음 턴을 미리 준비합니다. (prepare_next_turn)
+    store와 함께 max_history_in_memory를 주면 대화 기록 중 최근 그만큼만 메모리에 두고 나머지는 저장소에서 읽습니다.
+    """
+
+    def __init__(self, model, personas, state=None, callbacks=None, engine=None, resolver=None, cache=None,
+                 store=None, speculation=None, scheduler=None, metrics=None, model_name=MODEL_NAME,
+                 stream_responses=True, turn_mode=TURN_MODE_CONVERSATIONAL, context_token_budget=3000,
+                 summary_every=6, summary_chunk_size=12, summary_fan_in=4, max_history_in_memory=None, rng=None):
+        self.model = model
+        self.registry = PersonaRegistry.ensure(personas)
+        self.state = state or MeetingState()
+        self.callbacks = callbacks or MeetingCallbacks()
+        self.engine = engine or default_turn_engine()
+        self.resolver = resolver or default_target_resolver()
+        # 비어 있는 캐시도 거짓으로 평가되므로 None일 때만 기본값 사용
+        self.cache = cache if cache is not None else default_response_cache()
+        self.store = store
+        self.metrics = metrics or default_call_metrics()
+        # 호출 단위가 아닌 카운터도 같은 계측 저장소로 내보냄 (같은 자원이면 다시 등록해도 같음)
+        self.metrics.register_counters("turn_engine", self.engine.counters)
+        self.metrics.register_counters("target_resolver", self.resolver.counters)
+        self.session_id = uuid.uuid4().hex[:8] # 계측 기록에서 세션을 구분하는 id
+        self.meeting_id = None # 저장소의 회의 id
+        self._persisted = 0 # 저장소에 기록한 메시지 수
+        self._summary_saved = False # 회의 요약이 저장소에 기록되었는지 (메모리에서 비워도 다시 읽을 수 있음)
+        self._persist_lock = threading.RLock() # 세션 풀이 다른 스레드에서 release_memory()를 호출할 수 있음
+        self.speculation = speculation
+        self._turn_key = None # 진행 중인 페르소나 턴의 추측 key
+        self.model_name = model_name
+        self.stream_responses = stream_responses
+        self.turn_mode = turn_mode
+        self.context_token_budget = context_token_budget
+        self.summary_every = summary_every
+        self.summary_chunk_size = summary_chunk_size
+        self.summary_fan_in = summary_fan_in
+        self.max_history_in_memory = max_history_in_memory
+        self.rng = rng or random.Random()
+        self.scheduler = scheduler or SpeakerScheduler(self.personas, rng=self.rng)
+        self.context = None # 프롬프트용 대화 기록 (회의 시작 시 생성)
+        self.summarizer = None # 회의 종료 요약을 미리 만들어 두는 요약기 (회의 시작 시 생성)
+
+    @property
+    def personas(self):
+        """현재 명단의 페르소나 튜플. 명단이 다시 읽히기 전까지 같은 객체입니다."""
+        return self.registry.personas
+
+    @personas.setter
+    def personas(self, personas):
+        self.registry = PersonaRegistry.ensure(personas)
+
+    # --- 모델 호출 (캐시 경유) ---
+
+    def _record_spend(self, prompt_str, text):
+        """추측 사용량 한도 계산을 위해 일반 호출의 사용량을 기록합니다."""
+        if self.speculation is not None:
+            self.speculation.budget.record(estimate_tokens(prompt_str) + estimate_tokens(text))
+
+    def _last_retries(self):
+        """모델 클라이언트가 현재 스레드의 마지막 호출에서 재시도한 횟수. (재시도 계층이 없으면 0)"""
+        last_retries = getattr(self.model, "last_retries", None)
+        return last_retries() if callable(last_retries) else 0
+
+    def generate_text(self, prompt, speculative=False, call_site=CALL_GENERATE, persona=None):
+        """
+        캐시를 먼저 확인하고, 없으면 모델을 호출해 응답 텍스트를 반환합니다.
+        추측 호출(speculative)의 사용량은 시작할 때 이미 예약되어 있으므로 따로 기록하지 않습니다.
+        prompt는 문자열 또는 Prompt이며, 캐시 키와 토큰 추정에는 합친 문자열을 사용합니다.
+        """
+        timer = self.metrics.timer(self.session_id, call_site, persona)
+        prompt_str = prompt_text(prompt)
+        key = make_cache_key(prompt_str, self.model_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            timer.finish(prompt_str, cached, cache="hit")
+            return cached
+        try:
+            response = self.model.generate_content(prompt_for(self.model, prompt))
+            text = response.text
+        except Exception as e:
+            timer.finish(prompt_str, retries=self._last_retries(), error=e)
+            raise
+        timer.finish(prompt_str, text, response, retries=self._last_retries())
+        self.cache.set(key, text)
+        if not speculative:
+            self._record_spend(prompt_str, text)
+        return text
+
+    def stream_text(self, prompt, call_site=CALL_GENERATE, persona=None):
+        """캐시에 있으면 전체 응답을 한 번에, 없으면 스트리밍 응답을 청크 단위로 반환합니다."""
+        timer = self.metrics.timer(self.session_id, call_site, persona, stream=True)
+        prompt_str = prompt_text(prompt)
+        key = make_cache_key(prompt_str, self.model_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            timer.finish(prompt_str, cached, cache="hit")
+            yield cached
+            return
+        text = ""
+        last_chunk = None
+        error = None
+        try:
+            for chunk in self.model.generate_content(prompt_for(self.model, prompt), stream=True):
+                last_chunk = chunk
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # 안전 필터 등으로 텍스트 파트가 없는 청크는 건너뜀
+                    continue
+                if chunk_text:
+                    timer.first_token()
+                    text += chunk_text
+                    yield chunk_text
+        except GeneratorExit:
+            error = CallCancelledError("스트림 소비 중단")
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # 사용량(usage_metadata)은 마지막 청크에 담겨 옴
+            timer.finish(prompt_str, text, last_chunk if error is None else None, retries=self._last_retries(), error=error)
+        # 끝까지 받은 응답만 캐시에 저장 (중간에 끊긴 스트림은 저장하지 않음)
+        if text:
+            self.cache.set(key, text)
+        self._record_spend(prompt_str, text)
+
+    def _persona_stream(self, persona, history):
+        """턴 엔진 워커에서 실행되는 페르소나 응답 스트림입니다."""
+        if not self.model:
+            yield "Gemini 모델이 로드되지 않았습니다."
+            return
+        stance = None
+        if self.speculation is not None and self._turn_key is not None:
+            stance = self.speculation.take_draft(self._turn_key, persona["name"])
+        if stance:
+            # 미리 만든 입장 초안이 있으면 최근 대화만 넣은 짧은 프롬프트로 최종 발언 생성
+            recent_history = History(history[-RECONCILE_RECENT_MESSAGES:])
+            prompt = build_reconcile_prompt(persona, stance, recent_history, self.state.meeting_topic)
+            call_site = CALL_RECONCILE
+        else:
+            prompt = build_persona_prompt(persona, history, self.state.meeting_topic)
+            call_site = CALL_PERSONA
+        if self.stream_responses:
+            yield from self.stream_text(prompt, call_site, persona["name"])
+        else:
+            yield self.generate_text(prompt, call_site=call_site, persona=persona["name"])
+
+    def _compress_history(self, previous_summary, lines):
+        """오래된 대화를 누적 요약으로 압축합니다. (컨텍스트 관리자 워커에서 실행)"""
+        prompt = build_compress_prompt(self.state.meeting_topic, previous_summary, lines)
+        return self.generate_text(prompt, call_site=CALL_COMPRESS).strip()
+
+    def _create_context(self):
+        return ConversationContext(
+            token_budget=self.context_token_budget,
+            summary_every=self.summary_every, # 최근 구간 밖으로 밀려난 메시지가 이만큼 쌓이면 요약 갱신
+            summarize_fn=self._compress_history if self.model else None,
+            executor=self.engine.executor
+        )
+
+    def _create_summarizer(self, topic=None, user_name=None):
+        """구간 요약을 백그라운드에서 만들어 두는 요약기를 생성합니다. 주제와 사용자 이름을 주지 않으면 현재 회의 기준."""
+
+        def summary_line(message):
+            # 시스템 메시지는 빼고 사용자 이름은 '사용자'로 통일
+            role = message.get("role", "unknown")
+            if role == "system":
+                return None
+            display_role = "사용자" if role == (user_name or self.state.user_name) else role
+            return f"{display_role}: {message.get('content', '')}"
+
+        def summarize_chunk(lines):
+            prompt = build_chunk_summary_prompt(topic or self.state.meeting_topic, lines)
+            return self.generate_text(prompt, call_site=CALL_CHUNK_SUMMARY).strip()
+
+        def merge_summaries(summaries):
+            prompt = build_merge_summary_prompt(topic or self.state.meeting_topic, summaries)
+            return self.generate_text(prompt, call_site=CALL_CHUNK_SUMMARY).strip()
+
+        return IncrementalSummarizer(
+            summarize_chunk,
+            merge_summaries,
+            self.engine.executor,
+            summary_line,
+            chunk_size=self.summary_chunk_size,
+            fan_in=self.summary_fan_in
+        )
+
+    def _persist(self, quiet=False):
+        """
+        대화 기록 중 아직 저장하지 않은 메시지를 저장소에 추가합니다. 저장 실패가 회의 진행을 막지는 않습니다.
+        quiet=True면 실패해도 경고 콜백을 부르지 않습니다. (저장하지 못한 메시지는 다음 저장 때 다시 시도)
+        """
+        if self.store is None or self.meeting_id is None:
+            return
+        history = self.state.chat_history
+        with self._persist_lock:
+            try:
+                while self._persisted < len(history):
+                    message = history[self._persisted]
+                    self.store.append_message(self.meeting_id, self._persisted, message.get("role", "unknown"), message.get("content", ""))
+                    self._persisted += 1
+            except Exception as e:
+                if not quiet:
+                    self.callbacks.on_warning(f"회의 기록 저장 실패: {e}")
+            if isinstance(history, SpilledHistory):
+                # 저장된 메시지만 메모리에서 내보내므로 저장에 실패한 메시지는 그대로 남음
+                history.spill(self._persisted)
+
+    def _new_history(self, messages):
+        """새 회의의 대화 기록. 저장소와 메모리 상한이 있으면 오래된 메시지를 디스크에 두는 기록을 사용합니다."""
+        if self.store is None or self.meeting_id is None or not self.max_history_in_memory:
+            return list(messages)
+        return SpilledHistory(messages, self.store, self.meeting_id, self.max_history_in_memory)
+
+    def release_memory(self):
+        """
+        오래 쓰이지 않은 세션의 메모리를 비웁니다. 저장된 대화 기록은 모두 디스크로 내보내고, 프롬프트용 최근 대화와
+        요약기의 원문 줄, 저장된 회의 요약, 입장 초안을 버립니다. 다음에 다시 쓰일 때는 필요한 메시지만 저장소에서
+        읽어 다시 만듭니다. 페르소나 턴이나 기록 저장이 진행 중이면 아무것도 하지 않고 False를 반환합니다.
+        """
+        if self.state.current_turn == "persona" or not self._persist_lock.acquire(blocking=False):
+            return False
+        try:
+            # 세션 풀은 다른 사용자의 실행 스레드에서 부르므로 이 세션의 화면 콜백(st.warning 등)은 호출하지 않음
+            self._persist(quiet=True)
+            history = self.state.chat_history
+            if isinstance(history, SpilledHistory):
+                history.spill(self._persisted, keep=0)
+                # 컨텍스트와 요약기는 저장소에서 다시 읽을 수 있는 기록이 있을 때만 비움
+                if not self.state.is_meeting_started:
+                    # 끝난 회의는 더 이상 프롬프트를 만들지 않음
+                    self.context = None
+                    self.summarizer = None
+                else:
+                    if self.context is not None:
+                        self.context.release()
+                    if self.summarizer is not None:
+                        self.summarizer.release()
+            if self._summary_saved and self.store is not None:
+                meeting_id = self.meeting_id
+                self.state.release_summary(lambda: self._load_saved_summary(meeting_id))
+        finally:
+            self._persist_lock.release()
+        if self.speculation is not None:
+            self.speculation.reset()
+        return True
+
+    def _load_saved_summary(self, meeting_id):
+        """메모리에서 비운 회의 요약을 저장소에서 다시 읽습니다. 읽지 못하면 None."""
+        try:
+            meeting = self.store.get_meeting(meeting_id)
+        except Exception:
+            return None
+        return meeting["summary"] if meeting else None
+
+    # --- 회의 진행 ---
+
+    def find_persona(self, name):
+        return self.registry.get(name)
+
+    def select_persona_speakers(self):
+        """PRD 기준: 페르소나 턴에 1~2명을 선택합니다. 선택 방식은 스케줄러 설정을 따릅니다."""
+        return self.scheduler.next_speakers(self.personas)
+
+    # --- 추측 생성 ---
+
+    def _speculation_key(self, history_len=None):
+        """추측 준비를 구분하는 대화 위치. 회의가 새로 시작되면 대화 기록 객체가 바뀌므로 함께 사용합니다."""
+        history = self.state.chat_history
+        return (id(history), len(history) if history_len is None else history_len)
+
+    def _draft_stance(self, persona, history):
+        """입장 초안을 생성합니다. (턴 엔진 워커에서 실행)"""
+        prompt = build_stance_prompt(persona, history, self.state.meeting_topic)
+        return self.generate_text(prompt, speculative=True, call_site=CALL_STANCE, persona=persona["name"]).strip()
+
+    def prepare_next_turn(self):
+        """
+        사용자가 입력하는 동안 다음 발언자를 적극성 비율로 미리 뽑고, 입장 초안을 백그라운드에서 생성합니다.
+        같은 대화 위치에서 여러 번 호출해도 한 번만 준비합니다. speculation이 없으면 아무것도 하지 않습니다.
+        """
+        state = self.state
+        if self.speculation is None or not self.model or not self.personas:
+            return
+        if not state.is_meeting_started or state.current_turn != "user":
+            return
+        self.registry.maybe_reload()
+        key = self._speculation_key()
+        if self.speculation.is_prepared(key):
+            return
+
+        speakers = self.select_persona_speakers()
+
+        if self.context is None:
+            self.context = self._create_context()
+        self.context.sync(state.chat_history)
+        history = self.context.render_messages()
+        draft_cost = estimate_tokens(build_stance_prompt(speakers[0], history, state.meeting_topic).text()) + STANCE_OUTPUT_TOKENS
+        self.speculation.prepare(
+            key,
+            speakers,
+            lambda persona: self.engine.executor.submit(self._draft_stance, persona, history),
+            draft_cost
+        )
+
+    def start_meeting(self, topic):
+        """회의를 시작하고 상태를 초기화합니다."""
+        self.state.meeting_topic = topic
+        self.state.is_meeting_started = True
+        self.state.current_turn = "user" # 항상 사용자가 먼저 시작
+        self.state.meeting_summary = None
+        self.context = self._create_context()
+        self.summarizer = self._create_summarizer()
+        self.scheduler.reset()
+        if self.speculation is not None:
+            self.speculation.reset()
+        self.meeting_id = None
+        self._persisted = 0
+        self._summary_saved = False
+        if self.store is not None:
+            try:
+                self.meeting_id = self.store.create_meeting(topic, self.state.user_name, self.registry.names)
+            except Exception as e:
+                self.callbacks.on_warning(f"회의 기록 저장 실패: {e}")
+        self.state.chat_history = self._new_history([{"role": "system", "content": f"회의 시작: {topic}"}])
+        self._persist()
+
+    def reset_meeting(self):
+        """회의 상태를 초기화합니다."""
+        self.state.meeting_topic = ""
+        self.state.is_meeting_started = False
+        self.state.chat_history = []
+        self.state.current_turn = "user"
+        self.state.meeting_summary = None # 요약 내용도 초기화
+        self.context = None
+        self.summarizer = None
+        self.scheduler.reset()
+        if self.speculation is not None:
+            self.speculation.reset()
+        self.meeting_id = None
+        self._persisted = 0
+        self._summary_saved = False
+
+    def handle_user_message(self, user_input):
+        """사용자 메시지를 처리하고 페르소나 턴으로 전환합니다."""
+        if user_input and self.state.is_meeting_started:
+            self.state.chat_history.append({
+                "role": self.state.user_name,
+                "content": user_input
+            })
+            self._persist()
+            self.state.current_turn = "persona" # 페르소나 턴으로 변경
+
+    def get_targeted_persona_from_user_message(self, user_message, personas, recent_chat_history=None):
+        """
+        모델을 사용하여 사용자의 메시지에서 특정 페르소나가 지목되었는지,
+        또는 최근 대화 내용을 참조하는지 판단합니다.
+        지목/참조된 페르소나의 이름을 반환하거나, 없으면 None을 반환합니다.
+        턴 엔진 워커에서 실행되며, 실패 시 예외를 그대로 전달합니다.
+        """
+        if not self.model:
+            return None
+        if not user_message.strip():
+            return None
+
+        registry = PersonaRegistry.ensure(personas)
+        prompt = build_target_prompt(user_message, registry.names, recent_chat_history)
+        candidate_name = self.generate_text(prompt, call_site=CALL_TARGET).strip()
+
+        if candidate_name in registry.name_set:
+            return candidate_name
+        else:
+            return None
+
+    def _recent_persona_messages(self, limit=3):
+        """사용자 메시지 직전의 페르소나 발언들 (최대 limit개)을 시간 순서대로 반환합니다."""
+        recent = []
+        persona_names = self.registry.name_set
+        # 사용자 메시지 바로 앞부터 역순으로 탐색
+        for i in range(len(self.state.chat_history) - 2, -1, -1):
+            msg = self.state.chat_history[i]
+            if msg.get("role") in persona_names: # 페르소나 발언인지 확인
+                recent.insert(0, msg) # 맨 앞에 추가하여 순서 유지
+            if len(recent) >= limit:
+                break
+        return recent
+
+    def _collect_reply(self, persona, call):
+        """ModelCall의 청크를 UI 콜백에 전달하며 최종 응답 텍스트를 만듭니다."""
+        name = persona["name"]
+        self.callbacks.on_reply_start(persona)
+        response_text = ""
+        try:
+            for text in call.iter_chunks():
+                response_text += text
+                self.callbacks.on_reply_chunk(persona, response_text)
+        except Exception as e:
+            if isinstance(e, CallTimeoutError):
+                self.engine.note_timeout()
+            self.callbacks.on_error(f"Gemini API 호출 중 오류 발생: {e}")
+            if response_text:
+                # 이미 받은 부분 응답은 버리지 않고 중단 표시만 덧붙임
+                response_text += " …(응답이 중간에 끊겼습니다)"
+        if not response_text:
+            response_text = f"응답 생성 실패 ({name})"
+        self.callbacks.on_reply_end(persona, response_text)
+        return response_text
+
+    def generate_persona_responses(self):
+        """페르소나 턴일 때 응답을 생성하고 사용자 턴으로 전환합니다."""
+        state = self.state
+        if state.current_turn != "persona" or not state.is_meeting_started:
+            return
+        # personas.json이 바뀌었으면 이번 턴부터 새 명단 사용 (진행 중인 대화는 그대로)
+        self.registry.maybe_reload()
+
+        detect_target = None
+        targeted_persona_name = None
+
+        if state.chat_history and state.chat_history[-1].get("role") == state.user_name:
+            user_last_message_content = state.chat_history[-1].get("content", "")
+            recent_persona_msgs = self._recent_persona_messages()
+
+            # 이름/호칭/참조 표현으로 먼저 로컬 판별하고, 애매한 경우에만 모델에 묻기
+            resolution = self.resolver.resolve(user_last_message_content, self.registry, recent_persona_msgs)
+            if self.resolver.is_confident(resolution):
+                targeted_persona_name = resolution.name
+            elif self.model:
+                registry = self.registry # 이름 목록과 이름 집합 색인을 다시 만들지 않고 사용
+                detect_target = lambda: self.get_targeted_persona_from_user_message(
+                    user_last_message_content,
+                    registry,
+                    recent_persona_msgs # 최근 페르소나 발언 전달
+                )
+
+        # 사용자가 입력하는 동안 준비한 추측은 사용자 메시지 직전 위치를 key로 가짐
+        self._turn_key = self._speculation_key(len(state.chat_history) - 1) if self.speculation is not None else None
+        planned_speakers = self.speculation.planned_speakers(self._turn_key) if self._turn_key else None
+
+        targeted_speaker_obj = self.find_persona(targeted_persona_name) if targeted_persona_name else None
+        if targeted_speaker_obj:
+            speculative_speakers = [targeted_speaker_obj]
+        elif planned_speakers:
+            # 입장 초안을 준비해 둔 발언자를 그대로 사용
+            speculative_speakers = planned_speakers
+        else:
+            # 대상 분석이 끝나기 전에 랜덤 발언자를 미리 뽑아 추측 응답을 시작
+            speculative_speakers = self.select_persona_speakers()
+        if not speculative_speakers:
+            state.current_turn = "user"
+            return
+
+        responses_to_add = []
+        spoken = []
+        # 새 메시지만 증분 반영하고, 프롬프트에는 요약 + 토큰 예산 안의 최근 대화만 사용
+        if self.context is None:
+            self.context = self._create_context()
+        context = self.context
+        context.sync(state.chat_history)
+
+        turn = self.engine.run_turn(
+            self._persona_stream,
+            lambda: context.render_messages(responses_to_add),
+            speculative_speakers,
+            detect_target=detect_target,
+            find_persona=self.find_persona,
+            mode=self.turn_mode,
+            on_target_error=lambda e: self.callbacks.on_error(f"Gemini API (대상 분석) 호출 중 오류 발생: {e}"),
+        )
+        for speaker_persona, call in turn:
+            response_text = self._collect_reply(speaker_persona, call)
+            message = {
+                "role": speaker_persona["name"],
+                "content": response_text
+            }
+            # 프롬프트용 컨텍스트는 턴이 끝날 때 반영하고, 기록은 응답이 끝나는 대로 남김
+            responses_to_add.append(message)
+            spoken.append(speaker_persona)
+            state.chat_history.append(message)
+            self._persist()
+
+        # 사용자가 입력하는 동안 필요한 요약 갱신이 백그라운드에서 진행되도록 바로 반영
+        context.sync(state.chat_history)
+        if self.model:
+            if self.summarizer is None:
+                self.summarizer = self._create_summarizer()
+            self.summarizer.sync(state.chat_history)
+        self.scheduler.record(spoken)
+        self._turn_key = None
+        state.current_turn = "user"
+
+    def summarize_meeting(self):
+        """
+        모델을 사용하여 회의 내용을 요약합니다.
+        회의 중에 미리 만들어 둔 구간 요약과 아직 요약되지 않은 마지막 대화만 넣으므로 회의 길이와 관계없이 빠르게 끝납니다.
+        """
+        return self._summarize_meeting()[0]
+
+    def _summarize_meeting(self):
+        """(화면에 보여줄 텍스트, 저장할 요약) 쌍을 반환합니다. 요약을 만들지 못하면 저장할 요약은 None입니다."""
+        state = self.state
+        if not self.model:
+            return "Gemini 모델이 로드되지 않았습니다.", None
+        if not state.chat_history:
+            return "요약할 회의 내용이 없습니다.", None
+
+        if self.summarizer is None:
+            self.summarizer = self._create_summarizer()
+        try:
+            with self.callbacks.status("회의 내용을 요약 중입니다..."):
+                self.summarizer.sync(state.chat_history)
+                prompt = build_summary_prompt(state.meeting_topic, self.summarizer.render())
+                summary = self.generate_text(prompt, call_site=CALL_SUMMARY)
+        except Exception as e:
+            self.callbacks.on_error(f"Gemini API 요약 호출 중 오류 발생: {e}")
+            return "회의 요약 생성에 실패했습니다.", None
+        return summary, summary or None
+
+    def summarize_transcript(self, topic, user_name, messages):
+        """
+        보관된 회의처럼 한꺼번에 주어진 기록을 요약합니다. 구간 요약은 턴 엔진 워커에서 병렬로 만듭니다.
+        실패 시(빈 응답 포함) 예외를 그대로 전달하므로, 반환값은 항상 저장해도 되는 요약입니다.
+        """
+        summarizer = self._create_summarizer(topic, user_name)
+        summarizer.sync(list(messages))
+        prompt = build_summary_prompt(topic, summarizer.render())
+        summary = self.generate_text(prompt, call_site=CALL_SUMMARY)
+        if not summary or not summary.strip():
+            raise ValueError("모델이 빈 요약을 반환했습니다.")
+        return summary
+
+    def end_meeting(self):
+        """회의를 요약하고 종료 상태로 전환합니다. 요약에 실패하면 저장소에는 요약 없이 종료만 기록합니다."""
+        self.state.meeting_summary, summary = self._summarize_meeting()
+        if self.store is not None and self.meeting_id is not None:
+            try:
+                self.store.finish_meeting(self.meeting_id, summary)
+                # 저장하지 못한 실패 안내는 다시 읽을 수 없으므로 메모리에 그대로 둠
+                self._summary_saved = summary is not None
+            except Exception as e:
+                self.callbacks.on_warning(f"회의 기록 저장 실패: {e}")
+        self.state.is_meeting_started = False # 회의 상태 종료
+        self.state.current_turn = "user" # 턴 초기화
+        return self.state.meeting_summary
+
+    def iter_markdown(self, timestamp):
+        """현재 회의 로그를 Markdown 조각 단위로 만들어냅니다. (디스크로 내보낸 메시지는 저장소에서 읽음)"""
+        state = self.state
+        return iter_markdown_log(state.meeting_topic, state.user_name, self.registry.names, state.chat_history, timestamp)
+
+    def render_markdown_log(self, timestamp):
+        """현재 회의 로그를 Markdown 문자열로 만듭니다."""
+        return "".join(self.iter_markdown(timestamp))
@@ -0,0 +1,284 @@
+"""
+회의 기록을 SQLite에 쌓아두는 추가 전용(append-only) 저장소.
+
+메시지는 대화에 추가되는 즉시 한 줄씩 기록되므로(WAL 모드) 앱이 비정상 종료되어도 이미 오간 대화는 남습니다.
+주제와 발언 내용에는 전문 검색(FTS5) 색인을 두어 보관된 회의가 많아도 빠르게 찾을 수 있고,
+Markdown 로그는 필요할 때 메시지를 조금씩 읽어 스트림으로 만들어냅니다.
+
+사용 예:
+    python meeting_store.py list
+    python meeting_store.py search "재구매율 쿠폰"
+    python meeting_store.py export 42 --output-dir logs
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_STORE_PATH = ".cache/meetings.sqlite3"
+EXPORT_PAGE_SIZE = 500 # Markdown 내보내기 시 한 번에 읽는 메시지 수
+
+
+def iter_markdown_log(topic, user_name, persona_names, messages, timestamp):
+    """회의 로그를 Markdown 조각 단위로 만들어냅니다. (전체 문자열을 한 번에 만들지 않음)"""
+    yield f"# 회의 로그 ({timestamp})\n\n"
+    yield f"**주제:** {topic}\n"
+    yield f"**참여자:** {user_name} (사용자), " + ", ".join(persona_names) + "\n\n"
+    yield "---\n\n"
+    for message in messages:
+        role = message.get("role", "unknown")
+        content = message.get("content", "").strip()
+        if role == "system":
+            yield f"*({content})*\n\n"
+        else:
+            display_role = "사용자" if role == user_name else role
+            yield f"**{display_role}:** {content}\n\n"
+
+
+def build_search_query(text):
+    """검색어를 FTS5 질의로 바꿉니다. 각 단어는 접두어로 검색해 조사가 붙은 형태도 찾습니다. (예: 예산 → 예산은)"""
+    terms = re.findall(r"\w+", text)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def open_exclusive(directory, base_name, extension=".md"):
+    """같은 이름의 파일이 이미 있으면 _1, _2 …를 붙여 새 파일을 만들고 (파일 객체, 경로)를 반환합니다."""
+    os.makedirs(directory or ".", exist_ok=True)
+    suffix = 0
+    while True:
+        name = f"{base_name}{f'_{suffix}' if suffix else ''}{extension}"
+        path = os.path.join(directory, name)
+        try:
+            return open(path, "x", encoding="utf-8"), path
+        except FileExistsError:
+            suffix += 1
+
+
+class MeetingStore:
+    """회의와 메시지를 추가 전용으로 기록하고 검색하는 SQLite 저장소. 여러 스레드가 함께 사용할 수 있습니다."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL") # 커밋된 메시지는 전원이 꺼져도 남도록
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meetings ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, user_name TEXT NOT NULL, "
+            "personas TEXT NOT NULL, started REAL NOT NULL, ended REAL, summary TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "meeting_id INTEGER NOT NULL REFERENCES meetings (id), seq INTEGER NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, created REAL NOT NULL, PRIMARY KEY (meeting_id, seq))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS meetings_started ON meetings (started)")
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS meeting_search USING fts5("
+                "meeting_id UNINDEXED, role UNINDEXED, body, tokenize='unicode61')"
+            )
+            self.full_text = True
+        except sqlite3.OperationalError:
+            # FTS5 없이 빌드된 SQLite에서는 LIKE 검색으로 대체
+            self.full_text = False
+        self._conn.commit()
+
+    def _index(self, meeting_id, role, body):
+        if self.full_text and body:
+            self._conn.execute(
+                "INSERT INTO meeting_search (meeting_id, role, body) VALUES (?, ?, ?)", (meeting_id, role, body)
+            )
+
+    # --- 기록 ---
+
+    def create_meeting(self, topic, user_name, persona_names):
+        """새 회의를 등록하고 회의 id를 반환합니다."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO meetings (topic, user_name, personas, started) VALUES (?, ?, ?, ?)",
+                (topic, user_name, json.dumps(list(persona_names), ensure_ascii=False), time.time()),
+            )
+            meeting_id = cursor.lastrowid
+            self._index(meeting_id, "topic", topic)
+            self._conn.commit()
+            return meeting_id
+
+    def append_message(self, meeting_id, seq, role, content):
+        """메시지 하나를 바로 기록합니다. 같은 (회의, 순번)이 이미 있으면 무시하므로 다시 호출해도 안전합니다."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO messages (meeting_id, seq, role, content, created) VALUES (?, ?, ?, ?, ?)",
+                (meeting_id, seq, role, content, time.time()),
+            )
+            if cursor.rowcount:
+                self._index(meeting_id, role, content)
+            self._conn.commit()
+
+    def finish_meeting(self, meeting_id, summary=None):
+        """회의 종료 시각과 요약을 기록합니다."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE meetings SET ended = ?, summary = ? WHERE id = ?", (time.time(), summary, meeting_id)
+            )
+            self._index(meeting_id, "summary", summary)
+            self._conn.commit()
+
+    def save_summary(self, meeting_id, summary):
+        """종료 처리 없이 요약만 기록합니다. (나중에 요약을 만든 보관 회의)"""
+        with self._lock:
+            self._conn.execute("UPDATE meetings SET summary = ? WHERE id = ?", (summary, meeting_id))
+            self._index(meeting_id, "summary", summary)
+            self._conn.commit()
+
+    # --- 조회 ---
+
+    def get_meeting(self, meeting_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM meetings WHERE id = ?", (meeting_id,)).fetchone()
+        if row is None:
+            return None
+        meeting = dict(row)
+        meeting["personas"] = json.loads(meeting["personas"])
+        return meeting
+
+    def revision(self, meeting_id):
+        """회의 내용이 바뀌었는지 비교할 값 (메시지 수, 마지막 기록 시각, 종료 시각, 요약 길이)을 반환합니다."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM messages WHERE meeting_id = m.id), "
+                "(SELECT MAX(created) FROM messages WHERE meeting_id = m.id), m.ended, LENGTH(m.summary) "
+                "FROM meetings m WHERE m.id = ?",
+                (meeting_id,),
+            ).fetchone()
+        return tuple(row) if row is not None else None
+
+    def list_meetings(self, limit=50, offset=0):
+        """최근에 시작한 회의부터 (id, 주제, 시작/종료 시각, 메시지 수)를 반환합니다."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT m.id, m.topic, m.started, m.ended, "
+                "(SELECT COUNT(*) FROM messages WHERE meeting_id = m.id) AS messages "
+                "FROM meetings m ORDER BY m.started DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_messages(self, meeting_id, page_size=EXPORT_PAGE_SIZE):
+        """회의의 메시지를 순서대로 page_size개씩 읽어 하나씩 반환합니다."""
+        last_seq = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, role, content FROM messages WHERE meeting_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (meeting_id, last_seq, page_size),
+                ).fetchall()
+            for row in rows:
+                yield {"role": row["role"], "content": row["content"]}
+            if len(rows) < page_size:
+                return
+            last_seq = rows[-1]["seq"]
+
+    def read_messages(self, meeting_id, start, stop):
+        """순번이 start 이상 stop 미만인 메시지를 순서대로 반환합니다. (메모리에서 내보낸 대화 기록 조회)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE meeting_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (meeting_id, start, stop),
+            ).fetchall()
+        return [{"role": row["role"], "content": row["content"]} for row in rows]
+
+    def search(self, text, limit=20):
+        """주제·발언·요약에서 검색어를 포함한 회의를 관련도 순으로 찾습니다. 회의마다 가장 잘 맞는 구절 하나를 보여줍니다."""
+        query = build_search_query(text)
+        if not query:
+            return []
+        with self._lock:
+            if self.full_text:
+                rows = self._conn.execute(
+                    "SELECT s.meeting_id, m.topic, m.started, s.role, "
+                    "snippet(meeting_search, 2, '**', '**', '…', 16) AS snippet "
+                    "FROM meeting_search s JOIN meetings m ON m.id = s.meeting_id "
+                    "WHERE meeting_search MATCH ? ORDER BY rank LIMIT ?",
+                    (query, limit * 5),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT msg.meeting_id, m.topic, m.started, msg.role, msg.content AS snippet "
+                    "FROM messages msg JOIN meetings m ON m.id = msg.meeting_id "
+                    "WHERE msg.content LIKE ? OR m.topic LIKE ? ORDER BY m.started DESC LIMIT ?",
+                    (f"%{text}%", f"%{text}%", limit * 5),
+                ).fetchall()
+        results = {}
+        for row in rows:
+            if row["meeting_id"] not in results:
+                results[row["meeting_id"]] = dict(row)
+            if len(results) >= limit:
+                break
+        return list(results.values())
+
+    # --- 내보내기 ---
+
+    def iter_markdown(self, meeting_id, timestamp=None):
+        """저장된 회의를 Markdown 조각 단위로 스트리밍합니다."""
+        meeting = self.get_meeting(meeting_id)
+        if meeting is None:
+            raise KeyError(f"회의를 찾을 수 없습니다: {meeting_id}")
+        timestamp = timestamp or datetime.fromtimestamp(meeting["started"]).strftime("%Y%m%d_%H%M%S")
+        yield from iter_markdown_log(
+            meeting["topic"], meeting["user_name"], meeting["personas"], self.iter_messages(meeting_id), timestamp
+        )
+        if meeting["summary"]:
+            yield "---\n\n## 회의 요약\n\n" + meeting["summary"] + "\n"
+
+    def export_markdown(self, meeting_id, directory=".", timestamp=None):
+        """회의를 Markdown 파일로 내보내고 경로를 반환합니다. 이름이 겹치면 기존 파일을 덮어쓰지 않고 번호를 붙입니다."""
+        timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        f, path = open_exclusive(directory, f"meeting_log_{timestamp}")
+        with f:
+            for part in self.iter_markdown(meeting_id, timestamp):
+                f.write(part)
+        return path
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="보관된 회의를 조회하고 검색합니다.")
+    parser.add_argument("--store", default=os.getenv("MEETING_STORE_PATH", DEFAULT_STORE_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="최근 회의 목록")
+    list_parser.add_argument("--limit", type=int, default=20)
+    search_parser = commands.add_parser("search", help="주제와 발언 내용 검색")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=20)
+    export_parser = commands.add_parser("export", help="회의를 Markdown 파일로 내보내기")
+    export_parser.add_argument("meeting_id", type=int)
+    export_parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+
+    store = MeetingStore(args.store)
+    if args.command == "list":
+        for meeting in store.list_meetings(args.limit):
+            started = datetime.fromtimestamp(meeting["started"]).strftime("%Y-%m-%d %H:%M")
+            print(f"{meeting['id']:>6}  {started}  {meeting['messages']:>4}개  {meeting['topic']}")
+    elif args.command == "search":
+        for result in store.search(args.query, args.limit):
+            print(f"{result['meeting_id']:>6}  {result['topic']}\n        {result['role']}: {result['snippet']}")
+    elif args.command == "export":
+        print(store.export_markdown(args.meeting_id, args.output_dir))
+
+
+if __name__ == "__main__":
+    main()
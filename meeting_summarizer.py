@@ -0,0 +1,185 @@
+"""
+회의 요약을 미리 조금씩 만들어 두는 증분 map-reduce 요약기.
+
+대화가 chunk_size줄 쌓일 때마다 그 구간의 요약(map)을 백그라운드에서 만들고, 같은 단계의 구간 요약이
+fan_in개 모이면 다시 하나로 합칩니다(중간 reduce). 회의가 끝나면 이미 만든 요약 몇 개와 아직 요약되지 않은
+마지막 몇 줄만 최종 요약에 넣으므로, 회의 길이와 관계없이 종료 시 요약 호출의 크기가 거의 일정합니다.
+보관된 회의처럼 기록이 한꺼번에 주어지면 모든 구간이 동시에 요약(병렬 map)됩니다.
+요약이 끝난 구간의 원문 줄은 메모리에서 버리므로, 회의가 길어져도 보관하는 원문이 늘어나지 않습니다.
+"""
+import threading
+from concurrent.futures import wait
+
+from prompt_templates import History
+
+
+class _Segment:
+    """대화 lines[start:end] 구간. 요약이 끝나기 전에는 합치는 중인 하위 구간(parts)이나 원문을 대신 사용합니다."""
+
+    __slots__ = ("start", "end", "level", "summary", "parts", "future")
+
+    def __init__(self, start, end, level=0, parts=()):
+        self.start = start
+        self.end = end
+        self.level = level
+        self.summary = None
+        self.parts = list(parts)
+        self.future = None
+
+    def ready_summary(self):
+        """끝난 요약을 반환합니다. 완료 콜백이 아직 실행되지 않았어도 Future 결과를 바로 읽습니다."""
+        if self.summary is None and self.future is not None and self.future.done():
+            if not self.future.cancelled() and self.future.exception() is None:
+                self.summary = self.future.result()
+        return self.summary
+
+
+class IncrementalSummarizer:
+    """
+    map_fn(lines)는 대화 구간 하나를, merge_fn(summaries)는 연속된 구간 요약들을 요약해 문자열로 반환합니다.
+    둘 다 executor의 워커 스레드에서 실행되므로 Streamlit을 호출하면 안 됩니다.
+    render_fn(message)는 메시지를 요약용 한 줄로 바꾸며, None을 반환하면 그 메시지는 건너뜁니다.
+    """
+
+    def __init__(self, map_fn, merge_fn, executor, render_fn, chunk_size=12, fan_in=4, max_raw_lines=None,
+                 max_pieces=None):
+        self.map_fn = map_fn
+        self.merge_fn = merge_fn
+        self.executor = executor
+        self.render_fn = render_fn
+        self.chunk_size = chunk_size
+        self.fan_in = fan_in
+        # 최종 요약에 그대로 넣을 수 있는 원문 줄 수와 요약 조각 수. 넘으면 진행 중인 요약을 기다림
+        self.max_raw_lines = max_raw_lines or chunk_size * 2
+        self.max_pieces = max_pieces or fan_in * 4
+        self.stats = {"maps": 0, "merges": 0, "failures": 0, "waits": 0}
+        self._lock = threading.RLock()
+        self._generation = 0
+        self.reset()
+
+    def reset(self):
+        """회의가 새로 시작될 때 모든 구간을 버립니다. 진행 중인 요약 결과는 반영되지 않습니다."""
+        with self._lock:
+            self.lines = []
+            self.segments = []
+            self.covered = 0 # 구간으로 나눈 줄 수
+            self.offset = 0 # 메모리에서 버린 앞쪽 원문 줄 수
+            self._seen = 0 # 반영한 메시지 수
+            self._covered_seen = 0 # 구간으로 나눈 줄까지의 메시지 수 (이후 메시지는 기록에서 다시 읽을 수 있음)
+            self._generation += 1
+
+    def sync(self, chat_history):
+        """chat_history에서 아직 반영되지 않은 메시지를 추가하고, 구간이 찼으면 요약을 시작합니다."""
+        with self._lock:
+            if len(chat_history) < self._seen:
+                self.reset()
+            for index, message in enumerate(chat_history[self._seen:], self._seen):
+                line = self.render_fn(message)
+                if line is None:
+                    continue
+                self.lines.append(line)
+                if self.offset + len(self.lines) - self.covered >= self.chunk_size:
+                    segment = _Segment(self.covered, self.covered + self.chunk_size)
+                    self.covered = segment.end
+                    self._covered_seen = index + 1
+                    self.segments.append(segment)
+                    self.stats["maps"] += 1
+                    self._submit(segment, self.map_fn, self._raw(segment.start, segment.end))
+            self._seen = len(chat_history)
+
+    def _raw(self, start, end):
+        return self.lines[start - self.offset:end - self.offset]
+
+    def _trim(self, min_cut=None):
+        """요약이 끝나 원문이 더 필요 없는 앞쪽 줄을 버립니다. 락을 잡은 상태에서 호출합니다."""
+        # 요약이 없는 구간(진행 중이거나 실패)은 최종 요약에서 원문을 대신 쓰므로 남김. 합치는 중인 구간은 하위 요약을 사용
+        needed = [s.start for s in self.segments if not s.parts and s.ready_summary() is None]
+        cut = min(needed + [self.covered]) - self.offset
+        if cut >= (self.chunk_size if min_cut is None else min_cut):
+            del self.lines[:cut]
+            self.offset += cut
+
+    def release(self):
+        """
+        구간 요약은 남기고 더 필요 없는 원문 줄과 아직 구간으로 나누지 않은 마지막 줄들을 버립니다.
+        마지막 줄들은 다음 sync() 때 대화 기록(저장소)에서 다시 읽습니다.
+        """
+        with self._lock:
+            self._trim(min_cut=1)
+            del self.lines[self.covered - self.offset:]
+            self._seen = self._covered_seen
+
+    def _submit(self, segment, fn, inputs):
+        generation = self._generation
+        segment.future = self.executor.submit(fn, inputs)
+        segment.future.add_done_callback(lambda future: self._on_done(segment, generation))
+
+    def _on_done(self, segment, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            if segment.ready_summary() is None:
+                # 실패한 구간은 최종 요약에서 원문(또는 하위 요약)을 그대로 사용
+                self.stats["failures"] += 1
+                segment.future = None
+                return
+            self._maybe_merge()
+            self._trim()
+
+    def _maybe_merge(self):
+        """같은 단계의 요약이 끝난 구간이 fan_in개 연속되면 하나로 합치기 시작합니다. 락을 잡은 상태에서 호출합니다."""
+        segments = self.segments
+        i = 0
+        while i + self.fan_in <= len(segments):
+            run = segments[i:i + self.fan_in]
+            if all(s.level == run[0].level and s.ready_summary() is not None for s in run):
+                merged = _Segment(run[0].start, run[-1].end, run[0].level + 1, run)
+                segments[i:i + self.fan_in] = [merged]
+                self.stats["merges"] += 1
+                self._submit(merged, self.merge_fn, [s.summary for s in run])
+            i += 1
+
+    def _pieces(self, segment):
+        """구간 하나를 최종 요약에 넣을 ((종류, 텍스트) 목록, 원문 줄 수)로 바꿉니다."""
+        summary = segment.ready_summary()
+        if summary is not None:
+            return [("summary", summary)], 0
+        if segment.parts:
+            pieces, raw = [], 0
+            for part in segment.parts:
+                part_pieces, part_raw = self._pieces(part)
+                pieces += part_pieces
+                raw += part_raw
+            return pieces, raw
+        return [("raw", "\n".join(self._raw(segment.start, segment.end)))], segment.end - segment.start
+
+    def _snapshot(self):
+        with self._lock:
+            # 완료 콜백보다 먼저 불려도 끝난 요약끼리는 바로 합치기 시작
+            self._maybe_merge()
+            pieces, raw, pending = [], 0, []
+            for segment in self.segments:
+                segment_pieces, segment_raw = self._pieces(segment)
+                pieces += segment_pieces
+                raw += segment_raw
+                if segment.summary is None and segment.future is not None and not segment.future.done():
+                    pending.append(segment.future)
+            tail = self.lines[self.covered - self.offset:]
+        return pieces, raw + len(tail), tail, pending
+
+    def render(self):
+        """
+        최종 요약에 넣을 대화 기록(구간 요약과 최근 대화 한 줄씩 담은 History)을 만듭니다. 평소에는 기다리지 않고 바로 반환하며, 아직 요약되지 않은 원문이나
+        요약 조각이 너무 많을 때(한꺼번에 불러온 기록 등)만 진행 중인 요약이 끝나기를 기다립니다.
+        """
+        while True:
+            pieces, raw, tail, pending = self._snapshot()
+            if not pending or (raw <= self.max_raw_lines and len(pieces) <= self.max_pieces):
+                break
+            self.stats["waits"] += 1
+            wait(pending)
+        parts = [f"[{'구간 요약' if kind == 'summary' else '대화 원문'} {i}]\n{text}" for i, (kind, text) in enumerate(pieces, 1)]
+        if tail:
+            parts.append("[최근 대화]")
+            parts.extend(tail)
+        return History(parts)
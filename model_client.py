@@ -0,0 +1,268 @@
+"""
+모델 호출을 감싸는 공유 클라이언트 계층.
+
+속도 제한(분당 요청/토큰), 동시 호출 수 제한, 재시도 가능한 오류의 지터 지수 백오프, 서킷 브레이커,
+동일한 요청의 병합을 한곳에서 처리합니다. genai.GenerativeModel과 같은 generate_content 인터페이스를
+제공하므로 모델 자리에 그대로 넣을 수 있으며, 여러 세션이 하나의 인스턴스를 공유하도록 설계되었습니다.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from conversation_context import estimate_tokens
+from prompt_templates import prompt_text, prompt_for
+from response_cache import make_cache_key
+
+# 재시도할 HTTP 상태 코드 (할당량 초과, 일시적 서버 오류)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# google.api_core 예외 이름 (라이브러리를 직접 불러오지 않고 이름으로 판별)
+RETRYABLE_ERROR_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError"}
+
+
+def is_retryable(error):
+    """일시적인 오류라서 다시 시도할 가치가 있는지 판단합니다."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    code = getattr(error, "code", None)
+    code = getattr(code, "value", code) # HTTPStatus 등 열거형 처리
+    try:
+        return int(code) in RETRYABLE_STATUS_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출을 보내지 않았을 때 발생합니다."""
+
+
+class CircuitBreaker:
+    """
+    재시도 가능한 오류가 failure_threshold번 연속되면 reset_timeout초 동안 호출을 차단합니다.
+    차단 시간이 지나면 한 번의 시험 호출을 허용하고, 성공하면 다시 정상 상태로 돌아갑니다.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+                self._trial_in_flight = False
+
+
+class RetryPolicy:
+    """full jitter 방식의 지수 백오프. attempt번째 재시도 전에 0 ~ min(max_delay, base_delay * 2^attempt)초 기다립니다."""
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=8.0, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def delay(self, attempt):
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class ModelClient:
+    """
+    속도 제한, 재시도, 서킷 브레이커, 요청 병합을 적용해 모델을 호출하는 클라이언트.
+    max_concurrency를 주면 프로세스 전체에서 동시에 진행되는 호출(스트리밍은 끝날 때까지)을 그 수로 제한합니다.
+    요청 병합은 일반 호출에만 적용합니다. 스트림은 호출한 쪽마다 청크를 받는 속도가 달라 공유하지 않고 따로 보내며,
+    같은 스트림이 이미 진행 중일 때 새로 보낸 횟수를 stats["uncoalesced_streams"]에 셉니다.
+    구조화된 프롬프트(Prompt)는 감싼 모델이 받을 수 있으면 그대로, 아니면 합친 문자열로 전달합니다.
+    """
+
+    accepts_prompts = True
+
+    def __init__(self, model, limiter=None, retry=None, breaker=None, model_name="", max_concurrency=None, sleep=time.sleep):
+        self.model = model
+        self.limiter = limiter
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.model_name = model_name
+        self.sleep = sleep
+        self.stats = {"calls": 0, "retries": 0, "coalesced": 0, "rejected": 0, "failures": 0, "queued": 0, "uncoalesced_streams": 0}
+        # 연결 자리. 세션이 많아도 모델 쪽으로 나가는 동시 요청 수가 이 값을 넘지 않음
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._stats_lock = threading.Lock()
+        self._inflight = {} # 요청 키 -> Future (진행 중인 동일 요청 공유)
+        self._inflight_lock = threading.Lock()
+        self._inflight_streams = Counter() # 요청 키 -> 진행 중인 스트림 수 (병합하지 않은 중복을 세기 위함)
+        self._local = threading.local() # 스레드별 마지막 호출의 재시도 횟수
+
+    def last_retries(self):
+        """현재 스레드에서 마지막으로 끝난 호출의 재시도 횟수를 반환합니다. (계측용)"""
+        return getattr(self._local, "retries", 0)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _before_call(self, prompt_str):
+        """서킷 브레이커와 속도 제한을 통과시킵니다."""
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("요청 실패가 이어져 잠시 모델 호출을 멈췄습니다. 잠시 후 다시 시도해주세요.")
+        if self.limiter is not None:
+            self.limiter.acquire(estimate_tokens(prompt_str))
+        self._count("calls")
+
+    def _acquire_slot(self):
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            self._count("queued")
+            self._slots.acquire()
+
+    def _release_slot(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    def _handle_failure(self, error, attempt):
+        """실패를 기록하고, 다시 시도해야 하면 백오프 후 True를 반환합니다."""
+        if not is_retryable(error):
+            # 서버가 응답한 요청 오류는 장애로 보지 않음
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        self._count("failures")
+        if attempt + 1 >= self.retry.max_attempts:
+            return False
+        self._count("retries")
+        self.sleep(self.retry.delay(attempt + 1))
+        return True
+
+    def _call(self, prompt, prompt_str, kwargs):
+        attempt = 0
+        while True:
+            self._local.retries = attempt
+            self._before_call(prompt_str)
+            self._acquire_slot()
+            try:
+                response = self.model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                # 백오프하는 동안에는 자리를 다른 호출에 넘김
+                self._release_slot()
+                if self._handle_failure(e, attempt):
+                    attempt += 1
+                    continue
+                raise
+            self._release_slot()
+            self.breaker.record_success()
+            return response
+
+    def _stream(self, prompt, prompt_str, kwargs):
+        """첫 청크를 받기 전의 실패만 재시도합니다. 이미 일부를 내보낸 뒤의 오류는 호출 측에 전달됩니다."""
+        attempt = 0
+        while True:
+            self._local.retries = attempt
+            self._before_call(prompt_str)
+            self._acquire_slot()
+            try:
+                iterator = iter(self.model.generate_content(prompt, stream=True, **kwargs))
+                first = next(iterator)
+            except StopIteration:
+                self._release_slot()
+                self.breaker.record_success()
+                return
+            except Exception as e:
+                self._release_slot()
+                if self._handle_failure(e, attempt):
+                    attempt += 1
+                    continue
+                raise
+            break
+        self.breaker.record_success()
+        # 스트림이 끝나거나 중간에 버려질 때까지 자리를 차지함
+        try:
+            yield first
+            try:
+                yield from iterator
+            except Exception as e:
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                    self._count("failures")
+                raise
+        finally:
+            self._release_slot()
+
+    def _tracked_stream(self, key, stream):
+        """스트림이 진행되는 동안 같은 요청의 스트림 수를 셉니다."""
+        with self._inflight_lock:
+            if self._inflight_streams[key] or key in self._inflight:
+                self._count("uncoalesced_streams")
+            self._inflight_streams[key] += 1
+        try:
+            yield from stream
+        finally:
+            with self._inflight_lock:
+                self._inflight_streams[key] -= 1
+                if not self._inflight_streams[key]:
+                    del self._inflight_streams[key]
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        prompt_str = prompt_text(prompt)
+        prompt = prompt_for(self.model, prompt)
+        key = make_cache_key(prompt_str, self.model_name, kwargs.get("generation_config"))
+        if stream:
+            return self._tracked_stream(key, self._stream(prompt, prompt_str, kwargs))
+
+        # 같은 요청이 이미 진행 중이면 새로 보내지 않고 그 결과를 함께 사용
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self._count("coalesced")
+            self._local.retries = 0
+            return future.result()
+
+        try:
+            response = self._call(prompt, prompt_str, kwargs)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
@@ -0,0 +1,307 @@
+"""모델 제공자 추상화: 실제 Gemini 모델 또는 오프라인 측정용 가짜 모델을 생성합니다."""
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from types import SimpleNamespace
+
+from conversation_context import estimate_tokens
+from prompt_templates import prompt_text
+
+PROVIDER_GEMINI = "gemini"
+PROVIDER_FAKE = "fake"
+
+# 가짜 모델이 돌려주는 발언 문장 조각
+_FAKE_OPENINGS = [
+    "그 방향은 조금 다르게 봐야 할 것 같아요.",
+    "저는 반대 입장에서 한 번 짚어볼게요.",
+    "좋은 지적인데, 실제 운영 관점에서는 걱정되는 부분이 있어요.",
+    "데이터를 먼저 확인하고 결정하는 게 맞다고 봅니다.",
+]
+_FAKE_POINTS = [
+    "신규 고객 유입보다 재구매율 개선이 비용 대비 효과가 큽니다.",
+    "시즌 오프 재고를 활용한 번들 구성을 먼저 테스트해보죠.",
+    "인플루언서 협업은 전환율 기준을 정해두지 않으면 예산만 소진됩니다.",
+    "모바일 결제 단계에서 이탈이 많으니 그 부분부터 줄여야 합니다.",
+    "경쟁사 가격 정책을 보면 할인보다 배송 속도가 더 중요한 차별점이에요.",
+]
+
+
+class FakeModelError(Exception):
+    """가짜 모델이 주입하는 API 오류. code는 HTTP 상태 코드를 흉내 냅니다."""
+
+    def __init__(self, message, code=503):
+        super().__init__(message)
+        self.code = code
+
+
+class LatencyProfile:
+    """호출 지연 시간 분포. kind는 "constant", "uniform", "lognormal" 중 하나입니다."""
+
+    def __init__(self, kind="lognormal", median=0.6, spread=0.4):
+        self.kind = kind
+        self.median = median
+        self.spread = spread # uniform: ±범위(초), lognormal: 로그 표준편차
+
+    def sample(self, rng):
+        if self.median <= 0:
+            return 0.0
+        if self.kind == "constant":
+            return self.median
+        if self.kind == "uniform":
+            return max(0.0, rng.uniform(self.median - self.spread, self.median + self.spread))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.median), self.spread)
+        raise ValueError(f"알 수 없는 지연 분포: {self.kind}")
+
+
+class UsageLog:
+    """가짜 모델 호출 횟수와 토큰 사용량을 프로세스 단위로 집계합니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.cached_tokens = 0
+            self.output_tokens = 0
+            self.errors = 0
+
+    def record_call(self, prompt_tokens, cached_tokens=0):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+
+    def record_output(self, output_tokens):
+        with self._lock:
+            self.output_tokens += output_tokens
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "output_tokens": self.output_tokens,
+                "errors": self.errors,
+            }
+
+
+# 모든 가짜 모델 인스턴스가 공유하는 사용량 기록 (벤치마크에서 읽음)
+fake_usage = UsageLog()
+
+
+class FakeGenerativeModel:
+    """
+    genai.GenerativeModel과 같은 generate_content 인터페이스를 가진 결정적 가짜 모델.
+    같은 seed와 프롬프트에는 항상 같은 응답을 돌려주며, 지연 시간·스트리밍 청크 간격·오류를 주입할 수 있습니다.
+    구조화된 프롬프트(Prompt)를 받으면 이미 본 system_instruction을 접두부 캐시 적중(cached_content_token_count)으로 집계합니다.
+    """
+
+    accepts_prompts = True
+
+    def __init__(self, model_name="fake", latency=None, chunk_interval=0.05, chunk_size=12,
+                 error_rate=0.0, stream_error_rate=0.0, seed=0, usage=None):
+        self.model_name = model_name
+        self.latency = latency or LatencyProfile()
+        self.chunk_interval = chunk_interval
+        self.chunk_size = chunk_size
+        self.error_rate = error_rate
+        self.stream_error_rate = stream_error_rate
+        self.seed = seed
+        self.usage = usage or fake_usage
+        # 오류 주입용 난수는 호출 순서에 따라 결정적으로 생성
+        self._failure_rng = random.Random(seed)
+        self._failure_lock = threading.Lock()
+        self._seen_systems = set() # 접두부 캐시에 올라간 것으로 보는 system_instruction
+        self._seen_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, model_name="fake"):
+        """FAKE_MODEL_* 환경 변수로 설정한 가짜 모델을 생성합니다."""
+        return cls(
+            model_name=model_name,
+            latency=LatencyProfile(
+                kind=os.getenv("FAKE_MODEL_LATENCY", "lognormal"),
+                median=float(os.getenv("FAKE_MODEL_LATENCY_MEDIAN", "0.6")),
+                spread=float(os.getenv("FAKE_MODEL_LATENCY_SPREAD", "0.4")),
+            ),
+            chunk_interval=float(os.getenv("FAKE_MODEL_CHUNK_INTERVAL", "0.05")),
+            error_rate=float(os.getenv("FAKE_MODEL_ERROR_RATE", "0")),
+            stream_error_rate=float(os.getenv("FAKE_MODEL_STREAM_ERROR_RATE", "0")),
+            seed=int(os.getenv("FAKE_MODEL_SEED", "0")),
+        )
+
+    def _rng(self, prompt):
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def _reply(self, prompt, rng):
+        """프롬프트 종류에 맞는 결정적 응답을 만듭니다."""
+        if "응답은 반드시 참석자 이름" in prompt:
+            # 대상 분석 프롬프트: 대부분 지목 없음
+            return "None"
+        if "# Agenda" in prompt:
+            return "# Agenda\n- 회의 주제 검토\n\n# Discussion\n- " + rng.choice(_FAKE_POINTS) + "\n\n# Feedback\n- 결론과 담당자를 정하면 좋겠습니다."
+        return rng.choice(_FAKE_OPENINGS) + " " + rng.choice(_FAKE_POINTS)
+
+    def _usage_metadata(self, prompt_tokens, output_tokens, cached_tokens=0):
+        return SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=cached_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+    def _cached_tokens(self, prompt):
+        system = getattr(prompt, "system", "")
+        if not system:
+            return 0
+        with self._seen_lock:
+            seen = system in self._seen_systems
+            self._seen_systems.add(system)
+        return estimate_tokens(system) if seen else 0
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        cached_tokens = self._cached_tokens(prompt)
+        prompt = prompt_text(prompt)
+        rng = self._rng(prompt)
+        # 오류 주입은 같은 프롬프트의 재시도가 성공할 수 있도록 호출마다 새로 뽑음
+        with self._failure_lock:
+            failure = self._failure_rng.random()
+        text = self._reply(prompt, rng)
+        prompt_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        self.usage.record_call(prompt_tokens, cached_tokens)
+        time.sleep(self.latency.sample(rng))
+
+        if failure < self.error_rate:
+            self.usage.record_error()
+            raise FakeModelError("429 Resource has been exhausted (fake)", code=429)
+
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        usage_metadata = self._usage_metadata(prompt_tokens, output_tokens, cached_tokens)
+        if not stream:
+            time.sleep(self.chunk_interval * max(0, len(chunks) - 1))
+            self.usage.record_output(output_tokens)
+            return SimpleNamespace(text=text, usage_metadata=usage_metadata)
+        return self._stream(chunks, usage_metadata, failure < self.error_rate + self.stream_error_rate)
+
+    def _stream(self, chunks, usage_metadata, fail_midway):
+        """첫 청크는 지연 시간 후 바로, 이후 청크는 chunk_interval 간격으로 내보냅니다."""
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(self.chunk_interval)
+            if fail_midway and i == len(chunks) // 2:
+                self.usage.record_error()
+                raise FakeModelError("503 stream interrupted (fake)", code=503)
+            yield SimpleNamespace(text=chunk, usage_metadata=usage_metadata)
+        self.usage.record_output(usage_metadata.candidates_token_count)
+
+
+class GeminiModel:
+    """
+    genai.GenerativeModel 어댑터. 구조화된 프롬프트(Prompt)는 system_instruction을 가진 모델로 보내며,
+    그 모델은 system_instruction(페르소나·프롬프트 종류)마다 한 번만 만들어 재사용합니다.
+    context_cache_min_tokens를 주면 system과 회의 주제(prefix)를 합친 고정 접두부가 그 이상일 때
+    명시적 컨텍스트 캐시에 올리고, 턴마다 바뀌는 파트만 보냅니다.
+    """
+
+    accepts_prompts = True
+
+    def __init__(self, genai, model_name, context_cache_min_tokens=0, context_cache_ttl=3600, max_models=256):
+        self.genai = genai
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.context_cache_min_tokens = context_cache_min_tokens
+        self.context_cache_ttl = context_cache_ttl
+        self.max_models = max_models
+        self._models = OrderedDict() # system_instruction -> GenerativeModel
+        self._cached_models = OrderedDict() # (system, prefix) -> (만료 시각, 캐시된 모델 또는 None)
+        self._lock = threading.Lock()
+
+    def _remember(self, table, key, value):
+        with self._lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > self.max_models:
+                table.popitem(last=False)
+
+    def _model_for(self, system):
+        if not system:
+            # 지시문을 contents에 그대로 둔 프롬프트(지목 대상 판별, 회의 요약)는 기본 모델 사용
+            return self.model
+        with self._lock:
+            model = self._models.get(system)
+            if model is not None:
+                self._models.move_to_end(system)
+                return model
+        model = self.genai.GenerativeModel(self.model_name, system_instruction=system)
+        self._remember(self._models, system, model)
+        return model
+
+    def _cached_model_for(self, prompt):
+        """고정 접두부가 충분히 길면 컨텍스트 캐시에 올린 모델을 반환합니다. 캐시를 쓸 수 없으면 None."""
+        if not self.context_cache_min_tokens or not prompt.prefix:
+            return None
+        key = (prompt.system, prompt.prefix)
+        now = time.time()
+        with self._lock:
+            entry = self._cached_models.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        model = None
+        if estimate_tokens(prompt.system) + sum(estimate_tokens(part) for part in prompt.prefix) >= self.context_cache_min_tokens:
+            try:
+                content = self.genai.caching.CachedContent.create(
+                    model=self.model_name,
+                    system_instruction=prompt.system or None,
+                    contents=prompt.prefix_contents(),
+                    ttl=timedelta(seconds=self.context_cache_ttl),
+                )
+                model = self.genai.GenerativeModel.from_cached_content(cached_content=content)
+            except Exception:
+                # 캐시를 지원하지 않는 모델이거나 최소 토큰 수에 못 미치면 일반 호출 (만료 시각까지 다시 시도하지 않음)
+                model = None
+        # 캐시가 만료되기 조금 전에 새로 만들도록 여유를 둠
+        self._remember(self._cached_models, key, (now + self.context_cache_ttl * 0.9, model))
+        return model
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if isinstance(prompt, str):
+            return self.model.generate_content(prompt, stream=stream, **kwargs)
+        cached_model = self._cached_model_for(prompt)
+        if cached_model is not None:
+            return cached_model.generate_content(prompt.contents(include_prefix=False), stream=stream, **kwargs)
+        return self._model_for(prompt.system).generate_content(prompt.contents(), stream=stream, **kwargs)
+
+    def __getattr__(self, name):
+        # __init__이 끝나기 전이나 unpickle 중에는 self.model이 없으므로 무한 재귀 대신 AttributeError
+        if name == "model" or name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def create_model(provider=PROVIDER_GEMINI, model_name="gemini-2.0-flash", api_key=None,
+                 context_cache_min_tokens=0, context_cache_ttl=3600):
+    """제공자 이름에 맞는 모델을 생성합니다. 실제 Gemini 라이브러리는 필요할 때만 불러옵니다."""
+    if provider == PROVIDER_FAKE:
+        return FakeGenerativeModel.from_env(model_name)
+    if provider == PROVIDER_GEMINI:
+        import google.generativeai as genai
+        if api_key:
+            genai.configure(api_key=api_key)
+        return GeminiModel(genai, model_name, context_cache_min_tokens, context_cache_ttl)
+    raise ValueError(f"알 수 없는 모델 제공자: {provider}")
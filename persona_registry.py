@@ -0,0 +1,175 @@
+"""
+personas.json을 읽어 이름·별칭 색인과 미리 만들어 둔 프롬프트 조각을 갖춘 페르소나 명단.
+
+파일이 바뀌면(수정 시각 기준) 다음 조회 때 다시 읽습니다. 명단은 통째로 교체되므로
+진행 중인 회의는 끊기지 않고 다음 턴부터 새 명단을 사용합니다.
+"""
+import json
+import os
+import threading
+import time
+
+DEFAULT_EMOJI = "🤖"
+RELOAD_CHECK_INTERVAL = 1.0 # 파일 수정 시각을 확인하는 최소 간격(초)
+
+# 페르소나 자기소개 (system_instruction 앞부분, 페르소나마다 한 번만 만듦)
+PROMPT_INTRO_TEMPLATE = (
+    "당신은 여성 패션 이커머스 플랫폼 회사에 근무하는 '{name}'라는 이름의 {role}입니다.\n"
+    "당신의 성향은 {mbti}이며, MBTI 성향에 맞는 방식으로 문제를 파악하고 사고합니다."
+)
+
+
+class Persona:
+    """
+    페르소나 한 명의 정보. 기존 코드와 같이 persona["name"], persona.get("aliases")처럼 읽을 수 있습니다.
+    personas.json의 그 밖의 항목은 extra에 보관됩니다.
+    """
+
+    __slots__ = ("name", "role", "mbti", "assertiveness", "aliases", "emoji", "prompt_intro", "extra")
+
+    FIELDS = ("name", "role", "mbti", "assertiveness", "aliases", "emoji")
+
+    def __init__(self, name, role="전략 전문가", mbti="", assertiveness=None, aliases=(), emoji=DEFAULT_EMOJI, extra=None):
+        self.name = name
+        self.role = role
+        self.mbti = mbti
+        self.assertiveness = assertiveness
+        # personas.json에 별칭을 하나만 문자열로 적은 경우 글자 단위로 쪼개지 않도록
+        self.aliases = (aliases,) if isinstance(aliases, str) else tuple(aliases)
+        self.emoji = emoji
+        self.extra = extra or {}
+        self.prompt_intro = PROMPT_INTRO_TEMPLATE.format(name=name, role=role, mbti=mbti)
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data.get("name"):
+            raise ValueError(f"페르소나에 name이 없습니다: {data}")
+        known = {key: data[key] for key in cls.FIELDS if data.get(key) is not None}
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        return cls(extra=extra, **known)
+
+    def get(self, key, default=None):
+        if key in self.FIELDS or key == "prompt_intro":
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in self.FIELDS if getattr(self, key) is not None}
+        data["aliases"] = list(self.aliases)
+        data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"Persona({self.name!r})"
+
+
+class PersonaRegistry:
+    """
+    페르소나 명단과 색인. personas는 명단이 바뀔 때만 새 튜플로 교체되므로,
+    호출 측은 객체가 같으면 이전에 만든 파생 데이터(가중치 표 등)를 그대로 써도 됩니다.
+    """
+
+    def __init__(self, personas=(), path=None, check_interval=RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.version = 0
+        self.last_error = None
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._install(personas)
+
+    @classmethod
+    def from_file(cls, path, check_interval=RELOAD_CHECK_INTERVAL):
+        """파일에서 명단을 읽습니다. 처음 읽을 때의 오류는 그대로 전달합니다."""
+        registry = cls(path=path, check_interval=check_interval)
+        mtime = os.stat(path).st_mtime
+        registry._install(_read_personas(path))
+        registry._mtime = mtime
+        registry._checked = time.monotonic()
+        return registry
+
+    @classmethod
+    def ensure(cls, personas):
+        """이미 명단이면 그대로, 목록이면 명단으로 감싸 반환합니다."""
+        return personas if isinstance(personas, cls) else cls(personas)
+
+    def _install(self, personas):
+        records = tuple(p if isinstance(p, Persona) else Persona.from_dict(p) for p in personas)
+        by_name = {p.name: p for p in records}
+        forms = {}
+        for p in records:
+            forms[p.name.lower()] = p.name
+            for alias in p.aliases:
+                forms[alias.lower()] = p.name
+        # 유사 일치(오타 허용) 후보를 길이별로 나눠 둠 (길이 차이가 크면 비교하지 않도록)
+        forms_by_length = {}
+        for form, name in forms.items():
+            forms_by_length.setdefault(len(form), []).append((form, name))
+        # 색인을 모두 만든 뒤 한 번에 교체 (읽는 쪽은 잠금 없이 사용)
+        self._by_name = by_name
+        self.forms = forms
+        self.forms_by_length = {length: tuple(entries) for length, entries in forms_by_length.items()}
+        self.names = tuple(by_name)
+        self.name_set = frozenset(by_name)
+        self.personas = records
+        self.version += 1
+
+    def maybe_reload(self):
+        """파일 수정 시각이 바뀌었으면 다시 읽습니다. 읽기에 실패하면 기존 명단을 유지하고 False를 반환합니다."""
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return False
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if mtime == self._mtime:
+                    return False
+                personas = _read_personas(self.path)
+                self._install(personas)
+                self._mtime = mtime
+                self.last_error = None
+                return True
+            except (OSError, ValueError) as e:
+                # 편집 도중 잘못된 파일이 저장되어도 진행 중인 회의는 기존 명단으로 계속
+                self.last_error = e
+                return False
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def resolve(self, name_or_alias):
+        """이름이나 별칭(대소문자 무시)으로 페르소나를 찾습니다."""
+        name = self.forms.get(name_or_alias.lower())
+        return self._by_name.get(name) if name else None
+
+    def emoji(self, name, default=DEFAULT_EMOJI):
+        persona = self._by_name.get(name)
+        return persona.emoji if persona else default
+
+    def __iter__(self):
+        return iter(self.personas)
+
+    def __len__(self):
+        return len(self.personas)
+
+
+def _read_personas(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("personas.json은 페르소나 목록이어야 합니다.")
+    return [Persona.from_dict(item) for item in data]
@@ -0,0 +1,112 @@
+"""
+미리 만들어 두는 프롬프트 템플릿.
+
+프롬프트를 세 부분으로 나눕니다.
+- system: 페르소나 소개와 지시 사항처럼 바뀌지 않는 앞부분 (system_instruction)
+- prefix: 회의 주제처럼 회의 동안 고정된 파트 (명시적 컨텍스트 캐시 대상)
+- parts: 대화 기록처럼 턴마다 바뀌는 파트
+앞부분이 매번 같은 글자로 시작하므로 모델 쪽 접두부 캐시를 재사용할 수 있고, 대화 기록(History)은 하나로 합친
+문자열 대신 사용자 content 하나 안에서 메시지마다 part 하나로 전달합니다. 구조화된 프롬프트를 받지 않는 모델에는 text()로 합친 문자열을 보냅니다.
+"""
+import threading
+
+
+class History(tuple):
+    """프롬프트에 넣을 대화 기록. 한 줄(메시지)씩 담고, 문자열로 쓰면 줄바꿈으로 합칩니다."""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return "\n".join(self)
+
+
+class Prompt:
+    """모델에 보낼 프롬프트 하나. text()는 처음 호출할 때 한 번만 합칩니다."""
+
+    __slots__ = ("system", "prefix", "parts", "_text")
+
+    def __init__(self, system="", prefix=(), parts=()):
+        self.system = system
+        self.prefix = tuple(prefix)
+        self.parts = tuple(parts)
+        self._text = None
+
+    def text(self):
+        """system, prefix, parts를 순서대로 합친 문자열. 응답 캐시 키와 토큰 추정에도 사용합니다."""
+        if self._text is None:
+            self._text = "\n\n".join(str(part) for part in (self.system,) + self.prefix + self.parts if part)
+        return self._text
+
+    def contents(self, include_prefix=True):
+        """
+        generate_content에 넘길 contents. 페르소나 발언을 모델 턴으로 보내거나 같은 역할의 턴을 연달아 보내지 않도록
+        사용자 content 하나에 담고, 대화 기록(History)은 메시지마다 part 하나로 나눕니다.
+        include_prefix=False면 컨텍스트 캐시에 올린 prefix를 뺍니다.
+        """
+        parts = []
+        for part in (self.prefix if include_prefix else ()) + self.parts:
+            if isinstance(part, History):
+                parts.extend({"text": line} for line in part if line)
+            elif part:
+                parts.append({"text": part})
+        return [{"role": "user", "parts": parts}]
+
+    def prefix_contents(self):
+        """컨텍스트 캐시에 올릴 고정 파트의 contents."""
+        return [{"role": "user", "parts": [{"text": part} for part in self.prefix if part]}]
+
+    def __repr__(self):
+        return f"Prompt({self.text()[:40]!r}…)"
+
+
+def prompt_text(prompt):
+    """문자열 프롬프트는 그대로, Prompt는 합친 문자열로 반환합니다."""
+    return prompt if isinstance(prompt, str) else prompt.text()
+
+
+def prompt_for(model, prompt):
+    """모델이 구조화된 프롬프트를 받으면(accepts_prompts) 그대로, 아니면 합친 문자열로 반환합니다."""
+    if isinstance(prompt, str) or getattr(model, "accepts_prompts", False):
+        return prompt
+    return prompt.text()
+
+
+class PromptTemplate:
+    """
+    system 지시문과 파트 형식 문자열로 이루어진 템플릿.
+    system은 고정 값(페르소나 등)마다 한 번만 채워 두고, 같은 문자열 객체를 계속 재사용합니다.
+    """
+
+    def __init__(self, system, prefix=(), parts=(), max_systems=1024):
+        self.system = system
+        self.prefix = tuple(prefix)
+        self.parts = tuple(parts)
+        self.max_systems = max_systems
+        self._systems = {} # 고정 값 -> 채운 system
+        self._lock = threading.Lock()
+
+    def system_for(self, **static):
+        key = tuple(sorted(static.items()))
+        system = self._systems.get(key)
+        if system is None:
+            system = self.system.format(**static)
+            with self._lock:
+                if len(self._systems) >= self.max_systems:
+                    self._systems.clear()
+                system = self._systems.setdefault(key, system)
+        return system
+
+    def render(self, static=None, **values):
+        """static으로 system을, values로 prefix와 parts를 채운 Prompt를 반환합니다."""
+        return Prompt(
+            self.system_for(**(static or {})),
+            [_fill(part, values) for part in self.prefix],
+            [_fill(part, values) for part in self.parts],
+        )
+
+
+def _fill(part, values):
+    """파트를 채웁니다. "{history}"처럼 필드 하나뿐인 파트에 History를 넘기면 메시지 단위를 그대로 둡니다."""
+    if part.startswith("{") and part.endswith("}") and isinstance(values.get(part[1:-1]), History):
+        return values[part[1:-1]]
+    return part.format(**values)
@@ -0,0 +1,77 @@
+"""모델 호출 한도를 지키기 위한 토큰 버킷 속도 제한기."""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    분당 rate_per_minute만큼 토큰이 채워지는 토큰 버킷. capacity만큼의 순간 버스트를 허용합니다.
+    rate_per_minute가 0이나 None이면 제한하지 않습니다. 여러 스레드가 함께 사용할 수 있습니다.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if rate_per_minute is not None and rate_per_minute < 0:
+            raise ValueError("rate_per_minute는 0 이상이어야 합니다.")
+        self.unlimited = not rate_per_minute
+        self.rate_per_second = (rate_per_minute or 0) / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate_per_second)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def try_acquire(self, amount=1):
+        """토큰을 얻으면 0을, 부족하면 기다려야 할 시간(초)을 반환합니다."""
+        if self.unlimited:
+            return 0.0
+        # 버킷 크기보다 큰 요청이 영원히 기다리지 않도록 capacity로 제한
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate_per_second
+
+    def acquire(self, amount=1, timeout=None):
+        """토큰을 얻을 때까지 기다립니다. timeout(초) 안에 얻지 못하면 False를 반환합니다."""
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            wait = self.try_acquire(amount)
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            self.sleep(wait)
+
+
+class RequestLimiter:
+    """
+    분당 요청 수와 분당 토큰 수를 함께 제한합니다. 두 버킷 모두에서 허용될 때까지 기다립니다.
+    한도를 0이나 None으로 주면 그 항목은 제한하지 않습니다.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None, clock=time.monotonic, sleep=time.sleep):
+        # 요청은 분당 한도의 1/4까지 몰려도 바로 보내고, 그 이상은 고르게 분산
+        self.requests = TokenBucket(requests_per_minute, capacity=max(1.0, (requests_per_minute or 0) / 4), clock=clock, sleep=sleep)
+        # 토큰 버킷은 한 번에 1분 한도까지 버스트를 허용 (긴 프롬프트 하나가 막히지 않도록)
+        self.tokens = TokenBucket(tokens_per_minute, capacity=tokens_per_minute, clock=clock, sleep=sleep) if tokens_per_minute else None
+        self.waits = 0 # 한도 때문에 기다린 호출 수
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=0):
+        if self.requests.try_acquire() > 0:
+            with self._lock:
+                self.waits += 1
+            self.requests.acquire()
+        if self.tokens is not None and tokens:
+            self.tokens.acquire(tokens)
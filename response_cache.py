@@ -0,0 +1,168 @@
+"""Gemini 응답을 프롬프트 해시로 캐싱하는 캐시 계층 (메모리 LRU / SQLite)."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(prompt):
+    """들여쓰기와 연속 공백 차이로 키가 달라지지 않도록 프롬프트를 정규화합니다."""
+    return " ".join(prompt.split())
+
+
+def make_cache_key(prompt, model_name, generation_config=None):
+    """정규화된 프롬프트, 모델 이름, 생성 설정으로 캐시 키를 만듭니다."""
+    payload = json.dumps(
+        {"model": model_name, "config": generation_config or {}, "prompt": normalize_prompt(prompt)},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheStats:
+    """캐시 적중/실패/만료/제거 횟수를 집계합니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def add(self, key, n=1):
+        with self._lock:
+            self.counts[key] += n
+
+    def hit_rate(self):
+        with self._lock:
+            total = self.counts["hits"] + self.counts["misses"]
+            return self.counts["hits"] / total if total else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+class MemoryCache:
+    """프로세스 메모리에 보관하는 LRU 캐시. ttl(초)이 지난 항목은 조회 시 만료됩니다."""
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries = OrderedDict() # key -> (저장 시각, 값)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.add("misses")
+                return None
+            created, value = entry
+            if self.ttl and time.time() - created > self.ttl:
+                del self._entries[key]
+                self.stats.add("expired")
+                self.stats.add("misses")
+                return None
+            self._entries.move_to_end(key)
+            self.stats.add("hits")
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.add("evictions")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """디스크(SQLite)에 보관하는 캐시. 재시작 후에도 유지되며 마지막 조회 시각 기준으로 LRU 제거합니다."""
+
+    def __init__(self, path, max_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.add("misses")
+                return None
+            value, created = row
+            if self.ttl and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.add("expired")
+                self.stats.add("misses")
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats.add("hits")
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                )
+                self.stats.add("evictions", excess)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def create_cache(backend="memory", path=".cache/responses.sqlite3", max_entries=None, ttl=None):
+    """설정 이름으로 캐시 백엔드를 생성합니다. ("memory" 또는 "sqlite")"""
+    options = {}
+    if max_entries is not None:
+        options["max_entries"] = max_entries
+    if ttl is not None:
+        options["ttl"] = ttl
+    if backend == "sqlite":
+        return SQLiteCache(path, **options)
+    if backend == "memory":
+        return MemoryCache(**options)
+    raise ValueError(f"알 수 없는 캐시 백엔드: {backend}")
@@ -0,0 +1,81 @@
+"""
+한 프로세스에서 동시에 열린 회의 세션을 최근 활동 순으로 추적하고, 쉬고 있는 세션의 메모리를 비우는 세션 풀.
+
+세션이 idle_timeout초 동안 쓰이지 않았거나 메모리에 올라온 세션이 max_active개를 넘으면, 가장 오래 쉰 세션부터
+release_memory()를 호출해 대화 기록을 디스크로 내보냅니다. 세션 객체는 약한 참조로만 가지므로 브라우저 세션이
+정리되면 풀에서도 함께 빠지고, 정리된 세션이 다시 쓰이면 필요한 메시지만 저장소에서 읽어 그대로 이어집니다.
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+
+class SessionPool:
+    """세션 id -> (세션 약한 참조, 마지막 활동 시각)을 최근 활동 순으로 보관합니다. 여러 스레드가 함께 사용할 수 있습니다."""
+
+    def __init__(self, idle_timeout=1800.0, max_active=200, sweep_interval=30.0, clock=time.monotonic):
+        self.idle_timeout = idle_timeout
+        self.max_active = max_active
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.stats = {"evictions": 0, "resumed": 0}
+        self._sessions = OrderedDict() # 메모리에 올라온 세션 (오래 쉰 세션이 앞)
+        self._evicted = weakref.WeakValueDictionary() # 메모리를 비운 세션
+        self._swept = clock()
+        self._lock = threading.Lock()
+
+    def touch(self, session):
+        """세션이 쓰였음을 기록합니다. 매 실행(요청)마다 호출하며, 주기적으로 쉬고 있는 세션을 정리합니다."""
+        now = self.clock()
+        key = session.session_id
+        with self._lock:
+            if self._evicted.pop(key, None) is not None:
+                self.stats["resumed"] += 1
+            self._sessions[key] = (weakref.ref(session), now)
+            self._sessions.move_to_end(key)
+            due = len(self._sessions) > self.max_active or now - self._swept >= self.sweep_interval
+        if due:
+            self.sweep(now)
+
+    def sweep(self, now=None):
+        """쉬고 있는 세션과 상한을 넘는 세션의 메모리를 비우고, 비운 세션 수를 반환합니다."""
+        now = self.clock() if now is None else now
+        candidates = []
+        with self._lock:
+            self._swept = now
+            overflow = len(self._sessions) - self.max_active
+            for key, (ref, last_active) in list(self._sessions.items()):
+                session = ref()
+                if session is None:
+                    # 브라우저 세션이 이미 정리됨
+                    del self._sessions[key]
+                    overflow -= 1
+                    continue
+                if overflow <= 0 and now - last_active < self.idle_timeout:
+                    break # 뒤쪽은 더 최근에 쓰인 세션
+                del self._sessions[key]
+                overflow -= 1
+                candidates.append((key, session, last_active))
+        evicted = 0
+        # 세션 정리는 저장소 기록을 포함하므로 락 밖에서 실행
+        for key, session, last_active in candidates:
+            if session.release_memory():
+                evicted += 1
+                with self._lock:
+                    if key not in self._sessions: # 정리하는 동안 다시 쓰이지 않았으면
+                        self._evicted[key] = session
+            else:
+                # 턴이 진행 중인 세션은 다음 정리 때 다시 확인
+                with self._lock:
+                    if key not in self._sessions:
+                        self._sessions[key] = (weakref.ref(session), last_active)
+                        self._sessions.move_to_end(key, last=False)
+        with self._lock:
+            self.stats["evictions"] += evicted
+        return evicted
+
+    def snapshot(self):
+        """메모리에 올라온 세션 수, 메모리를 비운 세션 수, 누적 정리/재개 횟수를 반환합니다."""
+        with self._lock:
+            return {"active": len(self._sessions), "idle": len(self._evicted), **self.stats}
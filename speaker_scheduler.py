@@ -0,0 +1,182 @@
+"""
+페르소나 턴의 발언자를 고르는 스케줄러.
+
+적극성(assertiveness)에 비례하는 추첨은 별칭(alias) 방식 표로 O(1)에 뽑고, 회의 동안의 발언 횟수와
+최근 발언 여부는 추첨 결과를 받아들일 확률로 반영합니다. 매 턴 전체 명단을 다시 훑지 않으므로
+수백 명의 페르소나에서도 턴마다 드는 비용이 일정합니다.
+"""
+import random
+
+DEFAULT_ASSERTIVENESS = 0.5 # personas.json에 assertiveness가 없을 때의 발언 가중치
+
+# 발언자 선택 방식
+POLICY_WEIGHTED = "weighted" # 적극성에 비례해 1~2명 추첨 (공정성·최근 발언 보정)
+POLICY_ROUND_ROBIN = "round_robin" # 명단 순서대로 돌아가며 1~2명
+POLICY_DEBATE_PAIR = "debate_pair" # 성향이 다른 두 명을 짝지어 토론
+POLICIES = (POLICY_WEIGHTED, POLICY_ROUND_ROBIN, POLICY_DEBATE_PAIR)
+
+MAX_DRAWS = 64 # 보정 때문에 계속 거절될 때 추첨을 멈추는 횟수
+MIN_ACCEPT = 0.05 # 보정 후에도 남는 최소 수락 확률 (누구도 완전히 배제되지 않도록)
+
+
+class AliasTable:
+    """가중치에 비례하는 확률로 인덱스를 O(1)에 뽑는 별칭 표. (Vose 방식, 생성은 O(n))"""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("가중치 합이 0보다 커야 합니다.")
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 부동소수점 오차로 남은 칸은 확률 1
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, rng):
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def mbti_distance(a, b):
+    """두 MBTI 성향에서 다른 글자 수의 비율(0~1)을 반환합니다."""
+    a, b = (a or "").upper(), (b or "").upper()
+    if len(a) != 4 or len(b) != 4:
+        return 0.5
+    return sum(x != y for x, y in zip(a, b)) / 4
+
+
+class SpeakerScheduler:
+    """
+    회의 한 건의 발언자 스케줄러. next_speakers()로 다음 발언자를 고르고, 실제 발언 후 record()로 알려줍니다.
+
+    weighted 방식에서는 적극성 비율로 뽑은 뒤, 자기 몫(적극성 비율)보다 많이 말한 페르소나와
+    방금 말한 페르소나는 낮은 확률로만 받아들입니다. 최근 발언 보정은 턴마다 recency_decay배로 줄어듭니다.
+    seed를 주면 같은 입력에 대해 항상 같은 순서로 뽑습니다.
+    """
+
+    def __init__(self, personas=(), policy=POLICY_WEIGHTED, max_speakers=2, recency_penalty=0.6,
+                 recency_decay=0.5, seed=None, rng=None):
+        if policy not in POLICIES:
+            raise ValueError(f"알 수 없는 발언자 선택 방식: {policy}")
+        self.policy = policy
+        self.max_speakers = max_speakers
+        self.recency_penalty = recency_penalty
+        self.recency_decay = recency_decay
+        self.rng = rng or random.Random(seed)
+        self._personas = None
+        self.set_personas(personas)
+        self.reset()
+
+    def set_personas(self, personas):
+        """명단이 바뀌었을 때만 별칭 표와 색인을 다시 만듭니다. 발언 기록은 이름 기준이라 그대로 유지됩니다."""
+        self._personas = personas
+        self._index = {p["name"]: i for i, p in enumerate(personas)}
+        weights = [max(0.0, float(p.get("assertiveness", DEFAULT_ASSERTIVENESS))) for p in personas]
+        if personas and sum(weights) <= 0:
+            weights = [1.0] * len(personas)
+        self._weights = weights
+        self._total_weight = sum(weights)
+        self._table = AliasTable(weights) if personas else None
+
+    def reset(self):
+        """회의가 새로 시작될 때 발언 기록을 비웁니다."""
+        self.turn = 0 # 기록된 페르소나 턴 수
+        self.spoken = 0 # 전체 발언 수
+        self.counts = {} # 이름 -> 발언 수
+        self.last_turn = {} # 이름 -> 마지막으로 발언한 턴
+        self._cursor = 0 # round_robin 다음 순서
+
+    def _sync(self, personas):
+        if personas is not None and personas is not self._personas:
+            self.set_personas(personas)
+
+    # --- 보정 ---
+
+    def _accept_probability(self, i):
+        name = self._personas[i]["name"]
+        accept = 1.0
+        # 공정성: 적극성 비율로 기대되는 발언 수보다 많이 말했다면 그만큼 덜 받아들임
+        count = self.counts.get(name, 0)
+        if count:
+            expected = (self.spoken + 1) * self._weights[i] / self._total_weight
+            accept *= min(1.0, expected / count)
+        # 최근 발언: 방금 말했을수록 덜 받아들이고, 턴이 지날수록 보정이 줄어듦
+        last = self.last_turn.get(name)
+        if last is not None:
+            age = self.turn - last - 1
+            accept *= 1.0 - self.recency_penalty * (self.recency_decay ** age)
+        return max(MIN_ACCEPT, accept)
+
+    def _draw(self, exclude, affinity=None):
+        """보정된 확률로 한 명을 뽑습니다. affinity(i)가 주어지면 수락 확률에 곱합니다."""
+        candidate = None
+        for _ in range(MAX_DRAWS):
+            i = self._table.sample(self.rng)
+            if i in exclude:
+                continue
+            candidate = i
+            accept = self._accept_probability(i)
+            if affinity is not None:
+                accept *= max(MIN_ACCEPT, affinity(i))
+            if self.rng.random() < accept:
+                return i
+        if candidate is None:
+            # 제외된 사람이 너무 많아 계속 겹치면 남은 사람 중에서 고름
+            remaining = [i for i in range(len(self._personas)) if i not in exclude]
+            candidate = self.rng.choice(remaining)
+        return candidate
+
+    # --- 선택 ---
+
+    def _num_speakers(self):
+        return self.rng.randint(1, min(len(self._personas), self.max_speakers))
+
+    def next_speakers(self, personas=None):
+        """다음 페르소나 턴의 발언자 목록을 반환합니다. 상태는 바꾸지 않으므로 실제 발언 후 record()를 호출하세요."""
+        self._sync(personas)
+        if not self._personas:
+            return []
+        n = len(self._personas)
+        if self.policy == POLICY_ROUND_ROBIN:
+            return [self._personas[(self._cursor + k) % n] for k in range(self._num_speakers())]
+
+        first = self._draw(set())
+        chosen = [first]
+        if self.policy == POLICY_DEBATE_PAIR:
+            if n > 1:
+                # 첫 발언자와 성향이 다를수록 상대로 뽑힐 확률이 높음
+                first_mbti = self._personas[first].get("mbti")
+                chosen.append(self._draw({first}, lambda i: mbti_distance(first_mbti, self._personas[i].get("mbti"))))
+        else:
+            for _ in range(self._num_speakers() - 1):
+                chosen.append(self._draw(set(chosen)))
+        return [self._personas[i] for i in chosen]
+
+    def record(self, speakers):
+        """실제로 발언한 페르소나를 기록합니다. (지목되어 발언한 경우 포함)"""
+        self.turn += 1
+        for persona in speakers:
+            name = persona["name"]
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.last_turn[name] = self.turn - 1
+            self.spoken += 1
+            i = self._index.get(name)
+            if i is not None:
+                self._cursor = (i + 1) % len(self._personas)
+
+    def shares(self):
+        """페르소나별 발언 비율을 반환합니다."""
+        return {name: count / self.spoken for name, count in self.counts.items()} if self.spoken else {}
@@ -0,0 +1,139 @@
+"""
+사용자가 입력하는 동안 다음 페르소나 턴을 미리 준비하는 추측 생성기.
+
+다음 발언자를 스케줄러로 미리 뽑아 두고, 각 발언자의 입장 초안을 백그라운드에서 생성합니다.
+실제 메시지가 도착하면 초안을 바탕으로 짧은 프롬프트로 최종 발언을 만들어 첫 토큰까지의 대기 시간을 줄입니다.
+추측 호출은 전체 모델 사용량(추정 토큰) 중 max_share 비율을 넘지 않습니다.
+"""
+import threading
+
+
+class SpeculationBudget:
+    """추측 호출이 전체 모델 사용량(추정 토큰)에서 차지하는 비율을 max_share 이하로 유지합니다."""
+
+    def __init__(self, max_share=0.2):
+        self.max_share = max_share
+        self.regular_tokens = 0
+        self.speculative_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, tokens):
+        """일반 호출의 사용량을 기록합니다."""
+        with self._lock:
+            self.regular_tokens += tokens
+
+    def try_reserve(self, tokens):
+        """추측 호출 하나의 예상 사용량을 예약합니다. 한도를 넘게 되면 False를 반환합니다."""
+        with self._lock:
+            total = self.regular_tokens + self.speculative_tokens + tokens
+            if self.speculative_tokens + tokens > self.max_share * total:
+                return False
+            self.speculative_tokens += tokens
+            return True
+
+    def share(self):
+        with self._lock:
+            total = self.regular_tokens + self.speculative_tokens
+            return self.speculative_tokens / total if total else 0.0
+
+
+class Speculator:
+    """
+    대화 위치(key)마다 한 번씩 다음 발언자와 입장 초안을 준비합니다.
+    key가 바뀌면(새 메시지가 추가되면) 이전 준비는 버려집니다.
+    """
+
+    def __init__(self, max_share=0.2):
+        self.budget = SpeculationBudget(max_share)
+        self.stats = {
+            "rounds": 0, # 추측을 준비한 횟수
+            "drafts": 0, # 시작한 초안 생성 호출 수
+            "skipped_budget": 0, # 사용량 한도 때문에 건너뛴 초안 수
+            "hits": 0, # 실제 발언에 사용된 초안 수
+            "pending": 0, # 메시지가 도착했을 때 아직 생성 중이라 쓰지 못한 초안 수
+            "misses": 0, # 준비된 초안 없이 발언한 수 (다른 페르소나 지목, 생성 실패 등)
+            "wasted": 0, # 발언자가 바뀌어 쓰이지 않은 초안 수
+        }
+        self._lock = threading.Lock()
+        self._key = None
+        self._planned = None
+        self._drafts = {}
+
+    def _count(self, key, n=1):
+        self.stats[key] += n
+
+    def _discard(self):
+        """쓰이지 않은 초안을 정리합니다. 호출 전에 락을 잡고 있어야 합니다."""
+        for future in self._drafts.values():
+            future.cancel()
+        self._count("wasted", len(self._drafts))
+        self._drafts = {}
+
+    def reset(self):
+        """회의가 새로 시작되거나 초기화될 때 준비된 추측을 모두 버립니다."""
+        with self._lock:
+            self._discard()
+            self._key = None
+            self._planned = None
+
+    def is_prepared(self, key):
+        with self._lock:
+            return self._key == key
+
+    def prepare(self, key, speakers, start_draft, draft_cost):
+        """
+        key 위치에 대해 다음 발언자(speakers)를 기록하고 초안 생성을 시작합니다.
+        start_draft(persona)는 Future를 반환해야 하며, draft_cost는 호출 하나의 예상 토큰 수입니다.
+        """
+        with self._lock:
+            if self._key == key:
+                return
+            self._discard()
+            self._key = key
+            self._planned = list(speakers)
+            self._count("rounds")
+            for persona in speakers:
+                if not self.budget.try_reserve(draft_cost):
+                    self._count("skipped_budget")
+                    continue
+                self._drafts[persona["name"]] = start_draft(persona)
+                self._count("drafts")
+
+    def planned_speakers(self, key):
+        """key 위치에서 미리 뽑아 둔 발언자 목록을 반환합니다. 준비된 것이 없으면 None."""
+        with self._lock:
+            return list(self._planned) if self._key == key and self._planned else None
+
+    def take_draft(self, key, name):
+        """완성된 초안이 있으면 꺼내 반환합니다. 아직 생성 중이면 기다리지 않고 None을 반환합니다."""
+        with self._lock:
+            future = self._drafts.pop(name, None) if self._key == key else None
+            if future is None:
+                self._count("misses")
+                return None
+            if not future.done():
+                future.cancel()
+                self._count("pending")
+                return None
+            try:
+                draft = future.result()
+            except Exception:
+                self._count("misses")
+                return None
+            if not draft:
+                self._count("misses")
+                return None
+            self._count("hits")
+            return draft
+
+    def hit_rate(self):
+        with self._lock:
+            attempts = self.stats["hits"] + self.stats["pending"] + self.stats["misses"]
+            return self.stats["hits"] / attempts if attempts else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            result = dict(self.stats)
+        result["hit_rate"] = self.hit_rate()
+        result["spend_share"] = self.budget.share()
+        return result
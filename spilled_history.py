@@ -0,0 +1,95 @@
+"""
+최근 메시지만 메모리에 두고 오래된 메시지는 회의 저장소(디스크)에서 읽어오는 대화 기록.
+
+MeetingStore에는 메시지가 대화에 추가되는 즉시 기록되므로, 이미 기록된 오래된 메시지는 메모리에서 버려도
+필요할 때 다시 읽을 수 있습니다. 세션이 많아도 세션마다 메모리에 남는 대화 기록이 max_in_memory개를 넘지 않습니다.
+"""
+import threading
+
+
+class SpilledHistory:
+    """
+    list처럼 len, 인덱스, 슬라이스, 반복, append를 지원하는 대화 기록.
+    인덱스는 회의의 메시지 순번(저장소의 seq)과 같으며, 메모리에서 내보낸 구간은 저장소에서 읽습니다.
+    """
+
+    def __init__(self, messages=(), store=None, meeting_id=None, max_in_memory=200, spill_batch=None):
+        self.store = store
+        self.meeting_id = meeting_id
+        self.max_in_memory = max_in_memory
+        # 메시지마다 내보내지 않도록 이만큼 더 쌓였을 때 한꺼번에 내보냄
+        self.spill_batch = spill_batch or max(1, max_in_memory // 4)
+        self.offset = 0 # 메모리에서 내보낸 메시지 수 (= 메모리에 있는 첫 메시지의 순번)
+        self._recent = list(messages)
+        self._page = (0, []) # 마지막으로 저장소에서 읽은 구간 (시작 순번, 메시지 목록)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.offset + len(self._recent)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def append(self, message):
+        with self._lock:
+            self._recent.append(message)
+
+    def _read(self, start, stop):
+        """저장소에서 start~stop 구간을 읽습니다. 같은 구간을 연달아 읽으면(페이지 표시 등) 다시 조회하지 않습니다."""
+        page_start, page = self._page
+        if page_start <= start and stop <= page_start + len(page):
+            return page[start - page_start:stop - page_start]
+        messages = self.store.read_messages(self.meeting_id, start, stop)
+        self._page = (start, messages)
+        return messages
+
+    def _slice(self, start, stop):
+        with self._lock:
+            offset = self.offset
+            recent = self._recent[max(start, offset) - offset:max(stop, offset) - offset]
+        spilled = self._read(start, min(stop, offset)) if start < offset else []
+        return spilled + recent
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self._slice(0, len(self))[index]
+            return self._slice(start, max(start, stop))
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("대화 기록 인덱스가 범위를 벗어났습니다.")
+        return self._slice(index, index + 1)[0]
+
+    def __iter__(self):
+        # 저장소 구간은 페이지 단위로 읽고, 반복 도중 추가된 메시지도 포함
+        index = 0
+        while index < len(self):
+            page = self._slice(index, min(len(self), index + max(1, self.spill_batch)))
+            if not page:
+                # 저장소에서 읽지 못한 구간(삭제된 회의 등)에서 같은 위치를 무한히 다시 읽지 않도록 중단
+                break
+            yield from page
+            index += len(page)
+
+    def spill(self, persisted, keep=None):
+        """
+        저장소에 기록된 메시지(순번 persisted 미만) 중 최근 keep개(기본 max_in_memory)를 제외하고 메모리에서 버립니다.
+        아직 기록되지 않은 메시지는 남깁니다. 저장소가 없으면 아무것도 하지 않으며, 버린 메시지 수를 반환합니다.
+        """
+        if self.store is None or self.meeting_id is None:
+            return 0
+        with self._lock:
+            if keep is None:
+                # 평소에는 spill_batch만큼 넘쳤을 때만 내보내고, keep을 직접 준 경우(세션 정리)에는 바로 내보냄
+                if len(self._recent) <= self.max_in_memory + self.spill_batch:
+                    return 0
+                keep = self.max_in_memory
+            cut = min(persisted, self.offset + len(self._recent) - keep) - self.offset
+            if cut <= 0:
+                return 0
+            del self._recent[:cut]
+            self.offset += cut
+            return cut
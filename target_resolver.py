@@ -0,0 +1,202 @@
+"""사용자 메시지에서 지목된 페르소나를 모델 호출 없이 찾아내는 로컬 판별기."""
+import difflib
+import re
+import threading
+from collections import namedtuple
+
+from persona_registry import PersonaRegistry
+
+# 판별 결과: name은 지목된 페르소나 이름 또는 None, confidence는 0~1 사이의 확신도
+Resolution = namedtuple("Resolution", ["name", "confidence", "reason"])
+
+# 이름 뒤에 붙는 호칭과 조사 (예: "Alex님", "Ben은", "Chloe씨에게")
+HONORIFICS = ["", "님", "씨", "님께서", "께서"]
+PARTICLES = [
+    "", "은", "는", "이", "가", "을", "를", "의", "에게", "께", "한테", "도", "만", "아", "야",
+    "이랑", "랑", "과", "와", "요", "은요", "는요", "에게는", "한테는", "께서는", "께는", "이가",
+]
+NAME_SUFFIXES = frozenset(h + p for h in HONORIFICS for p in PARTICLES)
+_SUFFIX_LENGTHS = sorted({len(s) for s in NAME_SUFFIXES})
+# 어간 추출 시 긴 접미사부터 제거
+_SUFFIXES_BY_LENGTH = sorted((s for s in NAME_SUFFIXES if s), key=len, reverse=True)
+
+# 최근 발언을 가리키는 표현
+REFERENCE_CUES = [
+    "방금", "아까", "앞서", "말씀하신", "말씀한", "말한", "얘기한", "이야기한", "언급하신", "언급한",
+    "지적하신", "지적한", "제안하신", "제안한", "그 의견", "그 말", "그 부분", "그 점", "그 아이디어",
+]
+
+# 직전 발언에 이어서 답하는 표현 (메시지 첫머리). 누구에게 이어지는지는 모델이 판단하도록 넘김
+CONTINUATION_CUES = (
+    "그럼", "그러면", "그렇다면", "근데", "그런데", "그래서", "그건", "그게", "그거", "맞아요", "맞습니다", "맞네요",
+    "동의", "글쎄", "왜요", "왜", "정말", "구체적으로", "예를 들면", "예를 들어", "어떻게요", "그렇죠",
+)
+
+# 유사 일치를 시도하는 최소 길이 (짧은 이름은 일반 단어와 혼동되기 쉬우므로 정확 일치만 인정)
+MIN_FUZZY_LENGTH = 4
+# 호칭 없이 조사만 붙은 토큰의 유사 일치 확신도 상한. 일반 단어("Alexa를")일 수 있으므로 모델 판별로 넘김
+PARTICLE_FUZZY_MAX_CONFIDENCE = 0.7
+_HONORIFIC_PREFIXES = tuple(h for h in HONORIFICS if h)
+
+_TOKEN_PATTERN = re.compile(r"[0-9A-Za-z가-힣]+")
+
+
+def _tokens(text):
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _stem(token):
+    """토큰 끝의 호칭/조사를 제거한 어간을 반환합니다."""
+    for suffix in _SUFFIXES_BY_LENGTH:
+        if token.endswith(suffix) and len(token) > len(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+class TargetResolver:
+    """
+    이름 일치, 오타 허용 유사 일치, 최근 발언 참조 표현으로 지목 대상을 판별합니다.
+    확신도가 threshold 미만이면 resolve() 결과를 모델 판별로 넘겨야 하며, 그 비율을 stats에 기록합니다.
+    """
+
+    def __init__(self, threshold=0.75, fuzzy_cutoff=0.75):
+        self.threshold = threshold
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.stats = {"total": 0, "local": 0, "fallback": 0}
+        self._lock = threading.Lock()
+
+    def is_confident(self, resolution):
+        return resolution.confidence >= self.threshold
+
+    def record(self, resolution):
+        """판별 결과를 로컬 처리 또는 모델 판별(fallback)로 집계합니다."""
+        with self._lock:
+            self.stats["total"] += 1
+            self.stats["local" if self.is_confident(resolution) else "fallback"] += 1
+            key = f"reason:{resolution.reason}"
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def fallback_rate(self):
+        with self._lock:
+            return self.stats["fallback"] / self.stats["total"] if self.stats["total"] else 0.0
+
+    def counters(self):
+        """판별 수, 로컬 처리/모델 판별 수, 판별 사유별 수와 모델 판별 비율을 반환합니다. (계측 내보내기용)"""
+        with self._lock:
+            counters = dict(self.stats)
+        counters["fallback_rate"] = counters["fallback"] / counters["total"] if counters["total"] else 0.0
+        return counters
+
+    def resolve(self, user_message, personas, recent_chat_history=None):
+        """
+        사용자 메시지의 지목 대상을 판별해 Resolution을 반환하고 통계에 기록합니다.
+        personas는 PersonaRegistry(이름·별칭 색인을 그대로 사용) 또는 페르소나 목록입니다.
+        """
+        resolution = self._resolve(user_message, PersonaRegistry.ensure(personas), recent_chat_history or [])
+        self.record(resolution)
+        return resolution
+
+    def _resolve(self, user_message, registry, recent_chat_history):
+        if not user_message.strip() or not len(registry):
+            return Resolution(None, 1.0, "empty")
+
+        forms = registry.forms
+        tokens = _tokens(user_message)
+
+        # 1. 이름(+호칭/조사)과 정확히 일치하는 토큰
+        # 이름 수와 무관하게 토큰마다 접미사 길이만큼만 확인
+        exact = set()
+        for token in tokens:
+            for length in _SUFFIX_LENGTHS:
+                if length >= len(token):
+                    break
+                if length and token[-length:] not in NAME_SUFFIXES:
+                    continue
+                name = forms.get(token[:-length] if length else token)
+                if name is not None:
+                    exact.add(name)
+        if len(exact) == 1:
+            return Resolution(exact.pop(), 1.0, "exact")
+        if len(exact) > 1:
+            # 여러 명을 부르면 특정 대상이 없는 것으로 처리
+            return Resolution(None, 0.9, "multiple")
+
+        # 2. 오타를 허용한 유사 일치 (예: "Alexx님", "Chole는")
+        best_name, best_ratio, addressed = self._fuzzy_match(tokens, registry.forms_by_length)
+        if best_ratio >= self.fuzzy_cutoff:
+            confidence = best_ratio * 0.9
+            if not addressed:
+                confidence = min(confidence, PARTICLE_FUZZY_MAX_CONFIDENCE)
+            return Resolution(best_name, round(confidence, 3), "fuzzy")
+
+        # 3. 최근 페르소나 발언을 가리키는 표현
+        recent = [m for m in recent_chat_history if m.get("role") in registry.name_set]
+        if any(cue in user_message for cue in REFERENCE_CUES):
+            return self._resolve_reference(tokens, recent)
+
+        # 4. 이름이나 참조 표현 없이 직전 페르소나 발언을 이어가는 경우 (예: "그럼 예산은 얼마나 필요할까요?")
+        if recent and self._continues(user_message, tokens, recent[-1]):
+            # 직전 발언자일 가능성이 높지만 지목 여부는 모델 판별로 넘김
+            return Resolution(recent[-1]["role"], 0.6, "continuation")
+
+        return Resolution(None, 0.8, "no_mention")
+
+    def _fuzzy_match(self, tokens, forms_by_length):
+        """
+        토큰 어간과 가장 비슷한 이름/별칭을 (이름, 유사도, 호칭으로 불렀는지)로 반환합니다.
+        이름처럼 호칭이나 조사가 붙은 토큰만 비교하므로 "close", "Alexa" 같은 일반 단어는 이름으로 보지 않습니다.
+        길이 차이만으로 fuzzy_cutoff에 못 미치는 후보는 비교하지 않고, 빠른 상한 검사를 통과한 후보만 정밀 비교합니다.
+        """
+        best_name, best_ratio, best_addressed = None, 0.0, False
+        matcher = difflib.SequenceMatcher()
+        for token in tokens:
+            stem = _stem(token)
+            if len(stem) < MIN_FUZZY_LENGTH or stem == token:
+                continue
+            addressed = token[len(stem):].startswith(_HONORIFIC_PREFIXES)
+            matcher.set_seq2(stem)
+            for length, entries in forms_by_length.items():
+                # 유사도 상한은 2 * 짧은 쪽 길이 / 두 길이의 합
+                if length < MIN_FUZZY_LENGTH or 2 * min(length, len(stem)) / (length + len(stem)) < self.fuzzy_cutoff:
+                    continue
+                for form, name in entries:
+                    matcher.set_seq1(form)
+                    if matcher.quick_ratio() <= best_ratio:
+                        continue
+                    ratio = matcher.ratio()
+                    if ratio > best_ratio:
+                        best_name, best_ratio, best_addressed = name, ratio, addressed
+        return best_name, best_ratio, best_addressed
+
+    def _continues(self, user_message, tokens, last_message):
+        """메시지가 이어 말하는 표현으로 시작하거나 직전 발언과 겹치는 단어가 2개 이상이면 True."""
+        if user_message.strip().startswith(CONTINUATION_CUES):
+            return True
+        user_words = {_stem(t) for t in tokens if len(t) >= 2}
+        words = {_stem(t) for t in _tokens(last_message.get("content", "")) if len(t) >= 2}
+        return len(user_words & words) >= 2
+
+    def _resolve_reference(self, tokens, recent):
+        """참조 표현이 있을 때 최근 발언 중 가리키는 페르소나를 고릅니다."""
+        if not recent:
+            return Resolution(None, 0.8, "reference_without_history")
+
+        speakers = []
+        for msg in reversed(recent):
+            if msg["role"] not in speakers:
+                speakers.append(msg["role"])
+        if len(speakers) == 1:
+            return Resolution(speakers[0], 0.85, "reference_single_speaker")
+
+        # 여러 명이 발언했다면 사용자 메시지와 겹치는 단어가 가장 많은 발언자를 선택
+        user_words = {_stem(t) for t in tokens if len(t) >= 2}
+        overlaps = {}
+        for msg in recent:
+            words = {_stem(t) for t in _tokens(msg.get("content", "")) if len(t) >= 2}
+            overlaps[msg["role"]] = max(overlaps.get(msg["role"], 0), len(user_words & words))
+        ranked = sorted(overlaps.items(), key=lambda item: item[1], reverse=True)
+        (top_name, top_score), runner_up = ranked[0], ranked[1][1]
+        if top_score >= 2 and top_score - runner_up >= 2:
+            return Resolution(top_name, 0.8, "reference_overlap")
+        # 마지막 발언자일 가능성이 높지만 확신할 수 없으므로 모델 판별로 넘김
+        return Resolution(speakers[0], 0.5, "reference_ambiguous")
@@ -0,0 +1,82 @@
+"""여러 사용자가 한 프로세스에서 회의할 때 세션 풀이 대화 중인 세션을 정리하지 않는지 AppTest로 확인합니다."""
+import os
+import time
+
+import pytest
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IDLE_TIMEOUT = 1.0
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT) # personas.json
+    monkeypatch.setenv("MODEL_PROVIDER", "fake")
+    monkeypatch.setenv("FAKE_MODEL_LATENCY_MEDIAN", "0.01")
+    monkeypatch.setenv("FAKE_MODEL_CHUNK_INTERVAL", "0")
+    monkeypatch.setenv("MEETING_STORE_PATH", str(tmp_path / "meetings.sqlite3"))
+    monkeypatch.setenv("SESSION_IDLE_TIMEOUT", str(IDLE_TIMEOUT))
+
+
+def start_meeting(topic):
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.run()
+    at.text_input[1].set_value(topic).run()
+    next(b for b in at.button if b.label == "회의 시작").click().run()
+    return at
+
+
+def resident(at):
+    history = at.session_state.meeting.state.chat_history
+    # 세션 풀이 메모리를 비우면 모든 메시지를 디스크로 내보내 offset이 기록 길이와 같아짐
+    return history.offset < len(history)
+
+
+def test_chatting_session_stays_resident_past_idle_timeout(app_env):
+    user = start_meeting("하반기 고객 유지 전략")
+    other = start_meeting("신규 고객 유입 채널")
+
+    started = time.monotonic()
+    turn = 0
+    # 사용자가 쉬지 않고 대화하는 동안 다른 사용자의 실행이 쉬는 세션 정리를 계속 일으킴
+    while time.monotonic() - started < IDLE_TIMEOUT * 2.5:
+        user.chat_input[0].set_value(f"Alex님, {turn}번째 질문입니다.").run()
+        user.run()
+        time.sleep(IDLE_TIMEOUT / 3)
+        other.run()
+        assert resident(user), f"{turn}번째 턴 이후 대화 중인 세션이 정리됨"
+        turn += 1
+    assert not user.exception and not other.exception
+
+    # 대조: 실제로 쉬는 세션은 정리되고, 다시 쓰이면 기록을 그대로 이어감
+    length = len(user.session_state.meeting.state.chat_history)
+    time.sleep(IDLE_TIMEOUT * 1.2)
+    other.run()
+    assert not resident(user)
+    user.chat_input[0].set_value("Ben님 생각은요?").run()
+    user.run()
+    history = user.session_state.meeting.state.chat_history
+    assert len(history) > length
+    assert history[length]["content"] == "Ben님 생각은요?"
+
+
+def test_older_pages_stay_cached_while_paging(app_env):
+    at = start_meeting("하반기 고객 유지 전략")
+    history = at.session_state.meeting.state.chat_history
+    for turn in range(40):
+        history.append({"role": at.session_state.meeting.state.user_name, "content": f"{turn}번째 질문입니다."})
+        history.append({"role": "Alex", "content": f"{turn}번째 답변입니다."})
+    at.run()
+    meeting_id = at.session_state.meeting.meeting_id
+    page_input = next(n for n in at.number_input if n.label == "페이지")
+    for page in (1, page_input.max, 1):
+        page_input.set_value(page).run()
+        page_input = next(n for n in at.number_input if n.label == "페이지")
+    assert not at.exception
+    pages = list(at.session_state.rendered_pages)
+    # 앞뒤로 넘겨 본 페이지가 모두 남아 있고, 마지막으로 본 페이지가 가장 최근
+    assert {key[:2] for key in pages} >= {(meeting_id, 0), (meeting_id, (page_input.max - 1) * 30)}
+    assert pages[-1][:3] == (meeting_id, 0, 30)
+    assert len(pages) <= 8
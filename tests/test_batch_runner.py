@@ -0,0 +1,26 @@
+"""일괄 실행 결과 파일을 이어 쓰는 처리 테스트."""
+import json
+
+from batch_runner import load_completed_ids, repair_results_file
+
+
+def test_truncated_last_line_is_removed_before_appending(tmp_path):
+    results_path = tmp_path / "results.jsonl"
+    done = json.dumps({"id": "a", "turns": 3}, ensure_ascii=False)
+    results_path.write_text(done + "\n" + '{"id": "b", "tur', encoding="utf-8")
+    assert load_completed_ids(str(results_path)) == {"a"}
+
+    assert repair_results_file(str(results_path)) == len('{"id": "b", "tur')
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": "b", "turns": 3}) + "\n")
+    assert load_completed_ids(str(results_path)) == {"a", "b"}
+    # 줄바꿈으로 끝나는 파일은 그대로 둠
+    assert repair_results_file(str(results_path)) == 0
+    assert repair_results_file(str(tmp_path / "missing.jsonl")) == 0
+
+
+def test_file_with_only_a_partial_line_becomes_empty(tmp_path):
+    results_path = tmp_path / "results.jsonl"
+    results_path.write_text('{"id": "a"', encoding="utf-8")
+    assert repair_results_file(str(results_path)) == len('{"id": "a"')
+    assert results_path.read_text(encoding="utf-8") == ""
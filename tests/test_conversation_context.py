@@ -0,0 +1,23 @@
+"""대화 컨텍스트의 증분 동기화와 백그라운드 요약 테스트."""
+from concurrent.futures import ThreadPoolExecutor
+
+from conversation_context import ConversationContext
+
+
+def test_sync_keeps_every_message_once_while_summaries_apply():
+    history = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        context = ConversationContext(
+            token_budget=40,
+            summary_every=2,
+            summarize_fn=lambda previous, lines: f"{previous} +{len(lines)}",
+            executor=executor,
+        )
+        for i in range(300):
+            history.append({"role": "Alex" if i % 2 else "user", "content": f"메시지 {i}"})
+            context.sync(history)
+    # 요약이 반영되며 앞쪽 줄을 버리는 동안에도 빠지거나 중복된 메시지가 없어야 함
+    assert context.offset + len(context.lines) == len(history)
+    assert context.lines[-1] == "Alex: 메시지 299"
+    assert context.offset > 0
+    assert context.render().endswith("Alex: 메시지 299")
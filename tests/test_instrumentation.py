@@ -0,0 +1,37 @@
+"""호출 계측 저장소와 Prometheus 엔드포인트 테스트."""
+import json
+import urllib.request
+
+from instrumentation import CALL_PERSONA, CallMetrics, serve_prometheus
+
+
+def record_call(metrics, text="응답"):
+    timer = metrics.timer("세션", CALL_PERSONA, persona="Alex")
+    timer.finish("프롬프트", text=text)
+
+
+def test_json_log_is_closed_and_later_records_stay_in_memory(tmp_path):
+    log_path = tmp_path / "calls.jsonl"
+    with CallMetrics(log_path=str(log_path)) as metrics:
+        record_call(metrics)
+        log = metrics._log
+    assert log.closed
+    record_call(metrics)
+    metrics.close() # 두 번 닫아도 오류 없음
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["persona"] for line in lines] == ["Alex"]
+    assert len(metrics.snapshot()) == 2
+
+
+def test_prometheus_binds_to_localhost_by_default():
+    with CallMetrics() as metrics:
+        record_call(metrics)
+        server = serve_prometheus(metrics, 0)
+        try:
+            host, port = server.server_address[:2]
+            assert host == "127.0.0.1"
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                assert b"meeting_model_call_seconds_count" in response.read()
+        finally:
+            server.shutdown()
+            server.server_close()
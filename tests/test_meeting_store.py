@@ -0,0 +1,18 @@
+"""회의 저장소 테스트."""
+from meeting_store import MeetingStore
+
+
+def test_revision_changes_with_messages_and_summary(tmp_path):
+    store = MeetingStore(str(tmp_path / "meetings.sqlite3"))
+    meeting_id = store.create_meeting("고객 유지 전략", "사용자", ["Alex", "Ben"])
+    first = store.revision(meeting_id)
+    store.append_message(meeting_id, 0, "사용자", "시작합시다.")
+    second = store.revision(meeting_id)
+    # 같은 메시지를 다시 기록해도 바뀌지 않음
+    store.append_message(meeting_id, 0, "사용자", "시작합시다.")
+    assert store.revision(meeting_id) == second
+    store.save_summary(meeting_id, "요약")
+    third = store.revision(meeting_id)
+    assert len({first, second, third}) == 3
+    assert store.revision(meeting_id + 1) is None
+    store.close()
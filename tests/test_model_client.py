@@ -0,0 +1,71 @@
+"""속도 제한기와 공유 모델 클라이언트 테스트."""
+import threading
+
+import pytest
+
+from model_client import ModelClient
+from rate_limiter import RequestLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class StreamingModel:
+    """청크 두 개를 내보내는 모델."""
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        if not stream:
+            return prompt
+        return iter(["첫 청크", "둘째 청크"])
+
+
+@pytest.mark.parametrize("rate", [0, None])
+def test_zero_or_none_rate_is_unlimited(rate):
+    clock = FakeClock()
+    bucket = TokenBucket(rate, clock=clock, sleep=clock.sleep)
+    assert all(bucket.try_acquire() == 0 for _ in range(1000))
+    limiter = RequestLimiter(rate, tokens_per_minute=rate, clock=clock, sleep=clock.sleep)
+    for _ in range(1000):
+        limiter.acquire(tokens=500)
+    assert limiter.waits == 0
+    assert clock.now == 0
+
+
+def test_negative_rate_is_rejected():
+    with pytest.raises(ValueError):
+        TokenBucket(-1)
+
+
+def test_waits_are_counted_across_threads():
+    limiter = RequestLimiter(60, sleep=lambda seconds: None)
+    limiter.requests.try_acquire = lambda amount=1: 1.0
+    limiter.requests.acquire = lambda amount=1, timeout=None: True
+    threads = [threading.Thread(target=lambda: [limiter.acquire() for _ in range(500)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.waits == 4000
+
+
+def test_duplicate_streams_are_counted_not_coalesced():
+    client = ModelClient(StreamingModel())
+    first = client.generate_content("같은 요청", stream=True)
+    second = client.generate_content("같은 요청", stream=True)
+    assert next(first) == "첫 청크"
+    assert list(second) == ["첫 청크", "둘째 청크"]
+    assert list(first) == ["둘째 청크"]
+    assert client.stats["uncoalesced_streams"] == 1
+    assert client.stats["calls"] == 2
+    # 앞선 스트림이 끝난 뒤의 같은 요청은 중복이 아님
+    assert list(client.generate_content("같은 요청", stream=True)) == ["첫 청크", "둘째 청크"]
+    assert client.stats["uncoalesced_streams"] == 1
+    assert not client._inflight_streams
@@ -0,0 +1,253 @@
+"""템플릿으로 만든 프롬프트가 분리하기 전의 f-string 프롬프트와 같은 내용을 담는지 확인합니다."""
+import json
+import os
+import re
+
+import pytest
+
+from conversation_context import ConversationContext
+from meeting import (
+    build_compress_prompt, build_persona_prompt, build_reconcile_prompt, build_stance_prompt, build_summary_prompt,
+    build_target_prompt,
+)
+from persona_registry import PersonaRegistry
+from prompt_templates import History
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(ROOT, "personas.json"), encoding="utf-8") as f:
+    PERSONAS = PersonaRegistry(json.load(f))
+
+TOPIC = "여성 패션 플랫폼의 하반기 고객 유지 전략"
+MESSAGES = [
+    {"role": "사용자", "content": "재구매율을 어떻게 올릴 수 있을까요?"},
+    {"role": "Alex", "content": "멤버십 등급을 없애고 구독형 요금제로 바꿔보죠."},
+    {"role": "Ben", "content": "분기별 재구매율 데이터부터 정리해야 합니다."},
+]
+LINES = [f"{m['role']}: {m['content']}" for m in MESSAGES]
+
+
+# --- 템플릿으로 나누기 전의 프롬프트 (비교 기준, 원래 코드에서 그대로 옮김) ---
+
+def legacy_persona_prompt(persona, chat_history_text, topic):
+    return f"""
+        당신은 여성 패션 이커머스 플랫폼 회사에 근무하는 '{persona['name']}'라는 이름의 전략 전문가입니다.
+        당신의 성향은 {persona['mbti']}이며, MBTI 성향에 맞는 방식으로 문제를 파악하고 사고합니다.
+        현재 회의 주제는 '{topic}'입니다.
+        지금까지의 대화 내용은 다음과 같습니다:
+        --- 대화 시작 ---
+        {chat_history_text}
+        --- 대화 끝 ---
+        이제 당신의 입장에서 회의 주제에 대해 간결하게 1~3 문장으로 발언해주세요.
+        기존의 대화에 순응하기 보다 의식적으로 반대하는 의견을 제시하지만, 타당한 의견에 대해서는 반대를 멈추세요.
+        당신의 성향에 일치하는 개념을 제시하고 대화하지만, 직접적으로 MBTI를 드러내지는 않습니다.
+        지나치게 추상적이거나 모호한 답변을 피하고 실제 비즈니스에서 발생할 수 있는 상황을 가정하여 구체성 있는 발언을 하세요.
+        당신의 성향과 성별을 고려하여 말투를 적절히 사용하세요. 대화라는 점으로 고려해 캐주얼한 말투를 사용해도 좋습니다.
+        """
+
+
+def legacy_target_prompt(user_message, persona_names, recent_chat_history=None):
+    persona_names_str = ", ".join(persona_names)
+
+    history_context = "최근 대화 내용은 다음과 같습니다:\n"
+    if recent_chat_history:
+        for msg in recent_chat_history:
+            history_context += f"{msg.get('role', '알 수 없음')}: {msg.get('content', '')}\n"
+    else:
+        history_context += " (최근 대화 내용 없음)\n"
+
+    return f"""
+    사용자의 다음 메시지를 분석해주세요:
+    사용자 메시지: "{user_message}"
+
+    {history_context}
+    회의 참석자 목록은 다음과 같습니다: {persona_names_str}
+
+    위 사용자 메시지가 다음 중 하나에 해당합니까?
+    1. 회의 참석자 ({persona_names_str}) 중 특정 한 명의 이름을 명시적으로 부르는 경우
+    2. 위에 제시된 '최근 대화 내용' 중 특정 참석자의 발언을 명확히 지칭하거나 이어가는 경우
+
+    - 만약 그렇다면, 해당 참석자의 이름만 정확히 응답해주세요. (예: {persona_names_str} 중 하나)
+    - 그렇지 않거나, 누구를 지칭하는지 애매하거나, 여러 명을 지칭하거나, 아무도 지칭하지 않는다면 "None"이라고 응답해주세요.
+
+    응답은 반드시 참석자 이름 또는 "None" 중 하나여야 합니다. 다른 설명이나 부연은 절대 추가하지 마십시오.
+    """
+
+
+def legacy_compress_prompt(topic, previous_summary, lines):
+    history_text = "\n".join(lines)
+    return f"""
+        다음은 '{topic}' 회의의 이전 요약과 그 뒤에 이어진 대화입니다.
+
+        --- 이전 요약 ---
+        {previous_summary or "(없음)"}
+        --- 이어진 대화 ---
+        {history_text}
+        --- 끝 ---
+
+        이전 요약과 이어진 대화를 합쳐 하나의 요약으로 다시 작성해주세요.
+        발언자별 핵심 주장, 합의된 내용, 남은 쟁점이 드러나도록 10문장 이내로 간결하게 작성하고, 다른 설명은 덧붙이지 마세요.
+        """
+
+
+def legacy_stance_prompt(persona, chat_history_text, topic):
+    return f"""
+        당신은 '{persona['name']}'라는 이름의 전략 전문가이며, 성향은 {persona['mbti']}입니다.
+        현재 회의 주제는 '{topic}'입니다.
+        지금까지의 대화 내용은 다음과 같습니다:
+        --- 대화 시작 ---
+        {chat_history_text}
+        --- 대화 끝 ---
+        다음 발언에서 당신이 밀고 나갈 핵심 입장과 근거를 2문장 이내로 메모해주세요.
+        기존 의견에 반대할 지점이 있다면 포함하고, 메모 내용만 작성하세요.
+        """
+
+
+def legacy_reconcile_prompt(persona, stance, recent_text, topic):
+    return f"""
+        당신은 '{persona['name']}'라는 이름의 전략 전문가이며, 성향은 {persona['mbti']}입니다. 회의 주제는 '{topic}'입니다.
+        미리 정리해 둔 당신의 입장: {stance}
+        --- 최근 대화 ---
+        {recent_text}
+        --- 끝 ---
+        마지막 발언에 답하면서 당신의 입장을 1~3 문장으로 말해주세요. 마지막 발언과 맞지 않는 입장은 버리고 새로 판단하세요.
+        구체적인 비즈니스 상황을 가정하고, 캐주얼한 대화체를 사용해도 좋으며, MBTI를 직접 드러내지는 마세요.
+        """
+
+
+def legacy_summary_prompt(topic, history_text):
+    return f"""
+    다음은 \'{topic}\'에 대한 회의 기록입니다.
+
+    --- 회의 기록 시작 ---
+    {history_text}
+    --- 회의 기록 끝 ---
+
+    위 회의 기록을 바탕으로 다음 형식에 맞춰 회의를 평가해주세요
+
+    # Agenda
+    - (회의 주제를 명확히 기술)
+
+    # Discussion
+    - (주요 논의 사항들을 간결하게 요약)
+
+    # Feedback
+    - (회의 결과와 논의 방식에 대해 목표달성과 효율성 관점에서 평가하고 개선 사항을 제시)
+
+    결과는 마크다운 형식으로 작성해주세요.
+    """
+
+
+def sentences(text):
+    """공백 줄과 들여쓰기를 빼고 문장 단위로 자른 목록. 문장 내용은 한 글자도 바꾸지 않습니다."""
+    return [sentence for line in text.splitlines() if line.strip() for sentence in re.split(r"(?<=\.)\s+", line.strip())]
+
+
+def content_text(prompt):
+    contents = prompt.contents()
+    assert [content["role"] for content in contents] == ["user"]
+    return "\n".join(part["text"] for part in contents[0]["parts"])
+
+
+def is_subsequence(items, sequence):
+    remaining = iter(sequence)
+    return all(item in remaining for item in items)
+
+
+persona = PERSONAS.personas[0]
+CASES = {
+    "persona": (build_persona_prompt(persona, History(LINES), TOPIC), legacy_persona_prompt(persona, "\n".join(LINES), TOPIC)),
+    "persona_empty": (build_persona_prompt(persona, History(), TOPIC), legacy_persona_prompt(persona, "", TOPIC)),
+    "target": (
+        build_target_prompt("Alex님 어떻게 보세요?", PERSONAS.names, MESSAGES[1:]),
+        legacy_target_prompt("Alex님 어떻게 보세요?", PERSONAS.names, MESSAGES[1:]),
+    ),
+    "target_no_history": (
+        build_target_prompt("그럼 예산은요?", PERSONAS.names),
+        legacy_target_prompt("그럼 예산은요?", PERSONAS.names),
+    ),
+    "compress": (build_compress_prompt(TOPIC, "", LINES), legacy_compress_prompt(TOPIC, "", LINES)),
+    "stance": (build_stance_prompt(persona, History(LINES), TOPIC), legacy_stance_prompt(persona, "\n".join(LINES), TOPIC)),
+    "reconcile": (
+        build_reconcile_prompt(persona, "구독형이 낫다", History(LINES), TOPIC),
+        legacy_reconcile_prompt(persona, "구독형이 낫다", "\n".join(LINES), TOPIC),
+    ),
+    "summary": (build_summary_prompt(TOPIC, History(LINES)), legacy_summary_prompt(TOPIC, "\n".join(LINES))),
+}
+
+
+# 지시 사항을 system으로 옮긴 프롬프트: 이 문장들이 대화 기록보다 앞으로 옵니다 (의도한 동작 변경).
+MOVED_TO_SYSTEM = {
+    "persona": [
+        "기존의 대화에 순응하기 보다 의식적으로 반대하는 의견을 제시하지만, 타당한 의견에 대해서는 반대를 멈추세요.",
+        "당신의 성향에 일치하는 개념을 제시하고 대화하지만, 직접적으로 MBTI를 드러내지는 않습니다.",
+        "지나치게 추상적이거나 모호한 답변을 피하고 실제 비즈니스에서 발생할 수 있는 상황을 가정하여 구체성 있는 발언을 하세요.",
+        "당신의 성향과 성별을 고려하여 말투를 적절히 사용하세요.",
+        "대화라는 점으로 고려해 캐주얼한 말투를 사용해도 좋습니다.",
+    ],
+    "compress": [
+        "이전 요약과 이어진 대화를 합쳐 하나의 요약으로 다시 작성해주세요.",
+        "발언자별 핵심 주장, 합의된 내용, 남은 쟁점이 드러나도록 10문장 이내로 간결하게 작성하고, 다른 설명은 덧붙이지 마세요.",
+    ],
+    "stance": ["기존 의견에 반대할 지점이 있다면 포함하고, 메모 내용만 작성하세요."],
+    "reconcile": ["구체적인 비즈니스 상황을 가정하고, 캐주얼한 대화체를 사용해도 좋으며, MBTI를 직접 드러내지는 마세요."],
+}
+MOVED_TO_SYSTEM["persona_empty"] = MOVED_TO_SYSTEM["persona"]
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_same_sentences_as_legacy_prompt(name):
+    prompt, legacy = CASES[name]
+    system, contents = sentences(prompt.system), sentences(content_text(prompt))
+    assert sorted(system + contents) == sorted(sentences(legacy))
+    # system과 contents 각각은 기존 프롬프트의 문장 순서를 그대로 따릅니다.
+    assert is_subsequence(system, sentences(legacy))
+    assert is_subsequence(contents, sentences(legacy))
+
+
+@pytest.mark.parametrize("name", sorted(MOVED_TO_SYSTEM))
+def test_rules_move_before_history(name):
+    prompt, legacy = CASES[name]
+    legacy_sentences = sentences(legacy)
+    system = sentences(prompt.system)
+    moved = MOVED_TO_SYSTEM[name]
+    # 기존에는 대화 기록 뒤에 있던 지시가 이제 system_instruction으로 대화 기록보다 먼저 전달됩니다.
+    assert system[-len(moved):] == moved
+    assert all(legacy_sentences.index(sentence) > legacy_sentences.index(LINES[-1]) for sentence in moved if LINES[-1] in legacy_sentences)
+    assert not set(moved) & set(sentences(content_text(prompt)))
+    # 나머지 문장은 기존 순서 그대로입니다.
+    assert sentences(content_text(prompt)) == [sentence for sentence in legacy_sentences if sentence not in system]
+
+
+@pytest.mark.parametrize("name", ["target", "target_no_history", "summary"])
+def test_target_and_summary_match_legacy_prompt(name):
+    prompt, legacy = CASES[name]
+    assert prompt.system == ""
+    assert sentences(prompt.text()) == sentences(legacy)
+    assert sentences(content_text(prompt)) == sentences(legacy)
+
+
+def test_contents_send_history_messages_as_parts_of_one_user_content():
+    prompt, _ = CASES["persona"]
+    contents = prompt.contents()
+    # 페르소나 발언도 모델 턴이 아니라 사용자 content 하나의 part로 보냅니다.
+    assert contents == [{"role": "user", "parts": [
+        {"text": "현재 회의 주제는 '여성 패션 플랫폼의 하반기 고객 유지 전략'입니다."},
+        {"text": "지금까지의 대화 내용은 다음과 같습니다:\n--- 대화 시작 ---"},
+        {"text": LINES[0]},
+        {"text": LINES[1]},
+        {"text": LINES[2]},
+        {"text": "--- 대화 끝 ---"},
+        {"text": "이제 당신의 입장에서 회의 주제에 대해 간결하게 1~3 문장으로 발언해주세요."},
+    ]}]
+    assert prompt.contents(include_prefix=False)[0]["parts"][0]["text"].startswith("지금까지의 대화 내용")
+
+
+def test_context_render_matches_messages():
+    context = ConversationContext(token_budget=1000)
+    context.sync(MESSAGES)
+    context.summary = "이전 요약"
+    assert isinstance(context.render_messages(), History)
+    assert context.render() == str(context.render_messages())
+    assert context.render().startswith("[이전 대화 요약]\n이전 요약\n[최근 대화]\n")
+    assert list(context.render_messages())[2:] == LINES
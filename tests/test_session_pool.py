@@ -0,0 +1,171 @@
+"""세션 풀과 세션 메모리 정리 테스트."""
+import json
+import os
+import time
+
+import pytest
+
+from meeting import MeetingCallbacks, MeetingSession
+from meeting_store import MeetingStore
+from model_client import ModelClient
+from model_provider import FakeGenerativeModel, LatencyProfile
+from response_cache import MemoryCache
+from session_pool import SessionPool
+from spilled_history import SpilledHistory
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(ROOT, "personas.json"), encoding="utf-8") as f:
+    PERSONAS = json.load(f)
+
+
+class FlakyStore(MeetingStore):
+    """fail이 켜져 있으면 메시지 기록에 실패하는 저장소."""
+
+    fail = False
+
+    def append_message(self, meeting_id, seq, role, content):
+        if self.fail:
+            raise OSError("디스크가 가득 찼습니다")
+        super().append_message(meeting_id, seq, role, content)
+
+
+class CountingCallbacks(MeetingCallbacks):
+    def __init__(self):
+        self.warnings = []
+
+    def on_warning(self, message):
+        self.warnings.append(message)
+
+
+def make_session(tmp_path):
+    store = FlakyStore(str(tmp_path / "meetings.sqlite3"))
+    callbacks = CountingCallbacks()
+    session = MeetingSession(None, PERSONAS, callbacks=callbacks, store=store, max_history_in_memory=4)
+    session.start_meeting("하반기 고객 유지 전략")
+    return session, store, callbacks
+
+
+def test_release_memory_spills_history_and_resumes(tmp_path):
+    session, store, _ = make_session(tmp_path)
+    for i in range(3):
+        session.handle_user_message(f"질문 {i}")
+        session.state.current_turn = "user" # 페르소나 턴이 끝난 것으로 봄
+    clock = [0.0]
+    pool = SessionPool(idle_timeout=10, max_active=10, sweep_interval=1, clock=lambda: clock[0])
+    pool.touch(session)
+    clock[0] = 11
+    assert pool.sweep() == 1
+    history = session.state.chat_history
+    assert history.offset == len(history) == 4
+    pool.touch(session)
+    assert pool.snapshot()["resumed"] == 1
+    assert [m["content"] for m in history][1:] == ["질문 0", "질문 1", "질문 2"]
+    store.close()
+
+
+def test_release_memory_does_not_call_session_callbacks(tmp_path):
+    session, store, callbacks = make_session(tmp_path)
+    store.fail = True
+    session.handle_user_message("저장되지 않는 질문")
+    session.state.current_turn = "user"
+    assert len(callbacks.warnings) == 1 # 세션 자신의 실행에서는 경고
+
+    # 세션 풀이 다른 사용자의 실행 스레드에서 정리할 때는 이 세션의 화면 콜백을 부르지 않음
+    assert session.release_memory()
+    assert len(callbacks.warnings) == 1
+    # 저장하지 못한 메시지는 메모리에 남아 다음 저장 때 다시 시도
+    history = session.state.chat_history
+    assert history.offset < len(history)
+    assert history[-1]["content"] == "저장되지 않는 질문"
+    store.fail = False
+    session.handle_user_message("다음 질문")
+    assert store.read_messages(session.meeting_id, 0, 10)[-2:] == [
+        {"role": session.state.user_name, "content": "저장되지 않는 질문"},
+        {"role": session.state.user_name, "content": "다음 질문"},
+    ]
+    store.close()
+
+
+def wait_for_summaries(session, timeout=5):
+    """컨텍스트 누적 요약과 구간 요약이 모두 반영될 때까지 기다립니다."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        futures = [s.future for s in session.summarizer.segments if s.future is not None and s.summary is None]
+        futures += [session.context._pending] if session.context._pending is not None else []
+        if not futures:
+            return
+        for future in futures:
+            future.exception()
+        time.sleep(0.01)
+    raise TimeoutError
+
+
+def test_release_memory_drops_prompt_buffers_and_rebuilds_them(tmp_path):
+    store = MeetingStore(str(tmp_path / "meetings.sqlite3"))
+    model = ModelClient(FakeGenerativeModel(latency=LatencyProfile("constant", 0.0), chunk_interval=0))
+    session = MeetingSession(
+        model, PERSONAS, store=store, cache=MemoryCache(), max_history_in_memory=8,
+        context_token_budget=200, summary_every=4, summary_chunk_size=6,
+    )
+    session.start_meeting("하반기 고객 유지 전략")
+    for i in range(12):
+        session.handle_user_message(f"Alex님, 재구매율 {i}번째 질문입니다.")
+        session.generate_persona_responses()
+    wait_for_summaries(session)
+    expected_context = session.context.render()
+
+    assert session.release_memory()
+    assert session.context.lines == [] and session.summarizer.lines == []
+    assert session.state.chat_history.offset == len(session.state.chat_history)
+
+    # 다음 실행에서 sync하면 저장소에서 필요한 메시지만 읽어 같은 프롬프트 컨텍스트를 만듦
+    session.context.sync(session.state.chat_history)
+    assert session.context.render() == expected_context
+    session.handle_user_message("Ben님 생각은요?")
+    session.generate_persona_responses()
+    assert session.summarizer.render()
+
+    session.end_meeting()
+    summary = session.state.meeting_summary
+    assert summary
+    assert session.release_memory()
+    assert session.context is None and session.summarizer is None
+    assert session.state._meeting_summary is None
+    # 요약은 처음 읽을 때 저장소에서 다시 가져옴
+    assert session.state.meeting_summary == summary
+    store.close()
+
+
+def test_failed_summary_is_not_stored(tmp_path):
+    store = MeetingStore(str(tmp_path / "meetings.sqlite3"))
+    model = FakeGenerativeModel(latency=LatencyProfile("constant", 0.0), chunk_interval=0, error_rate=1.0)
+    callbacks = CountingCallbacks()
+    callbacks.errors = []
+    callbacks.on_error = callbacks.errors.append
+    session = MeetingSession(model, PERSONAS, callbacks=callbacks, store=store, cache=MemoryCache())
+    session.start_meeting("하반기 고객 유지 전략")
+    session.handle_user_message("재구매율을 어떻게 올릴까요?")
+
+    assert session.end_meeting() == "회의 요약 생성에 실패했습니다."
+    assert callbacks.errors
+    meeting = store.get_meeting(session.meeting_id)
+    assert meeting["ended"] is not None and meeting["summary"] is None
+    # 저장소에서 다시 읽을 수 없는 안내는 세션을 정리해도 메모리에 남음
+    assert session.release_memory()
+    assert session.state.meeting_summary == "회의 요약 생성에 실패했습니다."
+
+    with pytest.raises(Exception):
+        session.summarize_transcript("하반기 고객 유지 전략", "사용자", store.iter_messages(session.meeting_id))
+    store.close()
+
+
+def test_spilled_history_iteration_stops_when_store_returns_nothing(tmp_path):
+    store = MeetingStore(str(tmp_path / "meetings.sqlite3"))
+    history = SpilledHistory(
+        [{"role": "사용자", "content": f"질문 {i}"} for i in range(6)], store=store, meeting_id=1, max_in_memory=2, spill_batch=2,
+    )
+    # 저장소에 없는 메시지를 내보낸 것으로 표시 (삭제된 회의 등)
+    assert history.spill(persisted=6, keep=2) == 4
+    assert list(history) == []
+    store.close()
@@ -0,0 +1,98 @@
+"""지목 대상 로컬 판별기의 한국어 예문 코퍼스 테스트."""
+import json
+import os
+
+import pytest
+
+from persona_registry import PersonaRegistry
+from target_resolver import TargetResolver
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(ROOT, "personas.json"), encoding="utf-8") as f:
+    PERSONAS = PersonaRegistry(json.load(f))
+
+ONE_SPEAKER = [
+    {"role": "user", "content": "하반기 고객 유지 전략을 논의해 봅시다."},
+    {"role": "Ben", "content": "재구매율 데이터부터 분기별로 정리해 보는 게 좋겠습니다."},
+]
+TWO_SPEAKERS = ONE_SPEAKER + [
+    {"role": "Alex", "content": "멤버십 등급을 없애고 구독형 요금제로 바꾸는 실험을 해보죠."},
+]
+
+# (사용자 메시지, 최근 대화, 기대 대상, 모델 판별로 넘어가는지)
+CORPUS = [
+    # 이름 + 호칭/조사
+    ("Alex님 어떻게 보세요?", [], "Alex", False),
+    ("alex는 어떻게 생각해요?", [], "Alex", False),
+    ("Ben씨에게 묻고 싶어요.", [], "Ben", False),
+    ("Chloe님께서는 동의하시나요?", [], "Chloe", False),
+    ("Ben한테는 다른 질문이 있어요.", TWO_SPEAKERS, "Ben", False),
+    # 한글 별칭
+    ("벤은 어떻게 생각해요?", [], "Ben", False),
+    ("클로이씨에게 묻고 싶어요", [], "Chloe", False),
+    ("알렉스님, 구체적인 예시를 들어주세요.", [], "Alex", False),
+    # 오타
+    ("Alexx님 의견은요?", [], "Alex", False),
+    ("Chloee씨 생각은요?", [], "Chloe", False),
+    # 글자가 뒤바뀐 오타는 확신도가 낮아 모델 판별로 넘김
+    ("Chole는 어떻게 봐요?", [], "Chloe", True),
+    # 여러 명을 부름
+    ("Alex랑 Ben 둘 다 답해 주세요.", [], None, False),
+    # 최근 발언을 가리키는 표현
+    ("방금 말씀하신 부분을 더 설명해 주세요.", ONE_SPEAKER, "Ben", False),
+    ("구독형 요금제 실험을 제안하신 이유가 뭔가요?", TWO_SPEAKERS, "Alex", False),
+    ("아까 그 의견 좋네요.", TWO_SPEAKERS, "Alex", True),
+    ("방금 말씀하신 내용이요.", [], None, False),
+    # 이름 없이 직전 발언을 이어감
+    ("그럼 예산은 얼마나 필요할까요?", TWO_SPEAKERS, "Alex", True),
+    ("분기별로 재구매율을 보면 충분할까요?", ONE_SPEAKER, "Ben", True),
+    # 이름과 비슷한 영어 단어는 이름으로 보지 않음
+    ("Alexa 스피커로 주문하게 하면 어떨까요?", [], None, False),
+    ("close rate를 먼저 봐야 해요.", [], None, False),
+    ("clone 상품이 늘고 있어요.", [], None, False),
+    ("flex 근무제는 별개 문제예요.", [], None, False),
+    ("Apex 리그 협찬은 어떤가요?", [], None, False),
+    ("chloride 성분 표기가 필요해요.", [], None, False),
+    ("benefit 설계부터 하죠.", [], None, False),
+    # 호칭 없이 조사만 붙은 비슷한 단어는 모델 판별로 넘김
+    ("Alexa를 연동하면 어때요?", [], "Alex", True),
+    # 특정 대상이 없는 새 질문
+    ("다음 분기 목표를 정해 봅시다.", TWO_SPEAKERS, None, False),
+    ("신규 고객 유입 채널은 뭐가 좋을까요?", [], None, False),
+]
+
+
+@pytest.mark.parametrize("message, history, expected, fallback", CORPUS)
+def test_corpus(message, history, expected, fallback):
+    resolver = TargetResolver()
+    resolution = resolver.resolve(message, PERSONAS, history)
+    assert resolution.name == expected
+    assert (not resolver.is_confident(resolution)) == fallback
+
+
+def test_counters_report_fallback_rate():
+    resolver = TargetResolver()
+    resolver.resolve("Alex님 어떻게 보세요?", PERSONAS, [])
+    resolver.resolve("그럼 예산은 얼마나 필요할까요?", PERSONAS, TWO_SPEAKERS)
+    counters = resolver.counters()
+    assert counters["total"] == 2
+    assert counters["fallback"] == 1
+    assert counters["reason:continuation"] == 1
+    assert counters["fallback_rate"] == 0.5
+
+
+def test_plain_persona_list_matches_registry():
+    resolver = TargetResolver()
+    personas = [p.to_dict() for p in PERSONAS]
+    for message, history, _, _ in CORPUS:
+        assert resolver.resolve(message, personas, history) == resolver.resolve(message, PERSONAS, history)
+
+
+def test_single_string_alias_is_one_alias():
+    registry = PersonaRegistry([{"name": "Alex", "mbti": "ENTP", "aliases": "알렉스"}, {"name": "Ben", "mbti": "ISTJ"}])
+    assert registry.get("Alex").aliases == ("알렉스",)
+    resolver = TargetResolver()
+    assert resolver.resolve("알렉스님 생각은요?", registry, []).name == "Alex"
+    # 별칭 글자 하나("스")가 이름처럼 쓰이지 않음
+    assert resolver.resolve("스님은 어떻게 보세요?", registry, []).name != "Alex"
@@ -0,0 +1,186 @@
+"""페르소나 턴의 모델 호출을 스레드 풀에서 병렬로 실행하는 턴 엔진."""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# 턴 진행 방식
+TURN_MODE_CONVERSATIONAL = "conversational" # 두 번째 발언자가 첫 번째 발언을 보고 응답
+TURN_MODE_PARALLEL = "parallel" # 발언자들이 서로의 발언 없이 동시에 응답
+
+_DONE = object() # 스트림 종료 표시
+
+
+class CallTimeoutError(Exception):
+    """모델 호출이 제한 시간 안에 끝나지 않았을 때 발생합니다."""
+
+
+class CallCancelledError(Exception):
+    """취소된 모델 호출의 결과를 읽으려 할 때 발생합니다."""
+
+
+class ModelCall:
+    """백그라운드 스레드에서 실행되는 모델 호출 하나와 그 스트림 청크를 담습니다."""
+
+    def __init__(self, persona, timeout):
+        self.persona = persona
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.future = None
+        self._chunks = queue.Queue()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """호출을 취소합니다. 이미 실행 중이면 다음 청크에서 스트림 소비를 멈춥니다."""
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def _remaining(self):
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def _run(self, stream_fn, *args):
+        """워커 스레드에서 스트림을 소비하며 청크를 큐에 전달합니다."""
+        text = ""
+        try:
+            for chunk in stream_fn(*args):
+                if self.cancelled:
+                    break
+                text += chunk
+                self._chunks.put(chunk)
+            return text
+        finally:
+            self._chunks.put(_DONE)
+
+    def iter_chunks(self):
+        """도착한 청크를 순서대로 반환합니다. 제한 시간을 넘기면 CallTimeoutError가 발생합니다."""
+        while True:
+            try:
+                item = self._chunks.get(timeout=self._remaining())
+            except queue.Empty:
+                self.cancel()
+                raise CallTimeoutError(f"{self.persona['name']} 응답 시간 초과")
+            if item is _DONE:
+                break
+            yield item
+        # 워커에서 발생한 예외는 여기서 다시 발생시킴
+        self.result()
+
+    def result(self):
+        """전체 응답 텍스트를 기다려 반환합니다."""
+        if self.cancelled:
+            raise CallCancelledError(f"{self.persona['name']} 호출이 취소되었습니다.")
+        try:
+            return self.future.result(timeout=self._remaining())
+        except FutureTimeoutError:
+            self.cancel()
+            raise CallTimeoutError(f"{self.persona['name']} 응답 시간 초과")
+
+
+class TurnEngine:
+    """대상 분석과 페르소나 응답 생성을 동시 실행 수 제한이 있는 스레드 풀에서 처리합니다."""
+
+    def __init__(self, max_workers=4, call_timeout=30.0):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="turn-engine")
+        self.call_timeout = call_timeout
+        self.stats = {
+            "speculative_used": 0, # 대상 분석 결과와 일치해 그대로 사용된 추측 응답 수
+            "speculative_discarded": 0, # 다른 대상이 지목되어 버려진 추측 응답 수
+            "timeouts": 0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def counters(self):
+        """추측 응답 사용/폐기 수와 적중률(사용 / (사용 + 폐기)), 시간 초과 수를 반환합니다. (계측 내보내기용)"""
+        with self._stats_lock:
+            counters = dict(self.stats)
+        decided = counters["speculative_used"] + counters["speculative_discarded"]
+        counters["speculative_hit_rate"] = counters["speculative_used"] / decided if decided else 0.0
+        return counters
+
+    def start_call(self, stream_fn, persona, *args):
+        """스트림 함수를 워커에서 실행하고 ModelCall을 반환합니다."""
+        call = ModelCall(persona, self.call_timeout)
+        call.future = self.executor.submit(call._run, stream_fn, persona, *args)
+        return call
+
+    def _wait_for_target(self, target_future):
+        """대상 분석 결과를 기다립니다. 실패하거나 시간을 넘기면 (None, 예외)를 반환합니다."""
+        try:
+            return target_future.result(timeout=self.call_timeout), None
+        except FutureTimeoutError:
+            target_future.cancel()
+            self._count("timeouts")
+            return None, CallTimeoutError("대상 분석 시간 초과")
+        except Exception as e:
+            return None, e
+
+    def run_turn(self, stream_fn, snapshot_history, speculative_speakers, detect_target=None,
+                 find_persona=None, mode=TURN_MODE_CONVERSATIONAL, on_target_error=None):
+        """
+        한 턴의 발언자와 ModelCall을 발언 순서대로 내보내는 제너레이터입니다.
+
+        대상 분석(detect_target)을 실행하는 동안 미리 고른 발언자(speculative_speakers)의
+        응답을 추측 생성합니다. 대화형 모드에서는 첫 번째 발언자만 추측 생성하고, 이후 발언자는
+        앞 발언이 반영된 뒤에 호출합니다. 분석 결과 다른 페르소나가 지목되면 추측 응답은 취소됩니다.
+
+        snapshot_history()는 호출 스레드에서 실행되어 워커에 넘길 대화 기록(History 또는 텍스트)을 만듭니다.
+        소비하는 쪽은 다음 항목을 요청하기 전에 현재 발언을 대화 기록에 반영해야 합니다.
+        """
+        target_future = self.executor.submit(detect_target) if detect_target else None
+
+        # 대상 분석과 동시에 실행할 추측 응답 (대화형 모드는 첫 발언자만 독립적임)
+        if mode == TURN_MODE_PARALLEL:
+            draft_speakers = speculative_speakers
+        else:
+            draft_speakers = speculative_speakers[:1]
+        history = snapshot_history()
+        drafts = {p["name"]: self.start_call(stream_fn, p, history) for p in draft_speakers}
+
+        speakers = speculative_speakers
+        if target_future is not None:
+            target_name, error = self._wait_for_target(target_future)
+            if error is not None and on_target_error:
+                on_target_error(error)
+            if target_name and find_persona:
+                target = find_persona(target_name)
+                if target:
+                    speakers = [target]
+
+        # 최종 발언자 목록에 맞는 추측 응답만 남기고 나머지는 취소
+        if mode == TURN_MODE_PARALLEL:
+            valid_names = {p["name"] for p in speakers}
+        else:
+            valid_names = {speakers[0]["name"]} if speakers else set()
+        for name, call in drafts.items():
+            if name in valid_names:
+                self._count("speculative_used")
+            else:
+                call.cancel()
+                self._count("speculative_discarded")
+        drafts = {name: call for name, call in drafts.items() if name in valid_names}
+
+        if mode == TURN_MODE_PARALLEL:
+            # 서로의 발언을 볼 필요가 없으므로 남은 발언자도 한꺼번에 시작
+            for persona in speakers:
+                if persona["name"] not in drafts:
+                    drafts[persona["name"]] = self.start_call(stream_fn, persona, history)
+
+        for persona in speakers:
+            call = drafts.get(persona["name"])
+            if call is None:
+                call = self.start_call(stream_fn, persona, snapshot_history())
+            yield persona, call
+
+    def note_timeout(self):
+        """호출 측에서 감지한 시간 초과를 통계에 기록합니다."""
+        self._count("timeouts")